@@ -0,0 +1,5 @@
+"""
+.. module benchmarks
+
+Benchmarks for cece, run against synthetic sites.
+"""
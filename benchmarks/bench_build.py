@@ -0,0 +1,231 @@
+"""
+.. module benchmarks.bench_build
+
+Time ``Parser.parse`` and ``Compiler.compile`` on a synthetic site, cold and
+warm. Every measurement runs in a fresh process, so the peak RSS reported is
+that of the measured phase, and the result is written as a JSON report. The
+parse results include the number of directory listings and stat calls the
+parse made.
+
+Any arguments that are not benchmark options are passed to cece, for example::
+
+    python -m benchmarks.bench_build --depth 4 --output report.json -- --jobs 8
+"""
+
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import argparse
+import benchmarks.generate
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def _get_peak_rss():
+    """
+        Get the peak resident set size of the current process.
+
+        :returns: The peak RSS in kilobytes, or ``None`` if it is not available
+    """
+
+    if resource is None:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, everything else kilobytes
+    if sys.platform == "darwin":
+        peak_rss //= 1024
+    return peak_rss
+
+
+def _snapshot_build():
+    """
+        Record the identity of every file in the build directory, so files
+        written by a build can be counted.
+
+        :returns: The inode and modification time of each file, by path
+    """
+
+    snapshot = {}
+    for dir_path, dir_names, file_names in os.walk("build"):
+        for file_name in file_names:
+            path = os.path.join(dir_path, file_name)
+            stat = os.stat(path)
+            snapshot[os.path.relpath(path, "build")] = (stat.st_ino, stat.st_mtime)
+    return snapshot
+
+
+def _run_phase(site, phase, cece_args, queue):
+    """
+        Run and time one phase of a build. This runs in a child process.
+
+        :param site: The directory of the site
+        :type site: string
+        :param phase: ``"parse"`` or ``"compile"``
+        :type phase: string
+        :param cece_args: The command line arguments for cece
+        :type cece_args: list
+        :param queue: The queue to put the result on
+        :type queue: multiprocessing.Queue
+    """
+
+    import cece.cache
+    import cece.instrument
+    import cece.main
+
+    os.chdir(site)
+    args = cece.main._parse_args(cece_args)
+    meta_cache = cece.cache.MetadataCache(args.cache_dir) if args.cache_dir else None
+    config = cece.main._load_config(meta_cache)
+
+    result = {}
+    if phase == "parse":
+        profile = cece.instrument.Profile()
+        start = time.time()
+        guides = cece.main._parse(args, config, meta_cache, profile)
+        result["wall_time"] = time.time() - start
+        result["nodes"] = len(guides)
+        counters = profile.get_report()["counters"]
+        result["listings"] = counters["parse_listings"]
+        result["stats"] = counters["parse_stats"]
+    else:
+        guides = cece.main._parse(args, config, meta_cache)
+        compiler = cece.main._create_compiler(args, config, guides, args.incremental)
+        before = _snapshot_build()
+        start = time.time()
+        compiler.compile()
+        result["wall_time"] = time.time() - start
+        after = _snapshot_build()
+        result["files_written"] = sum(
+            1 for path, identity in after.items() if before.get(path) != identity)
+        result["files_per_second"] = result["files_written"] / max(result["wall_time"], 1e-9)
+
+    result["peak_rss_kb"] = _get_peak_rss()
+    queue.put(result)
+
+
+def measure(site, phase, cece_args):
+    """
+        Measure a phase of a build in a fresh process.
+
+        :param site: The directory of the site
+        :type site: string
+        :param phase: ``"parse"`` or ``"compile"``
+        :type phase: string
+        :param cece_args: The command line arguments for cece
+        :type cece_args: list
+        :returns: The measurements, as a dictionary
+    """
+
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_run_phase, args=(site, phase, cece_args, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def _clean(site, cache_dir):
+    """
+        Remove the build and the caches of a site, for a cold measurement.
+
+        :param site: The directory of the site
+        :type site: string
+        :param cache_dir: The cache directory, relative to the site
+        :type cache_dir: string
+    """
+
+    for path in ("build", cache_dir):
+        if path and os.path.isdir(os.path.join(site, path)):
+            shutil.rmtree(os.path.join(site, path))
+
+
+def run_benchmarks(site, cece_args, repeat=1):
+    """
+        Run the parse and compile benchmarks against a site. A cold run starts
+        without a build or caches, and a warm run starts from the state the
+        previous run left behind.
+
+        :param site: The directory of the site
+        :type site: string
+        :param cece_args: The command line arguments for cece
+        :type cece_args: list
+        :param repeat: The number of times to repeat each measurement
+        :type repeat: int
+        :returns: The results of each measurement
+    """
+
+    import cece.main
+    cache_dir = cece.main._parse_args(cece_args).cache_dir
+
+    scenarios = [
+        ("parse", "cold", cece_args),
+        ("parse", "warm", cece_args),
+        ("compile", "cold", cece_args),
+        ("compile", "warm", cece_args),
+        ("compile", "warm incremental", cece_args + ["--incremental"])
+    ]
+    results = []
+    for phase, state, args in scenarios:
+        for i in range(repeat):
+            if state == "cold":
+                _clean(site, cache_dir)
+            result = measure(site, phase, args)
+            result.update({"phase": phase, "state": state, "run": i})
+            results.append(result)
+    return results
+
+
+def main(args=None):
+    """
+        Run the benchmarks from the command line.
+
+        :param args: The command line arguments, or ``None`` to use
+            ``sys.argv``
+        :type args: list
+    """
+
+    arg_parser = argparse.ArgumentParser(
+        description="Benchmark parsing and compiling a synthetic site.")
+    arg_parser.add_argument(
+        "--site", help="generate the site in this directory and keep it, "
+        "instead of using a temporary directory")
+    arg_parser.add_argument(
+        "--repeat", type=int, default=1, help="the number of runs of each measurement")
+    arg_parser.add_argument("--output", help="write the JSON report to this file")
+    benchmarks.generate.add_arguments(arg_parser)
+    args, cece_args = arg_parser.parse_known_args(args)
+    cece_args = [arg for arg in cece_args if arg != "--"]
+
+    site = args.site or tempfile.mkdtemp()
+    try:
+        site_options = benchmarks.generate.get_site_options(args)
+        report = {
+            "site": site_options,
+            "cece_args": cece_args,
+            "counts": benchmarks.generate.generate_site(site, **site_options),
+            "results": run_benchmarks(site, cece_args, args.repeat)
+        }
+    finally:
+        if not args.site:
+            shutil.rmtree(site)
+
+    output = json.dumps(report, indent=4, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+.. module benchmarks.bench_markdown
+
+Compare the Markdown engines on a corpus of guides: the throughput of each
+engine, and whether its output is equivalent to that of the current engine.
+Output is compared after minification, so differences in whitespace between
+tags do not count. The corpus is every Markdown source in the guides of a
+site, which is generated unless one is given::
+
+    python -m benchmarks.bench_markdown --corpus path/to/site
+"""
+
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import argparse
+import benchmarks.generate
+import cece.compiler
+import cece.minify
+import fnmatch
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+
+
+def load_corpus(site):
+    """
+        Read every Markdown source in the guides of a site.
+
+        :param site: The directory of the site
+        :type site: string
+        :returns: The source of each file, by path relative to the guides
+    """
+
+    guides_dir = os.path.join(site, "guides")
+    corpus = {}
+    for dir_path, dir_names, file_names in os.walk(guides_dir):
+        for file_name in fnmatch.filter(file_names, "*.md"):
+            path = os.path.join(dir_path, file_name)
+            with io.open(path, "r", encoding="utf-8") as f:
+                corpus[os.path.relpath(path, guides_dir)] = f.read()
+    return corpus
+
+
+def measure_engine(name, corpus, repeat=1):
+    """
+        Render a corpus with an engine.
+
+        :param name: The name of the engine
+        :type name: string
+        :param corpus: The source of each file, by path
+        :type corpus: dict
+        :param repeat: The number of times to render the corpus
+        :type repeat: int
+        :returns: The measurements, and the output for each file
+    """
+
+    renderer = cece.compiler.create_renderer(name)
+    times = []
+    for i in range(repeat):
+        start = time.time()
+        output = dict((path, renderer.render(source)) for path, source in corpus.items())
+        times.append(time.time() - start)
+
+    size = sum(len(source.encode("utf-8")) for source in corpus.values())
+    wall_time = min(times)
+    return {
+        "wall_time": wall_time,
+        "files_per_second": len(corpus) / max(wall_time, 1e-9),
+        "megabytes_per_second": size / (1024.0 * 1024.0) / max(wall_time, 1e-9)
+    }, output
+
+
+def compare_outputs(baseline, output, max_differences=10):
+    """
+        Compare the output of an engine with the output of the baseline.
+
+        :param baseline: The baseline output, by path
+        :type baseline: dict
+        :param output: The output to compare, by path
+        :type output: dict
+        :param max_differences: The number of differing paths to report
+        :type max_differences: int
+        :returns: The comparison
+    """
+
+    different = sorted(
+        path for path in baseline
+        if cece.minify.minify_html(baseline[path]) != cece.minify.minify_html(output[path]))
+    return {
+        "equivalent_files": len(baseline) - len(different),
+        "different_files": len(different),
+        "different_paths": different[:max_differences]
+    }
+
+
+def run_benchmarks(corpus, engines, repeat=1):
+    """
+        Measure each engine and compare it with the first.
+
+        :param corpus: The source of each file, by path
+        :type corpus: dict
+        :param engines: The names of the engines, starting with the baseline
+        :type engines: list
+        :param repeat: The number of times to render the corpus
+        :type repeat: int
+        :returns: The results for each engine
+    """
+
+    results = {}
+    baseline = None
+    for name in engines:
+        if not cece.compiler.MARKDOWN_ENGINES[name].is_available():
+            results[name] = {"available": False}
+            continue
+        result, output = measure_engine(name, corpus, repeat)
+        result["available"] = True
+        if baseline is None:
+            baseline = output
+        else:
+            result.update(compare_outputs(baseline, output))
+        results[name] = result
+    return results
+
+
+def main(args=None):
+    """
+        Run the Markdown benchmark from the command line.
+
+        :param args: The command line arguments, or ``None`` to use
+            ``sys.argv``
+        :type args: list
+    """
+
+    arg_parser = argparse.ArgumentParser(
+        description="Compare the throughput and output of the Markdown engines.")
+    arg_parser.add_argument(
+        "--corpus", metavar="SITE",
+        help="use the guides of this site, instead of generating a site")
+    arg_parser.add_argument(
+        "--engine", action="append", dest="engines",
+        choices=sorted(cece.compiler.MARKDOWN_ENGINES),
+        help="an engine to measure; the first is the baseline (default: every engine, "
+        "compared with {})".format(cece.compiler.DEFAULT_MARKDOWN_ENGINE))
+    arg_parser.add_argument(
+        "--repeat", type=int, default=3, help="the number of times to render the corpus")
+    benchmarks.generate.add_arguments(arg_parser)
+    args = arg_parser.parse_args(args)
+
+    engines = args.engines or [cece.compiler.DEFAULT_MARKDOWN_ENGINE] + sorted(
+        set(cece.compiler.MARKDOWN_ENGINES) - set([cece.compiler.DEFAULT_MARKDOWN_ENGINE]))
+
+    site = args.corpus or tempfile.mkdtemp()
+    try:
+        report = {}
+        if not args.corpus:
+            report["site"] = benchmarks.generate.get_site_options(args)
+            benchmarks.generate.generate_site(site, **report["site"])
+        corpus = load_corpus(site)
+        report["files"] = len(corpus)
+        report["results"] = run_benchmarks(corpus, engines, args.repeat)
+    finally:
+        if not args.corpus:
+            shutil.rmtree(site)
+
+    print(json.dumps(report, indent=4, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+.. module benchmarks.bench_memory
+
+Measure the memory used by the parsed guide tree of a synthetic site. The
+tree is measured as the parser builds it, which includes every name, path and
+description. To compare the nodes with one dictionary per node, which is how
+the tree used to be represented, both representations are then built again
+from the parsed tree, sharing its strings, so each measurement only covers the
+nodes themselves. The defaults produce a tree of roughly two hundred thousand
+nodes. Requires Python 3 for ``tracemalloc``.
+"""
+
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import argparse
+import benchmarks.bench_build
+import benchmarks.generate
+import copy
+import gc
+import json
+import os
+import shutil
+import tempfile
+import tracemalloc
+
+
+def _copy_nodes(guides):
+    """
+        Copy the nodes of a parsed tree, sharing their field values other
+        than the lists of links.
+
+        :param guides: The parsed tree
+        :type guides: dict
+        :returns: The copied tree
+    """
+
+    result = {}
+    for path, node in guides.items():
+        node = copy.copy(node)
+        if node.type == "folder":
+            node.links = list(node.links)
+        result[path] = node
+    return result
+
+
+def _to_dicts(guides):
+    """
+        Convert a parsed tree to one dictionary per node.
+
+        :param guides: The parsed tree
+        :type guides: dict
+        :returns: The tree of dictionaries
+    """
+
+    result = {}
+    for path, node in guides.items():
+        data = {"type": node["type"]}
+        for field in node._fields:
+            data[field] = node[field]
+            if isinstance(data[field], list):
+                data[field] = list(data[field])
+        result[path] = data
+    return result
+
+
+def _measure(function, *args):
+    """
+        Measure the memory still allocated by the result of a function.
+
+        :param function: The function to call
+        :type function: function
+        :returns: The result and the bytes allocated for it
+    """
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = function(*args)
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return result, size
+
+
+def measure_tree(site, cece_args):
+    """
+        Parse a site and measure the memory used by its tree.
+
+        :param site: The directory of the site
+        :type site: string
+        :param cece_args: The command line arguments for cece
+        :type cece_args: list
+        :returns: The measurements, as a dictionary
+    """
+
+    import cece.main
+
+    cur_dir = os.getcwd()
+    os.chdir(site)
+    try:
+        args = cece.main._parse_args(cece_args)
+        config = cece.main._load_config(None)
+        guides, tree_size = _measure(cece.main._parse, args, config, None)
+    finally:
+        os.chdir(cur_dir)
+
+    # both copies share the strings of the parsed tree, so only the nodes
+    # and their lists of links are new allocations
+    nodes, node_size = _measure(_copy_nodes, guides)
+    del nodes
+    dicts, dict_size = _measure(_to_dicts, guides)
+    del dicts
+    count = float(len(guides))
+    return {
+        "nodes": len(guides),
+        "tree_bytes": tree_size,
+        "bytes_per_node": tree_size / count,
+        "node_bytes": node_size,
+        "dict_node_bytes": dict_size,
+        "node_bytes_per_node": node_size / count,
+        "dict_node_bytes_per_node": dict_size / count,
+        "saved_bytes_per_node": (dict_size - node_size) / count,
+        "dict_to_node_ratio": dict_size / float(node_size),
+        "peak_rss_kb": benchmarks.bench_build._get_peak_rss()
+    }
+
+
+def main(args=None):
+    """
+        Run the memory benchmark from the command line.
+
+        :param args: The command line arguments, or ``None`` to use
+            ``sys.argv``
+        :type args: list
+    """
+
+    arg_parser = argparse.ArgumentParser(
+        description="Measure the memory used by the parsed tree of a synthetic site.")
+    arg_parser.add_argument(
+        "--site", help="generate the site in this directory and keep it, "
+        "instead of using a temporary directory")
+    benchmarks.generate.add_arguments(arg_parser)
+    arg_parser.set_defaults(depth=4, fan_out=4, guides=2, variant_groups=4, variants=3,
+                            markdown_size=0)
+    args, cece_args = arg_parser.parse_known_args(args)
+    cece_args = [arg for arg in cece_args if arg != "--"]
+
+    site = args.site or tempfile.mkdtemp()
+    try:
+        site_options = benchmarks.generate.get_site_options(args)
+        benchmarks.generate.generate_site(site, **site_options)
+        report = {"site": site_options, "results": measure_tree(site, cece_args)}
+    finally:
+        if not args.site:
+            shutil.rmtree(site)
+
+    print(json.dumps(report, indent=4, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+.. module benchmarks.bench_minify
+
+Measure what minification saves and costs on a synthetic site: the size of the
+pages and the time of a cold compile, with and without ``--minify``. Any
+arguments that are not benchmark options are passed to cece.
+"""
+
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import argparse
+import benchmarks.bench_build
+import benchmarks.generate
+import json
+import os
+import shutil
+import tempfile
+
+
+def _get_page_bytes(site):
+    """
+        Get the total size of the pages in the build directory of a site.
+
+        :param site: The directory of the site
+        :type site: string
+        :returns: The size, in bytes
+    """
+
+    size = 0
+    for dir_path, dir_names, file_names in os.walk(os.path.join(site, "build")):
+        for file_name in file_names:
+            if file_name.endswith(".html"):
+                size += os.path.getsize(os.path.join(dir_path, file_name))
+    return size
+
+
+def run_benchmarks(site, cece_args, repeat=1):
+    """
+        Compile a site cold with and without minification.
+
+        :param site: The directory of the site
+        :type site: string
+        :param cece_args: The command line arguments for cece
+        :type cece_args: list
+        :param repeat: The number of times to repeat each measurement
+        :type repeat: int
+        :returns: The results of each measurement, and the relative savings
+    """
+
+    results = {}
+    for name, args in (("plain", cece_args), ("minified", cece_args + ["--minify"])):
+        times = []
+        for i in range(repeat):
+            # the markdown cache is kept, so both measure rendering and writing
+            shutil.rmtree(os.path.join(site, "build"), ignore_errors=True)
+            times.append(benchmarks.bench_build.measure(site, "compile", args)["wall_time"])
+        results[name] = {"wall_time": min(times), "page_bytes": _get_page_bytes(site)}
+
+    plain, minified = results["plain"], results["minified"]
+    results["bytes_saved"] = plain["page_bytes"] - minified["page_bytes"]
+    results["bytes_saved_ratio"] = results["bytes_saved"] / float(plain["page_bytes"])
+    results["time_added"] = minified["wall_time"] - plain["wall_time"]
+    return results
+
+
+def main(args=None):
+    """
+        Run the minification benchmark from the command line.
+
+        :param args: The command line arguments, or ``None`` to use
+            ``sys.argv``
+        :type args: list
+    """
+
+    arg_parser = argparse.ArgumentParser(
+        description="Measure the bytes saved and time added by minification.")
+    arg_parser.add_argument(
+        "--site", help="generate the site in this directory and keep it, "
+        "instead of using a temporary directory")
+    arg_parser.add_argument(
+        "--repeat", type=int, default=3, help="the number of runs of each measurement")
+    benchmarks.generate.add_arguments(arg_parser)
+    args, cece_args = arg_parser.parse_known_args(args)
+    cece_args = [arg for arg in cece_args if arg != "--"]
+
+    site = args.site or tempfile.mkdtemp()
+    try:
+        site_options = benchmarks.generate.get_site_options(args)
+        benchmarks.generate.generate_site(site, **site_options)
+        # warm the markdown cache, so it does not count against either run
+        benchmarks.bench_build.measure(site, "compile", cece_args)
+        report = {
+            "site": site_options,
+            "cece_args": cece_args,
+            "results": run_benchmarks(site, cece_args, args.repeat)
+        }
+    finally:
+        if not args.site:
+            shutil.rmtree(site)
+
+    print(json.dumps(report, indent=4, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
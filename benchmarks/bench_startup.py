@@ -0,0 +1,143 @@
+"""
+.. module benchmarks.bench_startup
+
+Measure how long cece takes to start: the time to import each of its modules,
+and the wall time of short commands run through ``python -m cece`` against a
+synthetic site. Every measurement runs in a fresh interpreter, and the time of
+an interpreter that does nothing is reported alongside, as the floor that no
+change to cece can go below.
+
+Any arguments that are not benchmark options are passed to cece's ``build``
+command, for example::
+
+    python -m benchmarks.bench_startup --repeat 10 -- --no-cache
+"""
+
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import argparse
+import benchmarks.generate
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+
+MODULES = ["cece", "cece.main", "cece.parser", "cece.compiler", "cece.watch"]
+"""
+    The modules whose import time is measured.
+"""
+
+COMMANDS = [["version"], ["--help"], ["check"], ["build", "--incremental"], ["clean"]]
+"""
+    The commands whose wall time is measured, in the order they are run. The
+    site is built once before they are run, so the incremental build has
+    nothing to do. Clean runs last, as it removes the build and the caches.
+"""
+
+_ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+"""
+    The directory that contains the cece package.
+"""
+
+
+def _time_process(args, cwd=None, repeat=1):
+    """
+        Time a Python process from start to exit, taking the fastest of
+        several runs.
+
+        :param args: The arguments to the interpreter
+        :type args: list
+        :param cwd: The directory to run the process in
+        :type cwd: string
+        :param repeat: The number of runs
+        :type repeat: int
+        :returns: The fastest wall time, in seconds
+    """
+
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [_ROOT_DIR, env.get("PYTHONPATH")]))
+    times = []
+    with open(os.devnull, "w") as devnull:
+        for i in range(repeat):
+            start = time.time()
+            subprocess.check_call([sys.executable] + args, cwd=cwd, env=env, stdout=devnull)
+            times.append(time.time() - start)
+    return min(times)
+
+
+def run_benchmarks(site, cece_args, repeat=1):
+    """
+        Measure the import time of each module and the wall time of each
+        command. The import time of a module includes the interpreter's own
+        startup, which is reported as ``interpreter``.
+
+        :param site: The directory of the site
+        :type site: string
+        :param cece_args: The command line arguments for the build command
+        :type cece_args: list
+        :param repeat: The number of times to repeat each measurement
+        :type repeat: int
+        :returns: The fastest wall time of each measurement, in seconds
+    """
+
+    results = {
+        "interpreter": _time_process(["-c", "pass"], repeat=repeat),
+        "imports": {},
+        "commands": {}
+    }
+    for module in MODULES:
+        results["imports"][module] = _time_process(["-c", "import " + module], repeat=repeat)
+
+    # build once, so the caches are warm and the incremental build is a no-op
+    _time_process(["-m", "cece", "build"] + cece_args, cwd=site)
+    for command in COMMANDS:
+        if command[0] == "build":
+            command = command + cece_args
+        results["commands"][" ".join(command)] = _time_process(
+            ["-m", "cece"] + command, cwd=site, repeat=repeat)
+    return results
+
+
+def main(args=None):
+    """
+        Run the startup benchmark from the command line.
+
+        :param args: The command line arguments, or ``None`` to use
+            ``sys.argv``
+        :type args: list
+    """
+
+    arg_parser = argparse.ArgumentParser(
+        description="Measure the import time of cece and the wall time of short commands.")
+    arg_parser.add_argument(
+        "--site", help="generate the site in this directory and keep it, "
+        "instead of using a temporary directory")
+    arg_parser.add_argument(
+        "--repeat", type=int, default=5, help="the number of runs of each measurement")
+    benchmarks.generate.add_arguments(arg_parser)
+    args, cece_args = arg_parser.parse_known_args(args)
+    cece_args = [arg for arg in cece_args if arg != "--"]
+
+    site = args.site or tempfile.mkdtemp()
+    try:
+        site_options = benchmarks.generate.get_site_options(args)
+        benchmarks.generate.generate_site(site, **site_options)
+        report = {
+            "site": site_options,
+            "cece_args": cece_args,
+            "results": run_benchmarks(site, cece_args, args.repeat)
+        }
+    finally:
+        if not args.site:
+            shutil.rmtree(site)
+
+    print(json.dumps(report, indent=4, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+.. module benchmarks.generate
+
+Generate synthetic sites for benchmarking. A site is a tree of folders with
+guides at every level, where each guide has a variant file for every
+combination of variants.
+"""
+
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import argparse
+import io
+import itertools
+import os
+import random
+import yaml
+
+
+_WORDS = (
+    "install configure run build deploy test package server client python linux mac "
+    "windows network database cache file directory command option value setting user "
+    "project module function class method request response error log version update"
+).split()
+
+
+def _make_markdown(rng, size):
+    """
+        Make a Markdown document of roughly the given size, with headings,
+        paragraphs, lists and code blocks.
+
+        :param rng: The random number generator
+        :type rng: random.Random
+        :param size: The approximate size of the document, in bytes
+        :type size: int
+        :returns: The document
+    """
+
+    parts = []
+    length = 0
+    while length < size:
+        kind = rng.randint(0, 5)
+        if kind == 0:
+            part = "## {}\n".format(" ".join(rng.sample(_WORDS, 3)).title())
+        elif kind == 1:
+            part = "".join("* {}\n".format(" ".join(rng.sample(_WORDS, 5))) for i in range(4))
+        elif kind == 2:
+            part = "    $ {} --{}\n".format(*rng.sample(_WORDS, 2))
+        else:
+            part = "{} *{}* [{}](http://example.com/{}).\n".format(
+                " ".join(rng.choice(_WORDS) for i in range(30)).capitalize(),
+                *rng.sample(_WORDS, 3))
+        parts.append(part)
+        length += len(part) + 1
+    return "\n".join(parts)
+
+
+def _write(path, contents):
+    """
+        Write a file, creating its directory.
+
+        :param path: The path of the file
+        :type path: string
+        :param contents: The contents of the file
+        :type contents: string
+    """
+
+    if not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    with io.open(path, "w", encoding="utf-8") as f:
+        f.write(contents)
+
+
+def generate_site(path, depth=3, fan_out=4, guides=3, variant_groups=2, variants=3,
+                  markdown_size=4096, seed=0):
+    """
+        Generate a synthetic site.
+
+        :param path: The directory to generate the site in
+        :type path: string
+        :param depth: The depth of the folder tree
+        :type depth: int
+        :param fan_out: The number of child folders of each folder
+        :type fan_out: int
+        :param guides: The number of guides in each folder
+        :type guides: int
+        :param variant_groups: The number of variant groups of each guide
+        :type variant_groups: int
+        :param variants: The number of variants in each variant group
+        :type variants: int
+        :param markdown_size: The approximate size of each variant file, in
+            bytes
+        :type markdown_size: int
+        :param seed: The seed for the random content
+        :type seed: int
+        :returns: The number of folders, guides and variant files generated
+    """
+
+    rng = random.Random(seed)
+    group_keys = ["group{}".format(i) for i in range(variant_groups)]
+    config = {
+        "site_title": "Benchmark Site",
+        "variant_groups": dict(
+            (key, {"name": key.title(), "variants": [
+                {"id": "{}v{}".format(key, j), "name": "{} {}".format(key.title(), j)}
+                for j in range(variants)]})
+            for key in group_keys)
+    }
+    _write(os.path.join(path, "config.yaml"), yaml.safe_dump(config))
+
+    counts = {"folders": 0, "guides": 0, "files": 0}
+    combinations = list(itertools.product(*[
+        [variant["id"] for variant in config["variant_groups"][key]["variants"]]
+        for key in group_keys]))
+
+    def generate_folder(folder_path, level):
+        if folder_path:
+            _write(os.path.join(folder_path, "folder_meta.yaml"), yaml.safe_dump({
+                "name": "Folder {}".format(os.path.basename(folder_path)),
+                "description": " ".join(rng.sample(_WORDS, 8))}))
+            counts["folders"] += 1
+
+        for i in range(guides):
+            guide_path = os.path.join(folder_path, "guide{}".format(i))
+            _write(os.path.join(guide_path, "guide_meta.yaml"), yaml.safe_dump({
+                "name": "Guide {} {}".format(i, rng.choice(_WORDS)),
+                "description": " ".join(rng.sample(_WORDS, 8)),
+                "variant_groups": group_keys}))
+            counts["guides"] += 1
+            for combination in combinations:
+                _write(os.path.join(guide_path, "-".join(combination) + ".md"),
+                       _make_markdown(rng, markdown_size))
+                counts["files"] += 1
+
+        if level < depth:
+            for i in range(fan_out):
+                generate_folder(os.path.join(folder_path, "folder{}".format(i)), level + 1)
+
+    generate_folder(os.path.join(path, "guides"), 0)
+    return counts
+
+
+def main(args=None):
+    """
+        Generate a synthetic site from the command line.
+
+        :param args: The command line arguments, or ``None`` to use
+            ``sys.argv``
+        :type args: list
+    """
+
+    arg_parser = argparse.ArgumentParser(description="Generate a synthetic site.")
+    arg_parser.add_argument("path", help="the directory to generate the site in")
+    add_arguments(arg_parser)
+    args = arg_parser.parse_args(args)
+    print(generate_site(args.path, **get_site_options(args)))
+
+
+def add_arguments(arg_parser):
+    """
+        Add the options that shape a synthetic site to an argument parser.
+
+        :param arg_parser: The argument parser
+        :type arg_parser: argparse.ArgumentParser
+    """
+
+    arg_parser.add_argument("--depth", type=int, default=3, help="the depth of the folder tree")
+    arg_parser.add_argument("--fan-out", type=int, default=4, help="child folders per folder")
+    arg_parser.add_argument("--guides", type=int, default=3, help="guides per folder")
+    arg_parser.add_argument(
+        "--variant-groups", type=int, default=2, help="variant groups per guide")
+    arg_parser.add_argument("--variants", type=int, default=3, help="variants per group")
+    arg_parser.add_argument(
+        "--markdown-size", type=int, default=4096, help="bytes of Markdown per variant file")
+    arg_parser.add_argument("--seed", type=int, default=0, help="the seed for random content")
+
+
+def get_site_options(args):
+    """
+        Get the keyword arguments for :func:`generate_site` from parsed
+        command line arguments.
+
+        :param args: The parsed arguments
+        :returns: The keyword arguments
+    """
+
+    return {
+        "depth": args.depth,
+        "fan_out": args.fan_out,
+        "guides": args.guides,
+        "variant_groups": args.variant_groups,
+        "variants": args.variants,
+        "markdown_size": args.markdown_size,
+        "seed": args.seed
+    }
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""
+.. module cece
+
+Cece is a static site generator for how to sites.
+"""
+
+__version__ = "0.1.0"
+"""
+    The version of cece.
+"""
+
+DEFAULT_CACHE_DIR = ".cece_cache"
+"""
+    The default directory for caches, relative to the site directory.
+"""
+
+STAGING_DIR = "build.staging"
+"""
+    The directory a full build is written to before it replaces the build
+    directory.
+"""
+
+OLD_BUILD_DIR = "build.old"
+"""
+    The directory the previous build is moved to while it is replaced.
+"""
@@ -0,0 +1,11 @@
+"""
+.. module cece.__main__
+
+Runs cece with ``python -m cece``.
+"""
+
+import cece.main
+
+
+if __name__ == "__main__":
+    cece.main.main()
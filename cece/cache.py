@@ -0,0 +1,261 @@
+"""
+.. module cece.cache
+
+Persistent caches that let repeated builds skip work whose inputs have not
+changed.
+"""
+
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import cece.util
+import hashlib
+import io
+import os
+import pickle
+import tempfile
+
+
+DEFAULT_CACHE_DIR = cece.DEFAULT_CACHE_DIR
+"""
+    The default directory for caches, relative to the site directory.
+"""
+
+
+class MarkdownCache(object):
+    """
+        A content addressed cache of Markdown converted to HTML. Entries are
+        keyed by a hash of the Markdown source and a salt, which should
+        identify the converter and its configuration. When the cache grows past
+        its maximum size, the least recently used entries are evicted.
+
+        :param directory: The directory to store the cache in
+        :type directory: string
+        :param salt: Identifies the converter and its configuration
+        :type salt: string
+        :param max_size: The maximum size of the cache, in bytes
+        :type max_size: int
+    """
+
+    def __init__(self, directory, salt, max_size):
+        self._directory = os.path.abspath(os.path.join(directory, "markdown"))
+        self._salt = salt
+        self._max_size = max_size
+
+    def _get_path(self, source):
+        """
+            Get the path of the entry for a Markdown source.
+
+            :param source: The Markdown source
+            :type source: string
+            :returns: The path of the entry
+        """
+
+        digest = hashlib.sha256(cece.util.encode_text(self._salt))
+        digest.update(b"\0")
+        digest.update(cece.util.encode_text(source))
+        key = digest.hexdigest()
+        return os.path.join(self._directory, key[:2], key + ".html")
+
+    def get(self, source):
+        """
+            Get the converted HTML for a Markdown source.
+
+            :param source: The Markdown source
+            :type source: string
+            :returns: The converted HTML, or ``None`` if it is not cached
+        """
+
+        path = self._get_path(source)
+        try:
+            with io.open(path, "r", encoding="utf-8") as f:
+                html = f.read()
+        except (IOError, OSError):
+            return None
+
+        # mark the entry as recently used
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return html
+
+    def set(self, source, html):
+        """
+            Store the converted HTML for a Markdown source. The entry is
+            written to a temporary file and renamed into place, so concurrent
+            builds never see a partial entry.
+
+            :param source: The Markdown source
+            :type source: string
+            :param html: The converted HTML
+            :type html: string
+        """
+
+        path = self._get_path(source)
+        cece.util.makedirs(os.path.dirname(path))
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with io.open(fd, "w", encoding="utf-8") as f:
+            f.write(html)
+        cece.util.replace_file(temp_path, path)
+
+    def evict(self):
+        """
+            Remove the least recently used entries until the cache is no
+            larger than its maximum size.
+        """
+
+        entries = []
+        total_size = 0
+        for dir_path, dir_names, file_names in os.walk(self._directory):
+            for file_name in file_names:
+                path = os.path.join(dir_path, file_name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total_size += stat.st_size
+
+        entries.sort()
+        for mtime, size, path in entries:
+            if total_size <= self._max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total_size -= size
+
+
+class _PickleCache(object):
+    """
+        The base for caches kept as a single pickled file of entries. The file
+        is loaded when the cache is created and written back by :meth:`save`,
+        keeping only the entries used since it was loaded. The whole file is
+        discarded when its salt changes.
+
+        :param path: The path of the file
+        :type path: string
+        :param salt: Identifies everything the entries depend on other than
+            what each entry is validated against
+        :type salt: string
+    """
+
+    def __init__(self, path, salt=None):
+        self._path = os.path.abspath(path)
+        self._salt = salt
+        self._entries = {}
+        self._used_entries = {}
+        self._changed = False
+        try:
+            with open(self._path, "rb") as f:
+                file_salt, entries = pickle.load(f)
+            if file_salt == salt:
+                self._entries = entries
+        except Exception:
+            # a missing or unreadable file is just empty
+            pass
+
+    def _use(self, key, entry):
+        """
+            Mark an entry as used. Using an entry other than the one that was
+            loaded changes the cache.
+
+            :param key: The key of the entry
+            :param entry: The entry
+        """
+
+        if self._entries.get(key) is not entry:
+            self._changed = True
+        self._used_entries[key] = entry
+
+    def save(self):
+        """
+            Write the cache to disk, if anything changed since it was loaded.
+        """
+
+        if not self._changed and len(self._used_entries) == len(self._entries):
+            return
+        cece.util.makedirs(os.path.dirname(self._path))
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(self._path))
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump((self._salt, self._used_entries), f, pickle.HIGHEST_PROTOCOL)
+        cece.util.replace_file(temp_path, self._path)
+
+
+class MetadataCache(_PickleCache):
+    """
+        A cache of parsed yaml files, keyed by path and validated against the
+        modification time and size of the file.
+
+        :param directory: The directory to store the cache in
+        :type directory: string
+    """
+
+    def __init__(self, directory):
+        super(MetadataCache, self).__init__(os.path.join(directory, "metadata.pickle"))
+
+    def load(self, path):
+        """
+            Load a yaml file, using the cached contents if the file has not
+            changed. Each call returns a new copy of the contents.
+
+            :param path: Path to the yaml file
+            :type path: string
+            :returns: The parsed yaml file contents
+        """
+
+        path = os.path.abspath(path)
+        signature = cece.util.get_file_signature(path)
+
+        entry = self._entries.get(path)
+        if entry is None or entry[0] != signature:
+            data = cece.util.load_yaml_file(path)
+            entry = (signature, pickle.dumps(data, pickle.HIGHEST_PROTOCOL))
+        else:
+            data = pickle.loads(entry[1])
+        self._use(path, entry)
+        return data
+
+
+class ParseSnapshot(_PickleCache):
+    """
+        A snapshot of the parsed guide tree, kept per directory, so a later
+        parse can load a directory that has not changed without listing it or
+        reading its meta file. The entries are opaque to the snapshot, and
+        the parser checks that each one is still valid. The salt should
+        identify everything the parse depends on other than the directories
+        themselves.
+
+        :param directory: The directory to store the snapshot in
+        :type directory: string
+        :param salt: Identifies the parser and its configuration
+        :type salt: string
+    """
+
+    def __init__(self, directory, salt):
+        super(ParseSnapshot, self).__init__(os.path.join(directory, "parse.pickle"), salt)
+
+    def get(self, path):
+        """
+            Get the entry for a directory from the snapshot.
+
+            :param path: The path of the directory
+            :type path: string
+            :returns: The entry, or ``None`` if there is none
+        """
+
+        return self._entries.get(path)
+
+    def set(self, path, entry):
+        """
+            Set the entry for a directory, marking it as used. Setting the
+            entry that was loaded marks it as used without changing it.
+
+            :param path: The path of the directory
+            :type path: string
+            :param entry: The entry
+        """
+
+        self._use(path, entry)
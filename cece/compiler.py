@@ -8,12 +8,429 @@ the file system.
 from __future__ import print_function
 from __future__ import unicode_literals
 
+import cece.cache
+import cece.instrument
+import cece.minify
+import cece.search
 import cece.util
+import fnmatch
 import future.utils
+import gzip
+import hashlib
+import importlib
+import io
+import itertools
 import jinja2
+import json
 import markdown
+import multiprocessing
 import os
+import re
 import shutil
+import time
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+MANIFEST_NAME = "manifest.json"
+"""
+    The name of the build manifest, stored in the cache directory. It maps
+    every output path to a digest of the inputs it was rendered from.
+"""
+
+STAGING_DIR = cece.STAGING_DIR
+"""
+    The directory a full build is written to before it replaces the build
+    directory.
+"""
+
+OLD_BUILD_DIR = cece.OLD_BUILD_DIR
+"""
+    The directory the previous build is moved to while it is replaced.
+"""
+MARKDOWN_EXTENSIONS = []
+"""
+    The extensions the Python-Markdown converter is created with.
+"""
+
+MARKDOWN_EXTENSION_CONFIGS = {}
+"""
+    The configuration of the Python-Markdown extensions.
+"""
+
+DEFAULT_MARKDOWN_ENGINE = "markdown"
+"""
+    The Markdown engine used when the configuration does not name one with
+    ``markdown_engine``.
+"""
+
+WRITE_BUFFER_SIZE = 64 * 1024
+"""
+    The size of the buffer output files are written through, in bytes.
+"""
+
+STREAM_CHUNK_SIZE = 4
+"""
+    The number of streamed nodes sent to a worker process at a time.
+"""
+
+DEFAULT_CACHE_SIZE = 256 * 1024 * 1024
+"""
+    The default maximum size of the Markdown cache, in bytes.
+"""
+
+PRECOMPRESS_EXTENSIONS = {"gzip": ".gz", "brotli": ".br"}
+"""
+    The extension of the precompressed copy of an output file, by format.
+"""
+
+_INCLUDE_RE = re.compile(r"^!include[ \t]+(_[^/\\\s]+\.md)[ \t\r]*$", re.MULTILINE)
+"""
+    Matches a line that includes a snippet, such as ``!include _install.md``,
+    capturing the file name of the snippet.
+"""
+
+_TEMPLATE_OPTIONS = {"auto_reload": False, "trim_blocks": True, "lstrip_blocks": True}
+"""
+    The options of the template environment. Templates are resolved once per
+    build, so there is no need to check whether they changed on disk, and block
+    tags do not leave their line and indentation behind in the output.
+"""
+
+_worker_compiler = None
+"""
+    The compiler used by the current worker process in a parallel build.
+"""
+
+
+class CompilingException(Exception):
+    """
+        An exception that is thrown when the guides cannot be compiled with
+        the given configuration.
+
+        :param message: The error message
+        :type message: string
+    """
+
+
+class Renderer(object):
+    """
+        The interface of a Markdown engine. A renderer converts Markdown
+        sources to HTML, and identifies its version and options so that
+        converted HTML is never reused across engines.
+    """
+
+    name = None
+    """
+        The name the engine is chosen by, with ``markdown_engine`` in the
+        configuration.
+    """
+
+    package = None
+    """
+        The package the engine requires.
+    """
+
+    module = None
+    """
+        The module of the engine, which is only imported once the engine is
+        used, or ``None`` if it is always imported.
+    """
+
+    @classmethod
+    def get_module(cls):
+        """
+            Import the module of the engine.
+
+            :returns: The module, or ``None`` if the package the engine
+                requires is not installed
+        """
+
+        try:
+            return importlib.import_module(cls.module)
+        except ImportError:
+            return None
+
+    @classmethod
+    def is_available(cls):
+        """
+            Check whether the package the engine requires is installed.
+
+            :returns: Whether the engine can be used
+        """
+
+        return cls.module is None or cls.get_module() is not None
+
+    def get_salt(self):
+        """
+            Get the salt for the Markdown cache and the build manifest, which
+            identifies the engine, its version and its options.
+
+            :returns: The salt
+        """
+
+        raise NotImplementedError()
+
+    def render(self, source):
+        """
+            Convert a Markdown source to HTML.
+
+            :param source: The Markdown source
+            :type source: string
+            :returns: The HTML
+        """
+
+        raise NotImplementedError()
+
+
+class PythonMarkdownRenderer(Renderer):
+    """
+        Converts Markdown with Python-Markdown, using
+        :data:`MARKDOWN_EXTENSIONS`.
+    """
+
+    name = "markdown"
+    package = "Markdown"
+
+    def __init__(self):
+        self._markdown = markdown.Markdown(
+            extensions=MARKDOWN_EXTENSIONS, extension_configs=MARKDOWN_EXTENSION_CONFIGS)
+
+    def get_salt(self):
+        version = getattr(markdown, "version", None) or markdown.__version__
+        return json.dumps({
+            "version": version,
+            "extensions": MARKDOWN_EXTENSIONS,
+            "extension_configs": MARKDOWN_EXTENSION_CONFIGS
+        }, sort_keys=True)
+
+    def render(self, source):
+        return self._markdown.reset().convert(source)
+
+
+class MarkdownItRenderer(Renderer):
+    """
+        Converts Markdown with markdown-it-py, following the CommonMark
+        specification.
+    """
+
+    name = "markdown-it"
+    package = "markdown-it-py"
+    module = "markdown_it"
+
+    def __init__(self):
+        self._markdown = self.get_module().MarkdownIt("commonmark")
+
+    def get_salt(self):
+        return json.dumps(
+            {"engine": self.name, "version": self.get_module().__version__}, sort_keys=True)
+
+    def render(self, source):
+        return self._markdown.render(source)
+
+
+class MistuneRenderer(Renderer):
+    """
+        Converts Markdown with mistune, version 2 or later, which mostly
+        follows the CommonMark specification. Raw HTML is passed through, as
+        it is by the other engines.
+    """
+
+    name = "mistune"
+    package = "mistune"
+    module = "mistune"
+
+    @classmethod
+    def is_available(cls):
+        return hasattr(cls.get_module(), "create_markdown")
+
+    def __init__(self):
+        self._markdown = self.get_module().create_markdown(escape=False)
+
+    def get_salt(self):
+        return json.dumps(
+            {"engine": self.name, "version": self.get_module().__version__}, sort_keys=True)
+
+    def render(self, source):
+        return self._markdown(source)
+
+
+class CmarkRenderer(Renderer):
+    """
+        Converts Markdown with cmark-gfm, the C reference implementation of
+        CommonMark, through cmarkgfm. This is much faster than the pure Python
+        engines. Raw HTML is passed through, as it is by the other engines.
+    """
+
+    name = "cmark"
+    package = "cmarkgfm"
+    module = "cmarkgfm.cmark"
+
+    def __init__(self):
+        self._cmark = self.get_module()
+
+    def get_salt(self):
+        cmark = self._cmark._cmark
+        version = cmark.ffi.string(cmark.lib.cmark_version_string()).decode("ascii")
+        return json.dumps({"engine": self.name, "version": version}, sort_keys=True)
+
+    def render(self, source):
+        return self._cmark.markdown_to_html(
+            source, options=self._cmark.Options.CMARK_OPT_UNSAFE)
+
+
+MARKDOWN_ENGINES = dict(
+    (renderer.name, renderer)
+    for renderer in (PythonMarkdownRenderer, CmarkRenderer, MarkdownItRenderer, MistuneRenderer))
+"""
+    The available renderers, by the name of their engine.
+"""
+
+
+def create_renderer(name=DEFAULT_MARKDOWN_ENGINE):
+    """
+        Create the renderer for a Markdown engine.
+
+        :param name: The name of the engine, from :data:`MARKDOWN_ENGINES`
+        :type name: string
+        :returns: The renderer
+        :raises CompilingException: If the engine is unknown or its package is
+            not installed
+    """
+
+    renderer = MARKDOWN_ENGINES.get(name)
+    if renderer is None:
+        raise CompilingException("Unknown Markdown engine \"{}\", expected one of: {}".format(
+            name, ", ".join(sorted(MARKDOWN_ENGINES))))
+    if not renderer.is_available():
+        raise CompilingException("The Markdown engine \"{}\" requires the {} package".format(
+            name, renderer.package))
+    return renderer()
+
+
+def _create_template_env(template_modules=None, cache_dir=None):
+    """
+        Create the template environment. Templates are loaded from the cece
+        package, with their bytecode cached in the cache directory if one is
+        given, or from a directory of precompiled template modules.
+
+        :param template_modules: The directory of precompiled templates
+        :type template_modules: string
+        :param cache_dir: The directory to cache template bytecode in
+        :type cache_dir: string
+        :returns: The template environment
+    """
+
+    bytecode_cache = None
+    if template_modules:
+        loader = jinja2.ModuleLoader(template_modules)
+    else:
+        loader = jinja2.PackageLoader("cece", "templates")
+        if cache_dir:
+            bytecode_dir = os.path.join(cache_dir, "templates")
+            cece.util.makedirs(bytecode_dir)
+            # the bytecode depends on the options as well as the source
+            options_digest = hashlib.sha1(cece.util.encode_text(
+                json.dumps(_TEMPLATE_OPTIONS, sort_keys=True))).hexdigest()[:8]
+            bytecode_cache = jinja2.FileSystemBytecodeCache(
+                bytecode_dir, "__jinja2_%s_{}.cache".format(options_digest))
+
+    return jinja2.Environment(loader=loader, bytecode_cache=bytecode_cache, **_TEMPLATE_OPTIONS)
+
+
+def _compress_gzip(data):
+    """
+        Compress data with gzip at maximum compression. The header has no
+        modification time, so the same data always compresses the same way.
+
+        :param data: The data to compress
+        :type data: bytes
+        :returns: The compressed data
+    """
+
+    buf = io.BytesIO()
+    with gzip.GzipFile(fileobj=buf, mode="wb", compresslevel=9, mtime=0) as f:
+        f.write(data)
+    return buf.getvalue()
+
+
+def _compress_brotli(data):
+    """
+        Compress data with brotli at maximum compression.
+
+        :param data: The data to compress
+        :type data: bytes
+        :returns: The compressed data
+    """
+
+    return brotli.compress(data, quality=11)
+
+
+_COMPRESSORS = {"gzip": _compress_gzip, "brotli": _compress_brotli}
+
+
+def compile_templates(target):
+    """
+        Precompile the bundled templates into Python modules, which can be
+        loaded without parsing the templates by passing the target directory
+        to the compiler as ``template_modules``.
+
+        :param target: The directory to write the modules to
+        :type target: string
+    """
+
+    _create_template_env().compile_templates(target, zip=None)
+
+
+def _init_worker(config, guides, options, previous_dir, profile):
+    """
+        Initialize a worker process for a parallel build. Each worker has its
+        own compiler, and with it its own Markdown instance and template
+        environment.
+
+        :param config: The configuration
+        :type config: dict
+        :param guides: The parsed set of guides to output
+        :type guides: dict
+        :param options: The keyword arguments the parent compiler was created
+            with
+        :type options: dict
+        :param previous_dir: The directory of the previous build, when
+            writing a full build to the staging directory
+        :type previous_dir: string
+        :param profile: Whether to collect a profile of the build
+        :type profile: bool
+    """
+
+    global _worker_compiler
+    _worker_compiler = Compiler(config, guides, **options)
+    _worker_compiler._previous_dir = previous_dir
+    if profile:
+        _worker_compiler._profile = cece.instrument.Profile()
+
+
+def _compile_entry(entry):
+    """
+        Compile a single node in a worker process.
+
+        :param entry: The path of the node, the digest of its previous output
+            and, when the worker's guides are incomplete, the nodes needed to
+            render it
+        :type entry: tuple
+        :returns: The path of the node, the digest of its output, its entry
+            in the search index if it was indexed, and the profile data
+            collected while compiling it
+    """
+
+    path, previous_digest, nodes = entry
+    if nodes:
+        _worker_compiler._guides.update(nodes)
+    digest = _worker_compiler._compile_node(path, previous_digest)
+    return (path, digest, _worker_compiler._search_pages.pop(path, None),
+            _worker_compiler._profile.pop_data())
 
 
 class Compiler(object):
@@ -24,14 +441,71 @@ class Compiler(object):
         :type config: dict
         :param guides: The parsed set of guides to output
         :type guides: dict
+        :param incremental: Keep the existing build and only re-render outputs
+            whose inputs changed since the last build. This needs the
+            manifest of the last build, so without a cache directory only
+            the builds after the compiler's first one are incremental.
+        :type incremental: bool
+        :param jobs: The number of processes to compile with
+        :type jobs: int
+        :param cache_dir: The directory to cache converted Markdown in and to
+            keep the manifest and the search index state in between builds,
+            or ``None`` to disable the cache
+        :type cache_dir: string
+        :param cache_size: The maximum size of the Markdown cache, in bytes
+        :type cache_size: int
+        :param template_modules: The directory of templates precompiled with
+            :func:`compile_templates`, or ``None`` to use the bundled templates
+        :type template_modules: string
+        :param precompress: The formats to write a precompressed copy of
+            every output file in, from :data:`PRECOMPRESS_EXTENSIONS`.
+            ``"brotli"`` requires the brotli package.
+        :type precompress: list
+        :param minify: Whether to minify every page before it is written
+        :type minify: bool
+        :param search_index: Whether to write a search index of the pages, as
+            described in :mod:`cece.search`
+        :type search_index: bool
+        :param profile: The profile to record timings and counters in
+        :type profile: cece.instrument.Profile
     """
 
-    def __init__(self, config, guides):
+    def __init__(self, config, guides, incremental=False, jobs=1, cache_dir=None,
+                 cache_size=DEFAULT_CACHE_SIZE, template_modules=None, precompress=(),
+                 minify=False, search_index=False, profile=None):
         self._config = config
         self._guides = guides
-        self._markdown = markdown.Markdown()
-        self._template_env = jinja2.Environment(loader=jinja2.PackageLoader("cece", "templates"))
+        self._profile = profile or cece.instrument.NullProfile()
+        self._incremental = incremental
+        self._jobs = jobs
+        self._options = {
+            "incremental": incremental,
+            "cache_dir": cache_dir and os.path.abspath(cache_dir),
+            "cache_size": cache_size,
+            "template_modules": template_modules and os.path.abspath(template_modules),
+            "precompress": sorted(precompress),
+            "minify": minify,
+            "search_index": search_index
+        }
+        self._renderer = create_renderer(
+            (config or {}).get("markdown_engine", DEFAULT_MARKDOWN_ENGINE))
+        self._markdown_cache = None
+        if cache_dir:
+            self._markdown_cache = cece.cache.MarkdownCache(
+                self._options["cache_dir"], self._renderer.get_salt(), cache_size)
+        self._template_env = _create_template_env(
+            self._options["template_modules"], self._options["cache_dir"])
         self._template_env.globals["make_id_url"] = self._make_id_url
+        self._template_env.globals["navigation"] = self._render_navigation
+        self._templates = {}
+        self._navigation = {}
+        self._base_digest = None
+        self._source_digests = {}
+        self._snippets = {}
+        self._manifest = None
+        self._search_index = None
+        self._search_pages = {}
+        self._previous_dir = None
 
     def _make_id_url(self, id):
         """
@@ -43,32 +517,719 @@ class Compiler(object):
 
         return "/{}/".format(id.replace("\\", "/"))
 
-    def compile(self):
+    def _render_navigation(self, ids):
+        """
+            Render a list of links to nodes, such as a node's breadcrumbs or a
+            folder's links. The rendered fragment is cached by the ids it links
+            to, so the breadcrumbs shared by every page below a folder are only
+            rendered once. A cached fragment is rendered again if the short
+            name of any node it links to changed.
+
+            :param ids: The ids of the nodes to link to
+            :type ids: list
+            :returns: The rendered links
+        """
+
+        key = tuple(ids)
+        names = tuple(self._guides[id]["short_name"] for id in key)
+        cached = self._navigation.get(key)
+        if cached is not None and cached[0] == names:
+            return cached[1]
+
+        fragment = self._get_template("navigation.html").module.link_list(key, self._guides)
+        self._navigation[key] = (names, fragment)
+        self._profile.count("navigation_renders")
+        return fragment
+
+    def set_guides(self, guides):
+        """
+            Replace the guides to output, such as after the guides have been
+            parsed again. The next incremental compile only re-renders the
+            outputs the change affected.
+
+            :param guides: The parsed set of guides to output
+            :type guides: dict
+        """
+
+        self._guides = guides
+
+    def compile(self, paths=None, stream=False):
         """
             Compile the provided guides and write out the result to the file
             system.
+
+            :param paths: The paths of the nodes to compile in an incremental
+                build, or ``None`` to compile every node and remove the
+                outputs of nodes that no longer exist
+            :type paths: list
+            :param stream: Whether ``paths`` streams in every node from a
+                parse that is still running. Each path must be yielded once
+                its node and its ancestors are in the guides and, for a
+                folder, once its links are final. Nodes are compiled as they
+                arrive, and the outputs of nodes that no longer exist are
+                removed when the stream ends.
+            :type stream: bool
         """
 
-        # clean existing build
-        if os.path.isdir("build"):
-            shutil.rmtree("build")
-        os.mkdir("build")
+        # an incremental build updates the build directory in place, starting
+        # from the manifest of the previous build. a compiler that already
+        # built keeps its manifest. a full build is written to a staging
+        # directory, reusing the files of the previous build that did not
+        # change, and then swapped into place. without the manifest, the
+        # outputs of removed nodes are unknown, so the build is a full one.
+        manifest = self._manifest
+        if manifest is None and self._incremental:
+            manifest = self._load_manifest()
+        incremental = self._incremental and manifest is not None
+        if not incremental and not stream:
+            paths = None
+        search_index = None
+        complete = paths is None or stream
+        rerender = False
+        if incremental:
+            output_dir = "build"
+            cece.util.makedirs(output_dir)
+            if self._options["search_index"]:
+                search_index = self._search_index or cece.search.SearchIndex.load(
+                    self._get_state_path(cece.search.STATE_NAME))
+                # pages that are skipped would be missing from the index. the
+                # manifest is still needed to remove the outputs of nodes that
+                # no longer exist
+                rerender = search_index is None
+        else:
+            manifest = {}
+            output_dir = STAGING_DIR
+            if os.path.isdir(output_dir):
+                shutil.rmtree(output_dir)
+            os.mkdir(output_dir)
+            if os.path.isdir("build"):
+                self._previous_dir = os.path.abspath("build")
 
-        # move into the build directory
+        # move into the output directory
         cur_dir = os.getcwd()
-        os.chdir("build")
+        os.chdir(output_dir)
+        try:
+            # remove the outputs of nodes that no longer exist
+            new_manifest = {}
+            removed = []
+            if paths is None:
+                paths = self._guides
+                removed = self._remove_missing(manifest)
+            elif not stream:
+                new_manifest.update(manifest)
+
+            # compile the guides
+            previous = {} if rerender else manifest
+            if stream:
+                entries = ((path, previous.get(path)) for path in paths)
+            else:
+                entries = sorted((path, previous.get(path)) for path in paths)
+            if self._jobs > 1 and (stream or len(entries) > 1):
+                results = self._compile_parallel(entries, stream)
+            else:
+                results = [(path, self._compile_node(path, digest)) for path, digest in entries]
+            if stream:
+                removed = self._remove_missing(manifest)
+            new_manifest.update((path, digest) for path, digest in results if digest is not None)
+            self._profile.count("nodes", len(results))
+            self._manifest = new_manifest
+
+            # update the search index with the pages that were rendered
+            if self._options["search_index"]:
+                with self._profile.phase("search_index"):
+                    self._write_search_index(search_index, removed, incremental)
+            else:
+                # remove the index of an earlier build, which would be stale
+                if os.path.isdir(cece.search.INDEX_DIR):
+                    shutil.rmtree(cece.search.INDEX_DIR)
+                self._remove_state(cece.search.STATE_NAME)
+
+            # keep the markdown cache within its size limit. eviction walks
+            # the whole cache, so a build of a few paths, such as a rebuild in
+            # watch mode, leaves it to the next build of every node
+            if self._markdown_cache and complete:
+                self._markdown_cache.evict()
+        finally:
+            # move back to the starting directory
+            os.chdir(cur_dir)
+
+        # swap a full build into place
+        if not incremental:
+            self._swap_build()
+
+        # save the manifest for the next build
+        self._save_state(MANIFEST_NAME, json.dumps(new_manifest, sort_keys=True))
+
+    def _remove_missing(self, manifest):
+        """
+            Remove the outputs of the nodes in a manifest that are no longer
+            in the guides.
+
+            :param manifest: The manifest of the previous build
+            :type manifest: dict
+            :returns: The paths of the removed nodes
+        """
+
+        removed = [path for path in manifest if path not in self._guides]
+        for path in removed:
+            self._remove_output(path)
+        return removed
+
+    def _compile_parallel(self, entries, stream=False):
+        """
+            Compile nodes across a pool of worker processes. The entries are
+            split into chunks, and the results are returned in the same order
+            as the entries regardless of which worker finished first.
+
+            When streaming, the workers are started before the guides are
+            complete, so each entry is sent with the nodes it is rendered
+            from, and chunks are sent as the entries arrive.
+
+            :param entries: The path of each node and the digest of its
+                previous output
+            :type entries: iterable
+            :param stream: Whether the entries stream in from a running parse
+            :type stream: bool
+            :returns: The path of each node and the digest of its output
+        """
+
+        pool = multiprocessing.Pool(
+            self._jobs, _init_worker,
+            (self._config, {} if stream else self._guides, self._options, self._previous_dir,
+             self._profile.enabled))
+        try:
+            if stream:
+                # the entries are read here rather than by the pool, so an
+                # error in the parse is raised in this process, and are sent
+                # in small chunks, so workers are not left waiting on the parse
+                pending = []
+                chunk = []
+                for path, digest in entries:
+                    chunk.append((path, digest, self._get_render_nodes(path)))
+                    if len(chunk) == STREAM_CHUNK_SIZE:
+                        pending.append(pool.map_async(_compile_entry, chunk, len(chunk)))
+                        chunk = []
+                if chunk:
+                    pending.append(pool.map_async(_compile_entry, chunk, len(chunk)))
+                results = [result for chunk_result in pending for result in chunk_result.get()]
+            else:
+                chunksize = max(1, len(entries) // (self._jobs * 4))
+                results = pool.map(_compile_entry, (
+                    (path, digest, None) for path, digest in entries), chunksize)
+        finally:
+            pool.close()
+            pool.join()
+
+        for path, digest, search_page, profile_data in results:
+            if search_page is not None:
+                self._search_pages[path] = search_page
+            self._profile.merge(profile_data)
+        return [(path, digest) for path, digest, search_page, profile_data in results]
+
+    def _get_render_nodes(self, path):
+        """
+            Get the nodes needed to render a node: the node itself, its
+            ancestors and the nodes it links to.
+
+            :param path: The path of the node
+            :type path: string
+            :returns: The nodes, by path
+        """
+
+        node = self._guides[path]
+        return dict((id, self._guides[id]) for id in itertools.chain(
+            [path], node["breadcrumbs"], node.get("links", [])))
+
+    def _swap_build(self):
+        """
+            Replace the build directory with the staging directory. This is
+            two renames, so the build directory is only missing for the
+            moment between them rather than for the whole build.
+        """
+
+        if os.path.isdir(OLD_BUILD_DIR):
+            shutil.rmtree(OLD_BUILD_DIR)
+        if self._previous_dir:
+            os.rename("build", OLD_BUILD_DIR)
+        os.rename(STAGING_DIR, "build")
+        if self._previous_dir:
+            shutil.rmtree(OLD_BUILD_DIR)
+            self._previous_dir = None
+
+    def _write_output(self, path, chunks):
+        """
+            Write an output file from a stream of text chunks, unless its
+            contents did not change. The chunks are written through a buffer
+            to a temporary file, which is then moved into place by
+            :meth:`_replace_output`. If minification is on, the page is
+            rendered in full and minified before it is written, rather than
+            streamed.
+
+            :param path: The path of the file
+            :type path: string
+            :param chunks: The contents of the file
+            :type chunks: iterable
+            :returns: Whether the file changed
+        """
+
+        if self._options["minify"]:
+            chunks = self._minify(chunks)
+
+        # the chunks are generated while they are written, so time spent
+        # writing is taken out of the rendering time
+        start = time.time()
+        write_time = 0
+        temp_path = path + ".tmp"
+        with io.open(temp_path, "wb", buffering=WRITE_BUFFER_SIZE) as f:
+            for chunk in chunks:
+                data = cece.util.encode_text(chunk)
+                write_start = time.time()
+                f.write(data)
+                write_time += time.time() - write_start
+            write_start = time.time()
+        write_time += time.time() - write_start
+        self._profile.add_time("template_rendering", time.time() - start - write_time)
+        self._profile.count("bytes_written", os.path.getsize(temp_path))
+
+        return self._replace_output(temp_path, path)
+
+    def _replace_output(self, temp_path, path):
+        """
+            Move a newly written output file into place, unless its contents
+            did not change. An unchanged file keeps its modification time. In
+            a full build it is linked, or copied, from the previous build. The
+            precompressed copies of the file are written after it, and in an
+            incremental build, copies in formats that are not enabled are
+            removed.
+
+            :param temp_path: The path the file was written to
+            :type temp_path: string
+            :param path: The path of the file
+            :type path: string
+            :returns: Whether the file changed
+        """
+
+        with self._profile.phase("file_writes"):
+            changed = True
+            previous_path = None
+            if self._previous_dir:
+                previous_path = os.path.join(self._previous_dir, path)
+                if cece.util.files_equal(temp_path, previous_path):
+                    os.remove(temp_path)
+                    cece.util.link_file(previous_path, path)
+                    changed = False
+            elif cece.util.files_equal(temp_path, path):
+                os.remove(temp_path)
+                changed = False
+            if changed:
+                cece.util.replace_file(temp_path, path)
+
+        if self._options["precompress"]:
+            with self._profile.phase("precompression"):
+                self._write_precompressed(path, changed, previous_path)
+        if self._incremental:
+            # remove the copies in formats that were turned off, so a web
+            # server never serves them in place of the new file
+            for compress_format, extension in future.utils.viewitems(PRECOMPRESS_EXTENSIONS):
+                if (compress_format not in self._options["precompress"] and
+                        os.path.isfile(path + extension)):
+                    os.remove(path + extension)
+        return changed
+
+    def _write_search_index(self, search_index, removed, incremental):
+        """
+            Update the search index with the pages rendered by this build and
+            write the shards that changed. A full build writes every shard,
+            and the shards that did not change are kept from the previous
+            build.
+
+            :param search_index: The index of the previous build, or ``None``
+                to start a new one
+            :type search_index: cece.search.SearchIndex
+            :param removed: The paths of the nodes that no longer exist
+            :type removed: list
+            :param incremental: Whether the build updates the previous build
+                in place
+            :type incremental: bool
+        """
+
+        pages, self._search_pages = self._search_pages, {}
+        if search_index is None:
+            search_index = cece.search.SearchIndex()
+        prefixes = search_index.update(pages, removed)
+        if not incremental:
+            prefixes = search_index.get_prefixes()
+
+        cece.util.makedirs(cece.search.INDEX_DIR)
+        for prefix, shard in future.utils.viewitems(search_index.get_shards(prefixes)):
+            path = os.path.join(cece.search.INDEX_DIR, cece.search.get_shard_name(prefix))
+            if shard is None:
+                for extension in [""] + list(PRECOMPRESS_EXTENSIONS.values()):
+                    if os.path.isfile(path + extension):
+                        os.remove(path + extension)
+                continue
+            with open(path + ".tmp", "wb") as f:
+                f.write(cece.util.encode_text(json.dumps(shard, sort_keys=True)))
+            self._replace_output(path + ".tmp", path)
+
+        state_path = self._get_state_path(cece.search.STATE_NAME)
+        if state_path:
+            cece.util.makedirs(os.path.dirname(state_path))
+            search_index.save(state_path)
+        self._search_index = search_index
+
+    def _minify(self, chunks):
+        """
+            Render a page in full and minify it.
+
+            :param chunks: The contents of the page
+            :type chunks: iterable
+            :returns: The minified page, as a list of chunks
+        """
+
+        start = time.time()
+        html = "".join(chunks)
+        self._profile.add_time("template_rendering", time.time() - start)
+        with self._profile.phase("minification"):
+            return [cece.minify.minify_html(html)]
+
+    def _write_precompressed(self, path, changed, previous_path=None):
+        """
+            Write the precompressed copies of an output file next to it, such
+            as ``index.html.gz``, so a web server can serve them without
+            compressing on each request. The copies of an unchanged file are
+            kept, or linked from the previous build, and only compressed again
+            if they are missing.
+
+            :param path: The path of the output file
+            :type path: string
+            :param changed: Whether the output file changed
+            :type changed: bool
+            :param previous_path: The path of the file in the previous build,
+                when writing a full build to the staging directory
+            :type previous_path: string
+        """
+
+        data = None
+        for compress_format in self._options["precompress"]:
+            extension = PRECOMPRESS_EXTENSIONS[compress_format]
+            compressed_path = path + extension
+            if not changed:
+                if previous_path and os.path.isfile(previous_path + extension):
+                    cece.util.link_file(previous_path + extension, compressed_path)
+                    continue
+                if not previous_path and os.path.isfile(compressed_path):
+                    continue
+            if data is None:
+                with open(path, "rb") as f:
+                    data = f.read()
+            compressed = _COMPRESSORS[compress_format](data)
+            cece.util.write_file(compressed_path, compressed)
+            self._profile.count("bytes_written", len(compressed))
+
+    def _compile_node(self, path, previous_digest=None):
+        """
+            Compile a single node, based on its type.
+
+            :param path: The path of the node
+            :type path: string
+            :param previous_digest: The digest of the previous build's output
+            :type previous_digest: string
+            :returns: The digest of the output, or ``None`` if the node has no
+                output
+        """
+
+        node = self._guides[path]
+        if node["type"] == "folder":
+            return self._compile_folder(path, node, previous_digest)
+        elif node["type"] == "page":
+            return self._compile_page(path, node, previous_digest)
+        elif node["type"] == "asset":
+            return self._compile_asset(path, node, previous_digest)
+        return None
+
+    def _read_source(self, source_path, force=False):
+        """
+            Get the digest of a Markdown source, and the snippets it includes.
+            The source is only read if it changed since the last time this
+            compiler read it, judging by its modification time and size, or
+            if reading it is forced.
+
+            :param source_path: The path of the source
+            :type source_path: string
+            :param force: Whether to always read the source
+            :type force: bool
+            :returns: The digest, the file names of the included snippets, and
+                the source if it was read
+        """
+
+        signature = cece.util.get_file_signature(source_path)
+        known = self._source_digests.get(source_path)
+        if known and known[0] == signature and not force:
+            return known[1], known[2], None
+
+        with open(source_path, "r") as f:
+            md_content = f.read()
+        digest = hashlib.sha1(cece.util.encode_text(md_content)).hexdigest()
+        includes = _INCLUDE_RE.findall(md_content)
+        self._source_digests[source_path] = (signature, digest, includes)
+        self._profile.count("bytes_read", signature[1])
+        return digest, includes, md_content
+
+    def _get_snippet_digests(self, source_path, includes):
+        """
+            Get the digests of the snippets a page includes.
+
+            :param source_path: The path of the page's source
+            :type source_path: string
+            :param includes: The file names of the snippets
+            :type includes: list
+            :returns: The file name and digest of each snippet, as a flat list
+            :raises CompilingException: If a snippet does not exist
+        """
+
+        digests = []
+        for include in includes:
+            snippet_path = os.path.join(os.path.dirname(source_path), include)
+            try:
+                digests.extend([include, self._read_source(snippet_path)[0]])
+            except (IOError, OSError):
+                raise CompilingException(
+                    "{}: The included snippet \"{}\" does not exist".format(source_path, include))
+        return digests
+
+    def _convert_snippet(self, snippet_path):
+        """
+            Convert a snippet to HTML. Each snippet is converted once per
+            compiler, and the HTML is kept by the digest of its source.
+
+            :param snippet_path: The path of the snippet
+            :type snippet_path: string
+            :returns: The HTML and the source of the snippet
+        """
+
+        digest, includes, source = self._read_source(snippet_path)
+        snippet = self._snippets.get(digest)
+        if snippet is None:
+            if source is None:
+                source = self._read_source(snippet_path, True)[2]
+            snippet = self._snippets[digest] = (self._convert_markdown(source), source)
+            self._profile.count("snippet_conversions")
+        return snippet
+
+    def _convert_page(self, source_path, md_content):
+        """
+            Convert the source of a page to HTML. A line such as
+            ``!include _install.md`` is replaced with the snippet of that name
+            from the page's guide folder. The Markdown between the includes is
+            converted separately, so includes must stand between blocks.
+            Snippets cannot include other snippets.
+
+            :param source_path: The path of the page's source
+            :type source_path: string
+            :param md_content: The source of the page
+            :type md_content: string
+            :returns: The HTML, and the text of the page and its snippets
+        """
+
+        parts = _INCLUDE_RE.split(md_content)
+        if len(parts) == 1:
+            return self._convert_markdown(md_content), md_content
+
+        # the split alternates between markdown and snippet file names
+        html = []
+        text = []
+        for i, part in enumerate(parts):
+            if i % 2:
+                snippet_html, snippet_source = self._convert_snippet(
+                    os.path.join(os.path.dirname(source_path), part))
+                html.append(snippet_html)
+                text.append(snippet_source)
+            elif part.strip():
+                html.append(self._convert_markdown(part))
+                text.append(part)
+        return "\n".join(html), "\n".join(text)
+
+    def _get_template(self, name):
+        """
+            Get a template, loading it the first time it is used.
+
+            :param name: The name of the template
+            :type name: string
+            :returns: The template
+        """
 
-        # compile the guides
-        for path, value in future.utils.viewitems(self._guides):
-            if value["type"] == "folder":
-                self._compile_folder(path, value)
-            elif value["type"] == "page":
-                self._compile_page(path, value)
+        template = self._templates.get(name)
+        if template is None:
+            template = self._templates[name] = self._template_env.get_template(name)
+        return template
 
-        # move back to the starting directory
-        os.chdir(cur_dir)
+    def _convert_markdown(self, md_content):
+        """
+            Convert Markdown to HTML, using the cache if one is configured.
+
+            :param md_content: The Markdown source
+            :type md_content: string
+            :returns: The converted HTML
+        """
 
-    def _compile_folder(self, path, folder):
+        if self._markdown_cache:
+            content = self._markdown_cache.get(md_content)
+            if content is not None:
+                return content
+
+        content = self._renderer.render(md_content)
+        if self._markdown_cache:
+            self._markdown_cache.set(md_content, content)
+        return content
+
+    def _get_state_path(self, name):
+        """
+            Get the path of a file kept between builds, such as the manifest.
+            These files are kept in the cache directory rather than the build
+            directory, so they are never published.
+
+            :param name: The name of the file
+            :type name: string
+            :returns: The path of the file, or ``None`` if there is no cache
+                directory
+        """
+
+        if self._options["cache_dir"]:
+            return os.path.join(self._options["cache_dir"], name)
+        return None
+
+    def _save_state(self, name, text):
+        """
+            Write a file kept between builds, if there is a cache directory.
+
+            :param name: The name of the file
+            :type name: string
+            :param text: The contents of the file
+            :type text: string
+        """
+
+        path = self._get_state_path(name)
+        if path:
+            cece.util.makedirs(os.path.dirname(path))
+            cece.util.write_file(path, cece.util.encode_text(text))
+
+    def _remove_state(self, name):
+        """
+            Remove a file kept between builds, if it exists.
+
+            :param name: The name of the file
+            :type name: string
+        """
+
+        path = self._get_state_path(name)
+        if path and os.path.isfile(path):
+            os.remove(path)
+
+    def _load_manifest(self):
+        """
+            Load the manifest of the previous build.
+
+            :returns: The digest of each output path, as a dictionary, or
+                ``None`` if the manifest is missing or unreadable
+        """
+
+        path = self._get_state_path(MANIFEST_NAME)
+        if not path:
+            return None
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+
+    def _remove_output(self, path):
+        """
+            Remove the output of a node that no longer exists, along with any
+            directories left empty by the removal.
+
+            :param path: The path of the node
+            :type path: string
+        """
+
+        if os.path.isfile(path):
+            # an asset, whose directory belongs to its guide's page
+            os.remove(path)
+            path = os.path.dirname(path)
+        else:
+            index_path = os.path.join(path, "index.html")
+            for extension in [""] + list(PRECOMPRESS_EXTENSIONS.values()):
+                if os.path.isfile(index_path + extension):
+                    os.remove(index_path + extension)
+        while path:
+            try:
+                os.rmdir(path)
+            except OSError:
+                break
+            path = os.path.dirname(path)
+
+    def _get_base_digest(self):
+        """
+            Get the digest of the inputs shared by every output, which are the
+            templates and the configuration values used while rendering.
+
+            :returns: The digest, as a hex string
+        """
+
+        if self._base_digest is None:
+            digest = hashlib.sha1()
+            template_modules = self._options["template_modules"]
+            if template_modules:
+                # precompiled templates have no source, so use the modules
+                for name in sorted(fnmatch.filter(os.listdir(template_modules), "*.py")):
+                    with open(os.path.join(template_modules, name), "rb") as f:
+                        digest.update(cece.util.encode_text(name))
+                        digest.update(f.read())
+            else:
+                loader = self._template_env.loader
+                for name in sorted(loader.list_templates()):
+                    source = loader.get_source(self._template_env, name)[0]
+                    digest.update(cece.util.encode_text(name))
+                    digest.update(cece.util.encode_text(source))
+            digest.update(cece.util.encode_text(self._config["site_title"]))
+            digest.update(cece.util.encode_text(self._renderer.get_salt()))
+            if self._options["minify"]:
+                digest.update(b"minify")
+            if self._options["search_index"]:
+                digest.update(b"search_index")
+            if self._options["precompress"]:
+                # outputs skipped by an incremental build need their
+                # precompressed copies when precompression is turned on
+                digest.update(cece.util.encode_text(",".join(self._options["precompress"])))
+            self._base_digest = digest.hexdigest()
+        return self._base_digest
+
+    def _get_digest(self, node, *extra):
+        """
+            Get the digest of the inputs an output depends on. Besides the node
+            itself this covers the names of the nodes it links to, since those
+            are rendered into the navigation.
+
+            :param node: The data for the node
+            :type node: dict
+            :param extra: Any additional inputs, such as the page source
+            :returns: The digest, as a hex string
+        """
+
+        digest = hashlib.sha1()
+        parts = [self._get_base_digest(), node["type"], node["name"], node["short_name"],
+                 node.get("description")]
+        for id in node["breadcrumbs"]:
+            parts.extend([id, self._guides[id]["short_name"]])
+        for id in node.get("links", []):
+            parts.extend([id, self._guides[id]["short_name"]])
+        parts.extend(extra)
+        for part in parts:
+            digest.update(cece.util.encode_text(part or ""))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _compile_folder(self, path, folder, previous_digest=None):
         """
             Compile a folder, which is a listing of links to other folders or
             pages.
@@ -77,22 +1238,31 @@ class Compiler(object):
             :type path: string
             :param folder: The data for the folder
             :type folder: dict
+            :param previous_digest: The digest of the previous build's output
+            :type previous_digest: string
+            :returns: The digest of the output
         """
 
+        # skip the folder if none of its inputs changed
+        index_path = os.path.join(path, "index.html")
+        digest = self._get_digest(folder)
+        if digest == previous_digest and os.path.isfile(index_path):
+            return digest
+
         # make directories
         cece.util.makedirs(path)
 
         # load and compile the template
-        template = self._template_env.get_template("folder.html")
-        source = template.render(
+        template = self._get_template("folder.html")
+        chunks = template.generate(
             site_title=self._config["site_title"], guides=self._guides, data=folder)
 
-        # get the path to the html file and write it
-        index_path = os.path.join(path, "index.html")
-        with open(index_path, "w") as f:
-            f.write(source)
+        # stream the html file to disk
+        self._write_output(index_path, chunks)
+
+        return digest
 
-    def _compile_page(self, path, page):
+    def _compile_page(self, path, page, previous_digest=None):
         """
             Compile a page.
 
@@ -100,22 +1270,90 @@ class Compiler(object):
             :type path: string
             :param page: The data for the page
             :type page: dict
+            :param previous_digest: The digest of the previous build's output
+            :type previous_digest: string
+            :returns: The digest of the output
         """
 
+        # skip the page if none of its inputs changed
+        start = time.time()
+        source_digest, includes, md_content = self._read_source(page["source_path"])
+        index_path = os.path.join(path, "index.html")
+        digest = self._get_digest(
+            page, source_digest, *self._get_snippet_digests(page["source_path"], includes))
+        if digest == previous_digest and os.path.isfile(index_path):
+            return digest
+        if md_content is None:
+            md_content = self._read_source(page["source_path"], True)[2]
+
         # make directories
         cece.util.makedirs(path)
 
-        # load and compile the markdown source
-        with open(page["source_path"], "r") as f:
-            md_content = f.read()
-        content = self._markdown.reset().convert(md_content)
+        # compile the markdown source
+        with self._profile.phase("markdown_conversion"):
+            content, text = self._convert_page(page["source_path"], md_content)
+
+        # index the page for search
+        if self._options["search_index"]:
+            self._search_pages[path] = {
+                "name": page["name"],
+                "terms": cece.search.get_terms(page["name"], page.get("description"), text)
+            }
 
         # load and compile the template
-        template = self._template_env.get_template("page.html")
-        source = template.render(
+        template = self._get_template("page.html")
+        chunks = template.generate(
             site_title=self._config["site_title"], guides=self._guides, content=content, data=page)
 
-        # get the path to the html file and write it
-        index_path = os.path.join(path, "index.html")
-        with open(index_path, "w") as f:
-            f.write(source)
+        # stream the html file to disk
+        self._write_output(index_path, chunks)
+
+        self._profile.add_page(path, page["source_path"], time.time() - start)
+        return digest
+
+    def _compile_asset(self, path, asset, previous_digest=None):
+        """
+            Publish an asset. The asset is linked rather than copied where the
+            file system allows it. An asset is judged unchanged by the
+            modification time and size of its source, so it is never read. In
+            a full build an unchanged asset is linked from the previous build.
+
+            :param path: The path of the asset
+            :type path: string
+            :param asset: The data for the asset
+            :type asset: dict
+            :param previous_digest: The digest of the previous build's output
+            :type previous_digest: string
+            :returns: The digest of the output
+        """
+
+        # skip the asset if its source did not change
+        signature = cece.util.get_file_signature(asset["source_path"])
+        digest = hashlib.sha1(cece.util.encode_text(
+            "{}\0{}\0{}".format(asset["source_path"], *signature))).hexdigest()
+        if digest == previous_digest and os.path.isfile(path):
+            return digest
+
+        # make directories
+        cece.util.makedirs(os.path.dirname(path))
+
+        with self._profile.phase("asset_publishing"):
+            source_path = asset["source_path"]
+            if self._previous_dir:
+                previous_path = os.path.join(self._previous_dir, path)
+                try:
+                    if cece.util.get_file_signature(previous_path) == signature:
+                        source_path = previous_path
+                except OSError:
+                    pass
+
+            # publish through a temporary path, so an incremental build never
+            # leaves a partially copied asset in place
+            temp_path = path + ".tmp"
+            if os.path.lexists(temp_path):
+                os.remove(temp_path)
+            cece.util.link_file(source_path, temp_path)
+            cece.util.replace_file(temp_path, path)
+
+        self._profile.count("assets", 1)
+        return digest
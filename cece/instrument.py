@@ -0,0 +1,167 @@
+"""
+.. module cece.instrument
+
+Instrumentation for finding where a build spends its time. A profile collects
+the time spent in each phase of the build, counters such as the number of
+bytes read and written, and the time taken by each page, and writes them as a
+JSON report.
+"""
+
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import collections
+import contextlib
+import future.utils
+import heapq
+import json
+import time
+
+
+class Profile(object):
+    """
+        Collects timings and counters for a build. Timings of the same phase
+        are added up, so in a parallel build the compile phases are the total
+        across all worker processes rather than wall time.
+    """
+
+    enabled = True
+
+    def __init__(self):
+        self._timings = collections.defaultdict(float)
+        self._counters = collections.defaultdict(int)
+        self._pages = []
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """
+            Time a phase of the build, as a context manager.
+
+            :param name: The name of the phase
+            :type name: string
+        """
+
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.time() - start)
+
+    def add_time(self, name, seconds):
+        """
+            Add time to a phase of the build.
+
+            :param name: The name of the phase
+            :type name: string
+            :param seconds: The time to add
+            :type seconds: float
+        """
+
+        self._timings[name] += seconds
+
+    def count(self, name, amount=1):
+        """
+            Increment a counter.
+
+            :param name: The name of the counter
+            :type name: string
+            :param amount: The amount to increment it by
+            :type amount: int
+        """
+
+        self._counters[name] += amount
+
+    def add_page(self, path, source_path, seconds):
+        """
+            Record the time taken to compile a page.
+
+            :param path: The path of the page
+            :type path: string
+            :param source_path: The path of the page's source
+            :type source_path: string
+            :param seconds: The time taken
+            :type seconds: float
+        """
+
+        self._pages.append((seconds, path, source_path))
+
+    def pop_data(self):
+        """
+            Get everything collected so far and reset the profile. This is used
+            to send the data collected by a worker process to the parent.
+
+            :returns: The collected data
+        """
+
+        data = (dict(self._timings), dict(self._counters), self._pages)
+        self.__init__()
+        return data
+
+    def merge(self, data):
+        """
+            Merge data collected by another profile.
+
+            :param data: The data, from :meth:`pop_data`
+            :type data: tuple
+        """
+
+        timings, counters, pages = data
+        for name, seconds in future.utils.viewitems(timings):
+            self.add_time(name, seconds)
+        for name, amount in future.utils.viewitems(counters):
+            self.count(name, amount)
+        self._pages.extend(pages)
+
+    def get_report(self, slowest=10):
+        """
+            Get the report of everything collected.
+
+            :param slowest: The number of slowest pages to include
+            :type slowest: int
+            :returns: The report, as a dictionary
+        """
+
+        return {
+            "phases": dict(self._timings),
+            "counters": dict(self._counters),
+            "slowest_pages": [
+                {"path": path, "source_path": source_path, "seconds": seconds}
+                for seconds, path, source_path in heapq.nlargest(slowest, self._pages)
+            ]
+        }
+
+    def write_report(self, path, slowest=10):
+        """
+            Write the report as JSON.
+
+            :param path: The path to write the report to
+            :type path: string
+            :param slowest: The number of slowest pages to include
+            :type slowest: int
+        """
+
+        with open(path, "w") as f:
+            json.dump(self.get_report(slowest), f, indent=4, sort_keys=True)
+
+
+class NullProfile(Profile):
+    """
+        A profile that collects nothing, used when instrumentation is off.
+    """
+
+    enabled = False
+
+    def add_time(self, name, seconds):
+        pass
+
+    def count(self, name, amount=1):
+        pass
+
+    def add_page(self, path, source_path, seconds):
+        pass
+
+    def pop_data(self):
+        return None
+
+    def merge(self, data):
+        pass
@@ -1,40 +1,542 @@
 """
 .. module cece.main
 
-The main module for cece. This contains the entry point for the application.
+The main module for cece. This contains the entry point for the application,
+which runs one of a set of commands, building the site by default.
+
+Only the modules a command needs are imported, and only once it runs, so
+commands that do little, such as ``version``, start quickly.
 """
 
 from __future__ import print_function
 from __future__ import unicode_literals
 
-import cece.compiler
-import cece.parser
-import future.utils
+import argparse
+import cece
+import sys
+
+
+PIPELINE_QUEUE_SIZE = 1024
+"""
+    The maximum number of parsed nodes waiting to be compiled in a pipelined
+    build, after which the parse waits for the compiler to catch up.
+"""
 
 
-def main():
+def _parse_args(args):
     """
-        The main entry point for cece.
+        Parse the command line arguments. The arguments of a command are
+        only added once it is chosen, so the modules their defaults come from
+        are only imported for the commands that need them. Arguments without
+        a command run the ``build`` command.
+
+        :param args: The arguments to parse, or ``None`` to use ``sys.argv``
+        :type args: list
+        :returns: The parsed arguments
     """
 
-    # load config
-    config = cece.util.load_yaml_file("config.yaml")
+    args = list(sys.argv[1:] if args is None else args)
+    if not args or args[0] not in _COMMANDS and args[0] not in ("-h", "--help"):
+        args.insert(0, "build")
+
+    arg_parser = argparse.ArgumentParser(description="Build a how to site.")
+    subparsers = arg_parser.add_subparsers(dest="command", metavar="COMMAND")
+    for name in sorted(_COMMANDS):
+        command_help, add_arguments, run = _COMMANDS[name]
+        command_parser = subparsers.add_parser(name, help=command_help, description=command_help)
+        command_parser.set_defaults(run=run)
+        if name == args[0] and add_arguments:
+            add_arguments(command_parser)
+    parsed_args = arg_parser.parse_args(args)
+    if getattr(parsed_args, "validate", None):
+        parsed_args.validate(arg_parser, parsed_args)
+    return parsed_args
+
+
+def _add_cache_arguments(arg_parser):
+    """
+        Add the arguments that locate the cache directory.
+
+        :param arg_parser: The argument parser of the command
+        :type arg_parser: argparse.ArgumentParser
+    """
+
+    arg_parser.add_argument(
+        "--cache-dir", default=cece.DEFAULT_CACHE_DIR, metavar="DIR",
+        help="the directory to store caches in (default: {})".format(cece.DEFAULT_CACHE_DIR))
+    arg_parser.add_argument(
+        "--no-cache", dest="cache_dir", action="store_const", const=None,
+        help="disable caching between builds")
+
+
+def _add_parse_arguments(arg_parser):
+    """
+        Add the arguments for parsing the guides.
+
+        :param arg_parser: The argument parser of the command
+        :type arg_parser: argparse.ArgumentParser
+    """
+
+    arg_parser.add_argument(
+        "--parse-threads", type=int, default=1, metavar="N",
+        help="read sibling guide directories with N threads (default: 1)")
+    _add_cache_arguments(arg_parser)
+
+
+def _add_build_arguments(arg_parser):
+    """
+        Add the arguments of the ``build`` command.
+
+        :param arg_parser: The argument parser of the command
+        :type arg_parser: argparse.ArgumentParser
+    """
+
+    import cece.compiler
+
+    arg_parser.add_argument(
+        "--incremental", action="store_true",
+        help="only re-render outputs whose inputs changed since the last build")
+    arg_parser.add_argument(
+        "-j", "--jobs", type=int, default=1, metavar="N",
+        help="compile pages across N processes (default: 1)")
+    _add_parse_arguments(arg_parser)
+    arg_parser.add_argument(
+        "--cache-size", type=int, default=cece.compiler.DEFAULT_CACHE_SIZE // (1024 * 1024),
+        metavar="MB", help="the maximum size of the Markdown cache (default: %(default)s)")
+    arg_parser.add_argument(
+        "--template-modules", metavar="DIR",
+        help="load templates precompiled with --compile-templates from DIR")
+    arg_parser.add_argument(
+        "--compile-templates", metavar="DIR",
+        help="precompile the templates into Python modules in DIR and exit")
+    arg_parser.add_argument(
+        "--precompress", action="append", default=[],
+        choices=sorted(cece.compiler.PRECOMPRESS_EXTENSIONS), metavar="FORMAT",
+        help="also write every output file compressed with FORMAT, gzip or brotli, for web "
+        "servers that serve precompressed files; may be given more than once")
+    arg_parser.add_argument(
+        "--minify", action="store_true",
+        help="remove comments and collapse whitespace in every page")
+    arg_parser.add_argument(
+        "--search-index", action="store_true",
+        help="write a sharded search index of the pages to the search directory")
+    arg_parser.add_argument(
+        "--pipeline", action="store_true",
+        help="compile pages while the guides are still being parsed")
+    arg_parser.add_argument(
+        "--watch", action="store_true",
+        help="rebuild when the sources change and serve the build over HTTP")
+    arg_parser.add_argument(
+        "--poll", action="store_true",
+        help="in watch mode, poll for changes even if watchdog is installed")
+    arg_parser.add_argument(
+        "--host", default="127.0.0.1",
+        help="the address to serve the build on in watch mode (default: %(default)s)")
+    arg_parser.add_argument(
+        "--port", type=int, default=8000,
+        help="the port to serve the build on in watch mode (default: %(default)s)")
+    arg_parser.add_argument(
+        "--profile-report", metavar="FILE",
+        help="write a JSON report of where the build spent its time to FILE")
+    arg_parser.add_argument(
+        "--slowest", type=int, default=10, metavar="N",
+        help="the number of slowest pages in the profile report (default: %(default)s)")
+    arg_parser.add_argument(
+        "--cprofile", metavar="FILE",
+        help="run the build under cProfile and dump the stats to FILE")
+    arg_parser.set_defaults(validate=_validate_build_arguments)
+
+
+def _validate_build_arguments(arg_parser, args):
+    """
+        Check the arguments of the ``build`` command that depend on each
+        other or on optional packages.
+
+        :param arg_parser: The argument parser
+        :type arg_parser: argparse.ArgumentParser
+        :param args: The parsed arguments
+    """
+
+    import cece.compiler
+
+    if "brotli" in args.precompress and not cece.compiler.brotli:
+        arg_parser.error("--precompress brotli requires the brotli package")
+
+
+def _add_clean_arguments(arg_parser):
+    """
+        Add the arguments of the ``clean`` command.
+
+        :param arg_parser: The argument parser of the command
+        :type arg_parser: argparse.ArgumentParser
+    """
+
+    _add_cache_arguments(arg_parser)
+    arg_parser.add_argument(
+        "--keep-cache", action="store_true", help="only remove the build directories")
+
+
+def _load_config(meta_cache, profile=None):
+    """
+        Load the configuration.
+
+        :param meta_cache: The cache to load the configuration through, or
+            ``None``
+        :type meta_cache: cece.cache.MetadataCache
+        :param profile: The profile to record timings in
+        :type profile: cece.instrument.Profile
+        :returns: The configuration
+    """
+
+    import cece.instrument
+    import cece.util
+    import future.utils
+
+    profile = profile or cece.instrument.NullProfile()
+
+    with profile.phase("config_load"):
+        if meta_cache:
+            config = meta_cache.load("config.yaml")
+        else:
+            config = cece.util.load_yaml_file("config.yaml")
 
     # convert nested variants in variant groups in config file into a flat
     # dictionary of all variants
-    config["variants"] = {}
-    for variant_group_id, variant_group in future.utils.viewitems(config["variant_groups"]):
-        for variant in variant_group["variants"]:
-            config["variants"][variant["id"]] = variant
+    with profile.phase("variant_flattening"):
+        config["variants"] = {}
+        for variant_group_id, variant_group in future.utils.viewitems(config["variant_groups"]):
+            for variant in variant_group["variants"]:
+                config["variants"][variant["id"]] = variant
+
+    return config
+
+
+def _parse(args, config, meta_cache, profile=None):
+    """
+        Parse the guides.
+
+        :param args: The parsed command line arguments
+        :param config: The configuration
+        :type config: dict
+        :param meta_cache: The cache to load meta files through, or ``None``
+        :type meta_cache: cece.cache.MetadataCache
+        :param profile: The profile to record timings in
+        :type profile: cece.instrument.Profile
+        :returns: The parsed guides
+    """
+
+    import cece.parser
+
+    parser = cece.parser.Parser(
+        config, threads=args.parse_threads, meta_cache=meta_cache, cache_dir=args.cache_dir,
+        profile=profile)
+    try:
+        return parser.parse()
+    finally:
+        if meta_cache:
+            meta_cache.save()
+
+
+def _stream_parse(args, config, guides, meta_cache, profile=None):
+    """
+        Parse the guides in a background thread, yielding the path of each
+        node as soon as it is final, so it can be compiled while the rest of
+        the guides are parsed. Errors in the parse are raised once every node
+        parsed before them has been yielded.
+
+        :param args: The parsed command line arguments
+        :param config: The configuration
+        :type config: dict
+        :param guides: The dictionary to parse the guides into
+        :type guides: dict
+        :param meta_cache: The cache to load meta files through, or ``None``
+        :type meta_cache: cece.cache.MetadataCache
+        :param profile: The profile to record timings in
+        :type profile: cece.instrument.Profile
+        :returns: A generator of the paths of the parsed nodes
+    """
+
+    import cece.parser
+
+    # the parser is created right away, as it finds the guides through the
+    # working directory, which the compiler changes before the parse starts
+    parser = cece.parser.Parser(
+        config, threads=args.parse_threads, meta_cache=meta_cache, cache_dir=args.cache_dir,
+        profile=profile)
+    return _stream_nodes(parser, guides, meta_cache)
+
+
+def _stream_nodes(parser, guides, meta_cache):
+    """
+        Run a parse in a background thread, and yield the path of each node
+        it reports. The parse is only started once the first path is asked
+        for, so any worker processes are started before the thread.
+
+        :param parser: The parser
+        :type parser: cece.parser.Parser
+        :param guides: The dictionary to parse the guides into
+        :type guides: dict
+        :param meta_cache: The cache to load meta files through, or ``None``
+        :type meta_cache: cece.cache.MetadataCache
+    """
+
+    import future.utils
+    import threading
+
+    from future.moves.queue import Queue
+
+    queue = Queue(PIPELINE_QUEUE_SIZE)
+    error = []
+
+    def parse():
+        try:
+            parser.parse(on_node=queue.put, contents=guides)
+        except BaseException:
+            error.append(sys.exc_info())
+        finally:
+            if meta_cache:
+                meta_cache.save()
+            queue.put(None)
+
+    thread = threading.Thread(target=parse)
+    thread.daemon = True
+    thread.start()
+
+    while True:
+        path = queue.get()
+        if path is None:
+            break
+        yield path
+    thread.join()
+
+    if error:
+        future.utils.raise_(*error[0])
+
+
+def _create_compiler(args, config, guides, incremental, profile=None):
+    """
+        Create the compiler.
+
+        :param args: The parsed command line arguments
+        :param config: The configuration
+        :type config: dict
+        :param guides: The parsed guides
+        :type guides: dict
+        :param incremental: Whether builds are incremental
+        :type incremental: bool
+        :param profile: The profile to record timings in
+        :type profile: cece.instrument.Profile
+        :returns: The compiler
+    """
+
+    import cece.compiler
+
+    return cece.compiler.Compiler(
+        config, guides, incremental=incremental, jobs=args.jobs,
+        cache_dir=args.cache_dir, cache_size=args.cache_size * 1024 * 1024,
+        template_modules=args.template_modules, precompress=args.precompress,
+        minify=args.minify, search_index=args.search_index, profile=profile)
+
+
+def _build(args, meta_cache, profile):
+    """
+        Build the site once.
+
+        :param args: The parsed command line arguments
+        :param meta_cache: The cache to load meta files through, or ``None``
+        :type meta_cache: cece.cache.MetadataCache
+        :param profile: The profile to record timings in
+        :type profile: cece.instrument.Profile
+    """
+
+    import cece.compiler
+    import cece.parser
+
+    # load config
+    config = _load_config(meta_cache, profile)
+
+    if args.pipeline:
+        _build_pipelined(args, config, meta_cache, profile)
+        return
 
     # parse guides
-    parser = cece.parser.Parser(config)
     try:
-        guides = parser.parse()
+        with profile.phase("parse"):
+            guides = _parse(args, config, meta_cache, profile)
     except cece.parser.ParsingException as e:
         print("Error parsing directory:")
         print(e)
+        sys.exit(1)
 
     # compile guides
-    compiler = cece.compiler.Compiler(config, guides)
-    compiler.compile()
+    try:
+        with profile.phase("compile"):
+            compiler = _create_compiler(args, config, guides, args.incremental, profile)
+            compiler.compile()
+    except cece.compiler.CompilingException as e:
+        print("Error compiling guides:")
+        print(e)
+        sys.exit(1)
+
+
+def _build_pipelined(args, config, meta_cache, profile):
+    """
+        Build the site once, compiling the guides while they are parsed.
+
+        :param args: The parsed command line arguments
+        :param config: The configuration
+        :type config: dict
+        :param meta_cache: The cache to load meta files through, or ``None``
+        :type meta_cache: cece.cache.MetadataCache
+        :param profile: The profile to record timings in
+        :type profile: cece.instrument.Profile
+    """
+
+    import cece.compiler
+    import cece.parser
+
+    guides = {}
+    try:
+        with profile.phase("pipeline"):
+            compiler = _create_compiler(args, config, guides, args.incremental, profile)
+            compiler.compile(_stream_parse(args, config, guides, meta_cache, profile), stream=True)
+    except cece.parser.ParsingException as e:
+        print("Error parsing directory:")
+        print(e)
+        sys.exit(1)
+    except cece.compiler.CompilingException as e:
+        print("Error compiling guides:")
+        print(e)
+        sys.exit(1)
+
+
+def _run_build(args):
+    """
+        Build the site, or watch it and rebuild it as it changes.
+
+        :param args: The parsed command line arguments
+    """
+
+    import cece.cache
+    import cece.compiler
+    import cece.instrument
+
+    if args.compile_templates:
+        cece.compiler.compile_templates(args.compile_templates)
+        return
+
+    meta_cache = None
+    if args.cache_dir:
+        meta_cache = cece.cache.MetadataCache(args.cache_dir)
+
+    if args.watch:
+        import cece.watch
+
+        watcher = cece.watch.Watcher(
+            lambda: _load_config(meta_cache),
+            lambda config: _parse(args, config, meta_cache),
+            lambda config, guides: _create_compiler(args, config, guides, True),
+            template_dir=args.template_modules, poll=args.poll)
+        watcher.run(args.host, args.port)
+        return
+
+    if args.profile_report:
+        profile = cece.instrument.Profile()
+    else:
+        profile = cece.instrument.NullProfile()
+
+    with profile.phase("total"):
+        if args.cprofile:
+            import cProfile
+
+            profiler = cProfile.Profile()
+            profiler.runcall(_build, args, meta_cache, profile)
+            profiler.dump_stats(args.cprofile)
+        else:
+            _build(args, meta_cache, profile)
+
+    if args.profile_report:
+        profile.write_report(args.profile_report, args.slowest)
+
+
+def _run_check(args):
+    """
+        Check that the configuration and the guides parse, without rendering
+        anything.
+
+        :param args: The parsed command line arguments
+    """
+
+    import cece.cache
+    import cece.parser
+
+    meta_cache = None
+    if args.cache_dir:
+        meta_cache = cece.cache.MetadataCache(args.cache_dir)
+
+    config = _load_config(meta_cache)
+    try:
+        guides = _parse(args, config, meta_cache)
+    except cece.parser.ParsingException as e:
+        print("Error parsing directory:")
+        print(e)
+        sys.exit(1)
+
+    pages = sum(1 for node in guides.values() if node["type"] == "page")
+    print("Checked {} page{}".format(pages, "" if pages == 1 else "s"))
+
+
+def _run_clean(args):
+    """
+        Remove the build directories and, unless asked to keep it, the cache
+        directory.
+
+        :param args: The parsed command line arguments
+    """
+
+    import os
+    import shutil
+
+    paths = ["build", cece.STAGING_DIR, cece.OLD_BUILD_DIR]
+    if args.cache_dir and not args.keep_cache:
+        paths.append(args.cache_dir)
+    for path in paths:
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+            print("Removed {}".format(path))
+
+
+def _run_version(args):
+    """
+        Print the version of cece.
+
+        :param args: The parsed command line arguments
+    """
+
+    print("cece {}".format(cece.__version__))
+
+
+_COMMANDS = {
+    "build": ("build the site (the default command)", _add_build_arguments, _run_build),
+    "check": ("check the configuration and the guides without building", _add_parse_arguments,
+              _run_check),
+    "clean": ("remove the build and cache directories", _add_clean_arguments, _run_clean),
+    "version": ("print the version of cece", None, _run_version)
+}
+"""
+    The help, the function that adds the arguments and the function that runs
+    each command, by the name of the command.
+"""
+
+
+def main(args=None):
+    """
+        The main entry point for cece.
+
+        :param args: The command line arguments, or ``None`` to use
+            ``sys.argv``
+        :type args: list
+    """
+
+    args = _parse_args(args)
+    args.run(args)
@@ -0,0 +1,85 @@
+"""
+.. module cece.minify
+
+A conservative HTML minifier for the compiled pages. It removes comments and
+the whitespace around block level tags, and collapses all other runs of
+whitespace to a single space, so inline content renders the same. The
+contents of elements where whitespace is significant, such as ``<pre>``, are
+left untouched.
+"""
+
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import re
+
+
+_PRESERVED_RE = re.compile(
+    r"(<(pre|textarea|script|style)\b.*?</\2\s*>)", re.IGNORECASE | re.DOTALL)
+"""
+    Matches the elements whose contents are left untouched.
+"""
+
+_COMMENT_RE = re.compile(r"<!--(?!\[if).*?-->", re.DOTALL)
+"""
+    Matches comments, except for conditional comments.
+"""
+
+_WHITESPACE_RE = re.compile(r"[\t\n\r\f][ \t\n\r\f]*| [ \t\n\r\f]+")
+"""
+    Matches a run of whitespace that is not already a single space. Only ASCII
+    whitespace is matched, as a non-breaking space is content.
+"""
+
+_BLOCK_TAG = (
+    r"<[/!]?(?:doctype|html|head|body|title|meta|link|base|div|p|h[1-6]|ul|ol|li|dl|dt|dd|"
+    r"table|thead|tbody|tfoot|tr|th|td|caption|blockquote|section|nav|header|footer|main|"
+    r"article|aside|form|fieldset|hr|br)\b")
+"""
+    Matches the start of a block level tag.
+"""
+
+_SPACE_BEFORE_BLOCK_TAG_RE = re.compile(r" (?={})".format(_BLOCK_TAG), re.IGNORECASE)
+"""
+    Matches a space before a block level tag.
+"""
+
+_SPACE_AFTER_BLOCK_TAG_RE = re.compile(r"({}[^>]*>) ".format(_BLOCK_TAG), re.IGNORECASE)
+"""
+    Matches a block level tag followed by a space.
+"""
+
+
+def _minify_text(html):
+    """
+        Minify HTML that contains no preserved elements.
+
+        :param html: The HTML
+        :type html: string
+        :returns: The minified HTML
+    """
+
+    html = _COMMENT_RE.sub("", html)
+    html = _WHITESPACE_RE.sub(" ", html)
+    html = _SPACE_BEFORE_BLOCK_TAG_RE.sub("", html)
+    return _SPACE_AFTER_BLOCK_TAG_RE.sub(r"\1", html)
+
+
+def minify_html(html):
+    """
+        Minify an HTML document.
+
+        :param html: The HTML
+        :type html: string
+        :returns: The minified HTML
+    """
+
+    parts = _PRESERVED_RE.split(html)
+    # split returns the text between matches, then each match followed by the
+    # tag name captured inside it
+    result = []
+    for i in range(0, len(parts), 3):
+        result.append(_minify_text(parts[i]))
+        if i + 1 < len(parts):
+            result.append(parts[i + 1])
+    return "".join(result).strip()
@@ -0,0 +1,143 @@
+"""
+.. module cece.node
+
+The nodes of the parsed guide tree. Nodes use slots rather than a dictionary
+per instance, which keeps large trees small in memory, but they can still be
+read like dictionaries, so templates can use ``data["name"]``.
+"""
+
+from __future__ import print_function
+from __future__ import unicode_literals
+
+
+class Node(object):
+    """
+        The base class for nodes.
+
+        :param name: The full name of the node
+        :type name: string
+        :param short_name: The name of the node in links
+        :type short_name: string
+        :param description: The description of the node
+        :type description: string
+        :param breadcrumbs: The paths of the node's ancestors, excluding the
+            root folder. Siblings share the same tuple.
+        :type breadcrumbs: tuple
+    """
+
+    __slots__ = ("name", "short_name", "description", "breadcrumbs")
+    _fields = __slots__
+
+    type = None
+    """
+        The type of the node, ``"folder"``, ``"page"`` or ``"asset"``.
+    """
+
+    def __init__(self, name, short_name, description, breadcrumbs):
+        self.name = name
+        self.short_name = short_name
+        self.description = description
+        self.breadcrumbs = breadcrumbs
+
+    def __getitem__(self, key):
+        if key != "type" and key not in self._fields:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key == "type" or key in self._fields
+
+    def get(self, key, default=None):
+        """
+            Get a field of the node, like ``dict.get``.
+
+            :param key: The name of the field
+            :type key: string
+            :param default: The value to return if there is no such field
+            :returns: The value of the field
+        """
+
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __getstate__(self):
+        return tuple(getattr(self, field) for field in self._fields)
+
+    def __setstate__(self, state):
+        for field, value in zip(self._fields, state):
+            setattr(self, field, value)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.__getstate__() == other.__getstate__()
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "{}({})".format(type(self).__name__, ", ".join(
+            "{}={!r}".format(field, getattr(self, field)) for field in self._fields))
+
+
+class Folder(Node):
+    """
+        A folder, which is rendered as a listing of links to other folders or
+        pages.
+
+        :param links: The paths of the node's children
+        :type links: list
+    """
+
+    __slots__ = ("links",)
+    _fields = Node._fields + __slots__
+
+    type = "folder"
+
+    def __init__(self, name, short_name, description, breadcrumbs, links=None):
+        super(Folder, self).__init__(name, short_name, description, breadcrumbs)
+        self.links = links if links is not None else []
+
+
+class Page(Node):
+    """
+        A page, which is rendered from a Markdown source.
+
+        :param source_path: The absolute path of the Markdown source
+        :type source_path: string
+    """
+
+    __slots__ = ("source_path",)
+    _fields = Node._fields + __slots__
+
+    type = "page"
+
+    def __init__(self, name, short_name, description, breadcrumbs, source_path):
+        super(Page, self).__init__(name, short_name, description, breadcrumbs)
+        self.source_path = source_path
+
+
+class Asset(Node):
+    """
+        A file in a guide folder that is not a Markdown source, such as an
+        image or a download, which is published as is. Assets are not linked
+        from folders.
+
+        :param name: The file name of the asset
+        :type name: string
+        :param breadcrumbs: The paths of the asset's guide and its ancestors
+        :type breadcrumbs: tuple
+        :param source_path: The absolute path of the file
+        :type source_path: string
+    """
+
+    __slots__ = ("source_path",)
+    _fields = Node._fields + __slots__
+
+    type = "asset"
+
+    def __init__(self, name, breadcrumbs, source_path):
+        super(Asset, self).__init__(name, name, None, breadcrumbs)
+        self.source_path = source_path
@@ -8,32 +8,65 @@ of files to write out to the file system.
 from __future__ import print_function
 from __future__ import unicode_literals
 
+import cece.cache
+import cece.instrument
+import cece.node
 import cece.util
+import collections
 import fnmatch
+import future.utils
+import hashlib
+import json
+import multiprocessing.pool
 import os
+import sys
+import threading
 
+try:
+    from os import scandir
+except ImportError:
+    from scandir import scandir
 
-def _get_breadcrumbs(path):
-    """
-        A utility method for getting the breadcrumb links from a path. They are
-        built by repeatedly taking the dirname of the path.
 
-        For example, ``"category1/category2/variant1/variant2"`` would produce::
+_Listing = collections.namedtuple("_Listing", ["dirs", "files"])
+"""
+    The names of the directories and files in a directory.
+"""
 
-            [
-                "category1",
-                "category1/category2",
-                "category1/category2/variant1",
-                "category1/category2/variant1/variant2"
-            ]
-    """
+_Variant = collections.namedtuple("_Variant", ["tag", "group", "position", "name"])
+"""
+    A variant in the variant index: its tag, the key of its variant group, its
+    position in the group and its display name.
+"""
+
+_DirInfo = collections.namedtuple(
+    "_DirInfo", ["listing", "meta_type", "meta", "signature", "nodes"])
+"""
+    Everything read from the file system for a directory: its listing, the
+    type of its meta file (``"folder"``, ``"guide"`` or ``None``) and the
+    meta data. With a snapshot, it also has the signature the snapshot entry
+    is validated against, and the paths and nodes loaded from the directory,
+    if it has been loaded.
+"""
+
+_PAGE_OUTPUT_NAMES = frozenset(
+    "index.html" + extension + temp for extension in ("", ".gz", ".br") for temp in ("", ".tmp"))
+"""
+    The names of the files the compiler writes into the output directory of a
+    folder or page: the page, its precompressed copies, and the temporary
+    files they are written through.
+"""
 
-    path = os.path.dirname(path)
-    breadcrumbs = []
-    while path:
-        breadcrumbs.insert(0, path)
-        path = os.path.dirname(path)
-    return breadcrumbs
+_TEMP_EXTENSION = ".tmp"
+"""
+    The extension of the temporary file each output is written through.
+"""
+
+_SNAPSHOT_VERSION = 1
+"""
+    The version of the snapshot entries, which changes whenever the nodes or
+    the directory infos change.
+"""
 
 
 class ParsingException(Exception):
@@ -53,52 +86,404 @@ class ParsingException(Exception):
 
 class Parser(object):
     """
-        The parser object.
+        The parser object, which parses the ``guides`` directory of the
+        working directory the parser is created in.
 
         :param config: The configuration
         :type config: dict
+        :param threads: The number of threads to read directories with. With
+            more than one thread, sibling directories are read concurrently
+            before the tree is built. When nodes are reported as they are
+            final, only the children of the folder being loaded are read
+            ahead, so the first nodes are reported without waiting for the
+            whole tree to be read.
+        :type threads: int
+        :param meta_cache: The cache to load meta files through, or ``None``
+            to parse every meta file
+        :type meta_cache: cece.cache.MetadataCache
+        :param cache_dir: The directory to keep a snapshot of the parsed tree
+            in, or ``None`` to read every directory
+        :type cache_dir: string
+        :param profile: The profile to record timings in
+        :type profile: cece.instrument.Profile
     """
 
-    def __init__(self, config):
+    def __init__(self, config, threads=1, meta_cache=None, cache_dir=None, profile=None):
         self._config = config
+        self._profile = profile or cece.instrument.NullProfile()
+        self._threads = threads
+        self._meta_cache = meta_cache
+        self._cache_dir = cache_dir and os.path.abspath(cache_dir)
+        self._snapshot = None
         self._contents = None
+        # paths are resolved against the guides directory rather than by
+        # changing into it, as the compiler may change the working directory
+        # while a streamed parse runs
+        self._root = os.path.realpath("guides")
+        self._on_node = None
+        self._pool = None
+        self._stats = None
+        self._stats_lock = threading.Lock()
+        self._dir_infos = {}
+        self._strings = {}
+        self._breadcrumbs = {}
+        self._variant_index = self._build_variant_index()
+
+    def _build_variant_index(self):
+        """
+            Build an index of every variant by its tag, so a file name can be
+            resolved with one lookup per tag.
+
+            :returns: The variants matching each tag, as a dictionary of lists
+        """
 
-    def parse(self):
+        variant_index = {}
+        for group_key, group in future.utils.viewitems(self._config["variant_groups"]):
+            for position, variant in enumerate(group["variants"]):
+                variant_index.setdefault(variant["id"], []).append(_Variant(
+                    variant["id"], group_key, position,
+                    self._config["variants"][variant["id"]]["name"]))
+        return variant_index
+
+    def get_stats(self):
+        """
+            Get the number of file system calls made by the last parse.
+            ``listings`` counts directory listings, and ``stats`` counts calls
+            that stat a single path. The counters are also added to the
+            profile, as ``parse_listings`` and ``parse_stats``.
+
+            :returns: The counters, as a dictionary
+        """
+
+        return dict(self._stats or {})
+
+    def parse(self, on_node=None, contents=None):
         """
             Parse the files and cache the parsed result.
 
+            The nodes can be consumed while the parse runs, through
+            ``on_node``. It is called with the path of each node once the node
+            is final: pages and assets as soon as they are added, and folders
+            once everything below them is loaded and their links are sorted,
+            so the root folder comes last. A node's ancestors are always in
+            the contents before the node is reported.
+
+            :param on_node: Called with the path of each node once it is final
+            :type on_node: function
+            :param contents: The dictionary to add the nodes to, which can be
+                read while the parse runs, or ``None`` for a new one
+            :type contents: dict
             :returns: The parsed files, as a dictionary
         """
 
-        self._contents = {}
-
-        # move into the guides source directory
-        cur_dir = os.getcwd()
-        os.chdir("guides")
+        self._on_node = on_node
+        self._contents = contents if contents is not None else {}
+        self._stats = {"listings": 0, "stats": 0}
+        self._dir_infos = {}
+        self._strings = {}
+        self._breadcrumbs = {}
+        if self._cache_dir:
+            with self._profile.phase("snapshot_load"):
+                self._snapshot = cece.cache.ParseSnapshot(
+                    self._cache_dir, self._get_snapshot_salt())
 
         # the empty string is the root folder
-        self._contents[""] = {
-            "type": "folder",
-            "links": [],
-            "name": self._config["site_title"],
-            "short_name": self._config["site_title"],
-            "breadcrumbs": []
-        }
+        self._contents[""] = cece.node.Folder(
+            self._config["site_title"], self._config["site_title"], None, ())
+
+        # add entries for all folders in the root directory, reading them
+        # ahead of time if the parse is concurrent
+        root_info = self._read_dir(".", read_meta=False)
+        self._save_dir(".", root_info)
+        root_dirs = root_info.listing.dirs
+        if self._threads > 1:
+            self._pool = multiprocessing.pool.ThreadPool(self._threads)
+        try:
+            if self._pool:
+                self._prefetch_dirs(root_dirs, recursive=on_node is None)
+            for f in root_dirs:
+                f = self._intern(f)
+                if self._load_dirs(f):
+                    self._contents[""]["links"].append(f)
+        finally:
+            if self._pool:
+                self._pool.close()
+                self._pool.join()
+                self._pool = None
+        self._finish_folder("")
+
+        if self._snapshot:
+            with self._profile.phase("snapshot_save"):
+                self._snapshot.save()
+
+        for name, count in future.utils.viewitems(self._stats):
+            self._profile.count("parse_" + name, count)
+        return self._contents
 
-        # add entries for all folders in the root directory
-        for f in os.listdir("."):
-            self._load_dirs(f)
+    def _get_snapshot_salt(self):
+        """
+            Get the salt of the snapshot, which identifies everything the
+            parsed nodes depend on other than the directories they are read
+            from.
 
-        # sort the child links for each folder using natural sort
-        for folder in filter(lambda x: x["type"] == "folder", self._contents.values()):
-            cece.util.natural_sort(folder["links"], key=lambda x: self._contents[x]["name"])
+            :returns: The salt
+        """
 
-        # change back to the original directory
-        os.chdir(cur_dir)
+        return hashlib.sha1(json.dumps([
+            _SNAPSHOT_VERSION, self._root, self._config["variant_groups"],
+            self._config["variants"]
+        ], sort_keys=True).encode("utf-8")).hexdigest()
 
-        return self._contents
+    def _finish_node(self, path):
+        """
+            Report a node as final.
+
+            :param path: The path of the node
+            :type path: string
+        """
+
+        if self._on_node:
+            self._on_node(path)
+
+    def _finish_folder(self, path):
+        """
+            Sort the links of a folder whose children are all loaded, using
+            natural sort, and report the folder as final.
+
+            :param path: The path of the folder
+            :type path: string
+        """
+
+        with self._profile.phase("natural_sort"):
+            cece.util.natural_sort(
+                self._contents[path]["links"], key=lambda x: self._contents[x]["name"])
+        self._finish_node(path)
+
+    def _intern(self, string):
+        """
+            Get the shared copy of a string, so paths repeated across links and
+            breadcrumbs are only stored once.
+
+            :param string: The string
+            :type string: string
+            :returns: The shared copy of the string
+        """
+
+        return self._strings.setdefault(string, string)
+
+    def _get_breadcrumbs(self, parent):
+        """
+            Get the breadcrumbs for the children of a folder: the paths of the
+            folder's ancestors followed by the folder itself, excluding the
+            root folder. The breadcrumbs are an immutable tuple that is built
+            once per folder and shared by all of its children, so a deep tree
+            stores one chain per folder rather than one per node.
+
+            For example, the children of ``"category1/category2/variant1"``
+            would share::
+
+                (
+                    "category1",
+                    "category1/category2",
+                    "category1/category2/variant1"
+                )
+
+            :param parent: The path of the folder
+            :type parent: string
+            :returns: The breadcrumbs
+        """
+
+        breadcrumbs = self._breadcrumbs.get(parent)
+        if breadcrumbs is None:
+            if parent:
+                breadcrumbs = self._contents[parent]["breadcrumbs"] + (self._intern(parent),)
+            else:
+                breadcrumbs = ()
+            self._breadcrumbs[parent] = breadcrumbs
+        return breadcrumbs
+
+    def _count_stat(self, name, count=1):
+        """
+            Increment one of the file system call counters.
+
+            :param name: The name of the counter
+            :type name: string
+            :param count: The amount to increment it by
+            :type count: int
+        """
+
+        with self._stats_lock:
+            self._stats[name] += count
+
+    def _prefetch_dirs(self, paths, recursive=True):
+        """
+            Read a set of directories and all of the folders below them using
+            the pool of threads. The tree is read a level at a time, with every
+            directory on a level read concurrently. The results are stored to
+            be used by :meth:`_load_dirs`, so the tree it builds is the same as
+            for a sequential parse.
+
+            :param paths: The paths of the directories to read
+            :type paths: list
+            :param recursive: Whether to read the folders below the
+                directories, or only the directories themselves
+            :type recursive: bool
+        """
+
+        while paths:
+            results = self._pool.map(self._try_read_dir, paths)
+            child_paths = []
+            for path, (dir_info, exc_info) in zip(paths, results):
+                if exc_info:
+                    future.utils.raise_(exc_info[1], None, exc_info[2])
+                self._dir_infos[path] = dir_info
+                if recursive and dir_info.meta_type == "folder":
+                    child_paths.extend(
+                        os.path.join(path, child) for child in dir_info.listing.dirs)
+            paths = child_paths
+
+    def _try_read_dir(self, path):
+        """
+            Read a directory in a worker thread, catching any exception so it
+            can be raised again in the main thread.
 
-    def _load_folder(self, meta, path):
+            :param path: The path of the directory
+            :type path: string
+            :returns: The directory info and ``None``, or ``None`` and the
+                exception info
+        """
+
+        try:
+            return self._read_dir(path), None
+        except BaseException:
+            return None, sys.exc_info()
+
+    def _read_dir(self, path, read_meta=True):
+        """
+            Read the listing and meta data of a directory. With a snapshot, a
+            directory that has not changed since the snapshot was taken is
+            read from it instead, including the nodes loaded from it. A
+            directory's modification time changes whenever an entry is added,
+            removed or renamed, so only its meta file has to be checked as
+            well.
+
+            :param path: The path of the directory
+            :type path: string
+            :param read_meta: Whether to read the meta data, which is not read
+                for the directories of assets in a guide
+            :type read_meta: bool
+            :returns: The directory info
+        """
+
+        full_path = os.path.join(self._root, path)
+        signature = None
+        if self._snapshot:
+            signature = (read_meta,) + self._get_file_signature(full_path)
+            dir_info = self._snapshot.get(path)
+            if dir_info and dir_info.signature[:len(signature)] == signature:
+                try:
+                    if not dir_info.meta_type or dir_info.signature[len(signature):] == \
+                            self._get_file_signature(full_path, dir_info.meta_type):
+                        return dir_info
+                except OSError:
+                    # the meta file was removed, so the directory changed
+                    pass
+
+        listing = self._scan_dir(path)
+        if read_meta:
+            for meta_type in ("folder", "guide"):
+                if "{}_meta.yaml".format(meta_type) in listing.files:
+                    if signature:
+                        signature += self._get_file_signature(full_path, meta_type)
+                    meta = self._load_meta(
+                        os.path.join(full_path, "{}_meta.yaml".format(meta_type)))
+                    return _DirInfo(listing, meta_type, meta, signature, None)
+        return _DirInfo(listing, None, None, signature, None)
+
+    def _get_file_signature(self, path, meta_type=None):
+        """
+            Get the modification time and size of a directory or of its meta
+            file.
+
+            :param path: The full path of the directory
+            :type path: string
+            :param meta_type: The type of the meta file, to get the signature
+                of the meta file, or ``None`` for the directory itself
+            :type meta_type: string
+            :returns: The signature, as a tuple
+        """
+
+        if meta_type:
+            path = os.path.join(path, "{}_meta.yaml".format(meta_type))
+        self._count_stat("stats")
+        return cece.util.get_file_signature(path)
+
+    def _save_dir(self, path, dir_info):
+        """
+            Keep the info of a loaded directory in the snapshot, if there is
+            one.
+
+            :param path: The path of the directory
+            :type path: string
+            :param dir_info: The directory info
+            :type dir_info: _DirInfo
+        """
+
+        if self._snapshot:
+            self._snapshot.set(path, dir_info)
+
+    def _restore_nodes(self, nodes):
+        """
+            Add nodes loaded from a snapshot, and report every node other than
+            folders as final. Folders have to be reported by the caller.
+
+            :param nodes: The path and node of each node
+            :type nodes: list
+        """
+
+        for path, node in nodes:
+            if node.type == "asset":
+                self._check_asset(path)
+            self._contents[self._intern(path)] = node
+        for path, node in nodes:
+            if node.type != "folder":
+                self._finish_node(path)
+
+    def _load_meta(self, path):
+        """
+            Load a meta file, through the meta cache if there is one.
+
+            :param path: The path of the meta file
+            :type path: string
+            :returns: The meta data
+        """
+
+        if self._meta_cache:
+            self._count_stat("stats")
+            return self._meta_cache.load(path)
+        return cece.util.load_yaml_file(path)
+
+    def _scan_dir(self, path):
+        """
+            List a directory, splitting its entries into directories and
+            files. The file type comes from the listing itself, so on most
+            file systems no entry has to be stat'ed.
+
+            :param path: The path of the directory
+            :type path: string
+            :returns: The names of the directories and files
+        """
+
+        self._count_stat("listings")
+        listing = _Listing([], [])
+        for entry in scandir(os.path.join(self._root, path)):
+            if entry.is_dir():
+                listing.dirs.append(entry.name)
+            else:
+                listing.files.append(entry.name)
+        return listing
+
+    def _load_folder(self, meta, path, listing):
         """
             Load the contents of a folder into the cache.
 
@@ -106,31 +491,30 @@ class Parser(object):
             :type meta: dict
             :param path: The path of the folder
             :type path: string
+            :param listing: The listing of the folder
+            :type listing: _Listing
         """
 
-        # load the children
-        child_links = []
-        for child_folder in os.listdir(path):
-            child_folder_path = os.path.join(path, child_folder)
-            # if the child directory is a folder, load it
-            if os.path.isdir(child_folder_path):
-                # if the load succeeds, add the child to the list of children links
-                if self._load_dirs(child_folder_path):
-                    child_links.append(child_folder_path)
-
-        # add link to folder to parent
-        self._contents[os.path.dirname(path)]["links"].append(path)
         # add entry for folder
-        self._contents[path] = {
-            "type": "folder",
-            "links": child_links,
-            "name": meta["name"],
-            "short_name": meta["name"],
-            "description": meta["description"],
-            "breadcrumbs": _get_breadcrumbs(path)
-        }
-
-    def _load_guide(self, meta, path):
+        self._contents[path] = cece.node.Folder(
+            meta["name"], meta["name"], meta["description"],
+            self._get_breadcrumbs(os.path.dirname(path)))
+
+        # load the children, adding each child directory that loads
+        # successfully to the list of children links. when nodes are
+        # reported as they are final, the children are read ahead here rather
+        # than with the whole tree
+        if self._pool and self._on_node:
+            self._prefetch_dirs(
+                [os.path.join(path, child_folder) for child_folder in listing.dirs],
+                recursive=False)
+        for child_folder in listing.dirs:
+            child_folder_path = self._intern(os.path.join(path, child_folder))
+            if self._load_dirs(child_folder_path):
+                self._contents[path]["links"].append(child_folder_path)
+        self._finish_folder(path)
+
+    def _load_guide(self, meta, path, listing):
         """
             Load the contents of the guide into the cache.
 
@@ -138,88 +522,173 @@ class Parser(object):
             :type meta: dict
             :param path: The path to the guide folder
             :type path: string
+            :param listing: The listing of the guide folder
+            :type listing: _Listing
+            :returns: The path and node of each node loaded from the guide
+                folder itself, in the order they are reported
         """
 
         # add entry for main guide folder
-        self._contents[path] = {
-            "type": "folder",
-            "links": [],
-            "name": meta["name"],
-            "short_name": meta["name"],
-            "description": meta["description"],
-            "breadcrumbs": _get_breadcrumbs(path)
-        }
-
-        # loop through all markdown files
-        for variant_src_path in fnmatch.filter(os.listdir(path), "*.md"):
+        self._contents[path] = cece.node.Folder(
+            meta["name"], meta["name"], meta["description"],
+            self._get_breadcrumbs(os.path.dirname(path)))
+
+        # loop through all markdown files, except for snippets, which are
+        # only included in other files
+        nodes = []
+        tag_ids = []
+        for variant_src_path in fnmatch.filter(listing.files, "*.md"):
+            if variant_src_path.startswith("_"):
+                continue
             variant_full_path = os.path.join(path, variant_src_path)
 
+            # find the variants named by the tags in the file name, by group
+            found_variants = {}
+            for variant_tag in os.path.splitext(variant_src_path)[0].split("-"):
+                for variant in self._variant_index.get(variant_tag, ()):
+                    found_variants.setdefault(variant.group, {})[variant.position] = variant
+
             # verify that only one variant of each group is in the file name,
             # and that all variant groups have a variant
-            variant_tags = os.path.splitext(variant_src_path)[0].split("-")
-            actual_tags = []
-            # iterate over each expected variant group
+            actual_variants = []
             for expected_variant_group_key in meta["variant_groups"]:
-                expected_variant_group = self._config["variant_groups"][expected_variant_group_key]
-                found_one = False
-                # loop over variants in expected group
-                for variant in expected_variant_group["variants"]:
-                    # if the current variant is in the list of tags, do the following:
-                    # if it is new, append it to the actual tags
-                    # if one was previously found, raise an exception
-                    if variant["id"] in variant_tags:
-                        if found_one:
-                            raise ParsingException(
-                                variant_full_path,
-                                "Cannot have multiple variants in the variant group \"{}\"."
-                                .format(expected_variant_group["name"]))
-                        actual_tags.append(variant["id"])
-                        found_one = True
-                # if no variants in the expected group were found, raise an exception
-                if not found_one:
+                group_variants = found_variants.get(expected_variant_group_key)
+                if not group_variants:
+                    raise ParsingException(
+                        variant_full_path,
+                        "No variants for variant group \"{}\" found".format(
+                            self._config["variant_groups"][expected_variant_group_key]["name"]))
+                if len(group_variants) > 1:
                     raise ParsingException(
                         variant_full_path,
-                        "No variants for variant group \"{}\" found"
-                        .format(expected_variant_group["name"]))
+                        "Cannot have multiple variants in the variant group \"{}\".".format(
+                            self._config["variant_groups"][expected_variant_group_key]["name"]))
+                actual_variants.extend(group_variants.values())
+            actual_tags = [variant.tag for variant in actual_variants]
+            variant_names = [variant.name for variant in actual_variants]
 
             # create entries for variant tags if they don't exist
             for variant_tags in cece.util.iterate_list_subsets(actual_tags[:-1]):
-                current_tag = variant_tags[-1]
                 parent = os.path.join(path, *variant_tags[:-1])
-                tag_id = os.path.join(path, *variant_tags)
+                tag_id = self._intern(os.path.join(path, *variant_tags))
                 # this tag may have been added already as a parent of another
                 # tag, so check that first
                 if tag_id not in self._contents:
                     # add tag to parent links
                     self._contents[parent]["links"].append(tag_id)
                     # add entry for self
-                    self._contents[tag_id] = {
-                        "type": "folder",
-                        "links": [],
-                        "name": "{} ({})".format(meta["name"], ", ".join(
-                            self._config["variants"][variant_tag]["name"]
-                            for variant_tag in variant_tags)),
-                        "short_name": self._config["variants"][current_tag]["name"],
-                        "description": meta["description"],
-                        "breadcrumbs": _get_breadcrumbs(tag_id)
-                    }
+                    tag_ids.append(tag_id)
+                    self._contents[tag_id] = cece.node.Folder(
+                        "{} ({})".format(
+                            meta["name"], ", ".join(variant_names[:len(variant_tags)])),
+                        variant_names[len(variant_tags) - 1],
+                        meta["description"],
+                        self._get_breadcrumbs(parent))
 
             # create entry for variant
-            current_tag = actual_tags[-1]
             parent = os.path.join(path, *actual_tags[:-1])
-            variant_id = os.path.join(path, *actual_tags)
+            variant_id = self._intern(os.path.join(path, *actual_tags))
             # add variant to parent links
             self._contents[parent]["links"].append(variant_id)
-            self._contents[variant_id] = {
-                "type": "page",
-                "name": "{} ({})".format(meta["name"], ", ".join(
-                    self._config["variants"][actual_tag]["name"]
-                    for actual_tag in actual_tags)),
-                "short_name": self._config["variants"][current_tag]["name"],
-                "description": meta["description"],
-                "source_path": os.path.join(os.getcwd(), variant_full_path),
-                "breadcrumbs": _get_breadcrumbs(variant_id)
-            }
+            self._contents[variant_id] = cece.node.Page(
+                "{} ({})".format(meta["name"], ", ".join(variant_names)),
+                variant_names[-1],
+                meta["description"],
+                self._get_breadcrumbs(parent),
+                os.path.join(self._root, variant_full_path))
+            nodes.append((variant_id, self._contents[variant_id]))
+            self._finish_node(variant_id)
+
+        # add every other file in the guide folder as an asset
+        nodes.extend(self._load_assets(path, listing, self._get_breadcrumbs(path)))
+        self._load_asset_dirs(path, listing, self._get_breadcrumbs(path))
+
+        # the guide and its variant tags are complete, and each tag is
+        # created before the tags below it, so they are finished in reverse
+        for folder_id in list(reversed(tag_ids)) + [path]:
+            nodes.append((folder_id, self._contents[folder_id]))
+            self._finish_folder(folder_id)
+        return nodes
+
+    def _load_assets(self, path, listing, breadcrumbs):
+        """
+            Load the assets in a guide folder, or a directory below it, into
+            the cache, not including the directories below it. Assets are
+            every file other than Markdown sources and meta files. Hidden files
+            are skipped.
+
+            :param path: The path of the directory
+            :type path: string
+            :param listing: The listing of the directory
+            :type listing: _Listing
+            :param breadcrumbs: The breadcrumbs of the guide
+            :type breadcrumbs: tuple
+            :returns: The path and node of each asset
+        """
+
+        assets = []
+        for asset_file in listing.files:
+            if (asset_file.startswith(".") or asset_file.endswith(".md") or
+                    asset_file == "guide_meta.yaml"):
+                continue
+            asset_id = self._intern(os.path.join(path, asset_file))
+            self._check_asset(asset_id)
+            self._contents[asset_id] = cece.node.Asset(
+                asset_file, breadcrumbs, os.path.join(self._root, asset_id))
+            assets.append((asset_id, self._contents[asset_id]))
+            self._finish_node(asset_id)
+        return assets
+
+    def _check_asset(self, asset_id):
+        """
+            Check that an asset would not be written over the output of
+            another node, or over the temporary file another asset is written
+            through, or the other way around.
+
+            :param asset_id: The path of the asset
+            :type asset_id: string
+        """
+
+        if asset_id in self._contents:
+            raise ParsingException(asset_id, "Asset conflicts with a page or folder")
+        dir_path, name = os.path.split(asset_id)
+        if name in _PAGE_OUTPUT_NAMES and dir_path in self._contents:
+            raise ParsingException(
+                asset_id, "Asset conflicts with the page of \"{}\"".format(dir_path))
+        other_ids = [asset_id + _TEMP_EXTENSION]
+        if asset_id.endswith(_TEMP_EXTENSION):
+            other_ids.append(asset_id[:-len(_TEMP_EXTENSION)])
+        for other_id in other_ids:
+            other = self._contents.get(other_id)
+            if other is not None and other.type == "asset":
+                raise ParsingException(
+                    asset_id, "Asset conflicts with the temporary file of \"{}\"".format(
+                        min(asset_id, other_id, key=len)))
+
+    def _load_asset_dirs(self, path, listing, breadcrumbs):
+        """
+            Load the assets in the directories below a guide folder, or below
+            a directory in it. Hidden directories are skipped.
+
+            :param path: The path of the directory
+            :type path: string
+            :param listing: The listing of the directory
+            :type listing: _Listing
+            :param breadcrumbs: The breadcrumbs of the guide
+            :type breadcrumbs: tuple
+        """
+
+        for asset_dir in listing.dirs:
+            if not asset_dir.startswith("."):
+                asset_dir_path = self._intern(os.path.join(path, asset_dir))
+                dir_info = self._read_dir(asset_dir_path, read_meta=False)
+                if dir_info.nodes is None:
+                    dir_info = dir_info._replace(nodes=self._load_assets(
+                        asset_dir_path, dir_info.listing, breadcrumbs))
+                else:
+                    self._restore_nodes(dir_info.nodes)
+                self._save_dir(asset_dir_path, dir_info)
+                self._load_asset_dirs(asset_dir_path, dir_info.listing, breadcrumbs)
 
     def _load_dirs(self, root_dir):
         """
@@ -229,16 +698,35 @@ class Parser(object):
             :type root_dir: string
         """
 
-        folder_meta_path = os.path.join(root_dir, "folder_meta.yaml")
-        guide_meta_path = os.path.join(root_dir, "guide_meta.yaml")
+        dir_info = self._dir_infos.pop(root_dir, None) or self._read_dir(root_dir)
+
+        if dir_info.meta_type == "folder":
+            self._load_folder(dir_info.meta, root_dir, dir_info.listing)
+        elif dir_info.meta_type == "guide":
+            if dir_info.nodes is None:
+                dir_info = dir_info._replace(
+                    nodes=self._load_guide(dir_info.meta, root_dir, dir_info.listing))
+            else:
+                self._restore_guide(root_dir, dir_info)
+        self._save_dir(root_dir, dir_info)
 
-        if os.path.exists(folder_meta_path):
-            meta = cece.util.load_yaml_file(folder_meta_path)
-            self._load_folder(meta, root_dir)
-        elif os.path.exists(guide_meta_path):
-            meta = cece.util.load_yaml_file(guide_meta_path)
-            self._load_guide(meta, root_dir)
-        else:
-            return False
+        return dir_info.meta_type is not None
+
+    def _restore_guide(self, path, dir_info):
+        """
+            Load a guide whose folder has not changed from the snapshot. The
+            directories of assets below it are loaded as usual, as each of
+            them is checked against the snapshot separately.
+
+            :param path: The path of the guide folder
+            :type path: string
+            :param dir_info: The directory info of the guide folder, from the
+                snapshot
+            :type dir_info: _DirInfo
+        """
 
-        return True
+        self._restore_nodes(dir_info.nodes)
+        self._load_asset_dirs(path, dir_info.listing, self._get_breadcrumbs(path))
+        for node_path, node in dir_info.nodes:
+            if node.type == "folder":
+                self._finish_node(node_path)
@@ -0,0 +1,204 @@
+"""
+.. module cece.search
+
+A client side search index, built while the pages are compiled. The index is
+inverted, mapping each term to the pages that contain it, and is split into
+shards by the first two characters of each term, so a browser only fetches the
+shards for the terms it searches for. Each shard is a JSON file in the
+``search`` directory of the build, with the form::
+
+    {
+        "pages": {"<path>": "<page name>", ...},
+        "terms": {"<term>": [["<path>", <score>], ...], ...}
+    }
+
+where the pages of each term are sorted by descending score. The url of a page
+is ``/<path>/``.
+"""
+
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import binascii
+import cece.util
+import collections
+import future.utils
+import json
+import re
+
+
+INDEX_DIR = "search"
+"""
+    The directory the shards are written to, relative to the build directory.
+"""
+
+STATE_NAME = "search.json"
+"""
+    The name of the file the terms of every page are kept in between builds,
+    stored in the cache directory, as it holds the whole index.
+"""
+
+PREFIX_LENGTH = 2
+"""
+    The number of leading characters of a term that pick its shard. Terms
+    shorter than this are not indexed.
+"""
+
+NAME_WEIGHT = 10
+"""
+    The score of a term in the name of a page.
+"""
+
+DESCRIPTION_WEIGHT = 5
+"""
+    The score of a term in the description of a page.
+"""
+
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+"""
+    Matches a term.
+"""
+
+_SHARD_NAME_RE = re.compile(r"^[a-z0-9]+$")
+"""
+    Matches a prefix that can be used as a file name as is.
+"""
+
+
+def get_terms(name, description, text):
+    """
+        Get the scored terms of a page. Every occurrence of a term adds to its
+        score, with occurrences in the name and description weighted higher
+        than those in the text.
+
+        :param name: The name of the page
+        :type name: string
+        :param description: The description of the page
+        :type description: string
+        :param text: The Markdown source of the page
+        :type text: string
+        :returns: The score of each term, as a dictionary
+    """
+
+    terms = collections.defaultdict(int)
+    for source, weight in ((name, NAME_WEIGHT), (description, DESCRIPTION_WEIGHT), (text, 1)):
+        for term in _TERM_RE.findall((source or "").lower()):
+            if len(term) >= PREFIX_LENGTH:
+                terms[term] += weight
+    return dict(terms)
+
+
+def get_shard_name(prefix):
+    """
+        Get the file name of the shard for a prefix. Prefixes that are not
+        lowercase ASCII letters and digits are hex encoded, so every name is
+        safe on every file system. Browsers must encode the prefix of a query
+        the same way.
+
+        :param prefix: The prefix of the terms in the shard
+        :type prefix: string
+        :returns: The file name
+    """
+
+    if not _SHARD_NAME_RE.match(prefix):
+        prefix = "_" + binascii.hexlify(prefix.encode("utf-8")).decode("ascii")
+    return prefix + ".json"
+
+
+class SearchIndex(object):
+    """
+        The terms of every indexed page, from which the shards are built. Only
+        the shards whose terms changed have to be built again after an update.
+
+        :param pages: The name and scored terms of each page, by path
+        :type pages: dict
+    """
+
+    def __init__(self, pages=None):
+        self._pages = pages or {}
+
+    @classmethod
+    def load(cls, path):
+        """
+            Load an index saved with :meth:`save`.
+
+            :param path: The path of the saved index
+            :type path: string
+            :returns: The index, or ``None`` if it is missing or unreadable
+        """
+
+        try:
+            with open(path, "r") as f:
+                return cls(json.load(f))
+        except (IOError, OSError, ValueError):
+            return None
+
+    def save(self, path):
+        """
+            Save the index, so the next build can update it.
+
+            :param path: The path to save the index to
+            :type path: string
+        """
+
+        cece.util.write_file(
+            path, cece.util.encode_text(json.dumps(self._pages, sort_keys=True)))
+
+    def update(self, pages, removed=()):
+        """
+            Add or replace pages in the index, and remove others.
+
+            :param pages: The name and scored terms of each page to add, by
+                path
+            :type pages: dict
+            :param removed: The paths of the pages to remove
+            :type removed: iterable
+            :returns: The prefixes of the shards that changed
+        """
+
+        prefixes = set()
+        for path in list(removed) + list(pages):
+            old = self._pages.pop(path, None)
+            if old:
+                prefixes.update(term[:PREFIX_LENGTH] for term in old["terms"])
+        for path, page in future.utils.viewitems(pages):
+            self._pages[path] = page
+            prefixes.update(term[:PREFIX_LENGTH] for term in page["terms"])
+        return prefixes
+
+    def get_shards(self, prefixes):
+        """
+            Build the shards for a set of prefixes.
+
+            :param prefixes: The prefixes of the shards
+            :type prefixes: set
+            :returns: The data of each shard, by prefix. Shards with no terms
+                are ``None``.
+        """
+
+        shards = dict((prefix, None) for prefix in prefixes)
+        for path, page in future.utils.viewitems(self._pages):
+            for term, score in future.utils.viewitems(page["terms"]):
+                prefix = term[:PREFIX_LENGTH]
+                if prefix not in shards:
+                    continue
+                if shards[prefix] is None:
+                    shards[prefix] = {"pages": {}, "terms": {}}
+                shards[prefix]["pages"][path] = page["name"]
+                shards[prefix]["terms"].setdefault(term, []).append([path, score])
+
+        for shard in shards.values():
+            if shard:
+                for postings in shard["terms"].values():
+                    postings.sort(key=lambda posting: (-posting[1], posting[0]))
+        return shards
+
+    def get_prefixes(self):
+        """
+            Get the prefixes of every shard in the index.
+
+            :returns: The prefixes
+        """
+
+        return set(
+            term[:PREFIX_LENGTH] for page in self._pages.values() for term in page["terms"])
@@ -7,11 +7,32 @@ Utilities for cece
 from __future__ import print_function
 from __future__ import unicode_literals
 
+import filecmp
 import os
 import re
+import shutil
 import sys
 import yaml
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+"""
+    The loader used for yaml files. This is the libyaml based loader when
+    PyYAML was built with it, and the pure Python loader otherwise.
+"""
+
+
+FICLONE = 0x40049409
+"""
+    The Linux ioctl that makes a file share the blocks of another file, on file
+    systems that support it, such as Btrfs and XFS.
+"""
+
 
 def load_yaml_file(path):
     """
@@ -24,7 +45,7 @@ def load_yaml_file(path):
 
     try:
         with open(path, "r") as f:
-            return yaml.load(f)
+            return yaml.load(f, Loader=YAML_LOADER)
     except yaml.YAMLError as e:
         print("Error parsing \"{0}\":".format(path))
         print(e)
@@ -84,3 +105,135 @@ def iterate_list_subsets(lst):
 
     for i in range(1, len(lst) + 1):
         yield lst[:i]
+
+
+def encode_text(text):
+    """
+        Encode text as utf-8 bytes, for hashing or writing. Text that is
+        already encoded is returned unchanged.
+
+        :param text: The text to encode
+        :type text: string
+        :returns: The encoded text
+    """
+
+    if isinstance(text, bytes):
+        return text
+    return text.encode("utf-8")
+
+
+def get_file_signature(path):
+    """
+        Get the modification time and size of a file, which change whenever
+        its contents do. The modification time is in nanoseconds where the
+        platform has them.
+
+        :param path: The path of the file
+        :type path: string
+        :returns: The signature, as a tuple
+    """
+
+    stat = os.stat(path)
+    return (getattr(stat, "st_mtime_ns", stat.st_mtime), stat.st_size)
+
+
+def replace_file(src, dst):
+    """
+        Move a file into place, replacing any existing file at the destination.
+        On POSIX systems the replacement is atomic.
+
+        :param src: The file to move
+        :type src: string
+        :param dst: The destination path
+        :type dst: string
+    """
+
+    if hasattr(os, "replace"):
+        os.replace(src, dst)
+    else:
+        if os.name == "nt" and os.path.exists(dst):
+            os.remove(dst)
+        os.rename(src, dst)
+
+
+def files_equal(path1, path2):
+    """
+        Check whether two files exist and have the same contents. The files are
+        compared in blocks, so neither is read into memory whole.
+
+        :param path1: The path of the first file
+        :type path1: string
+        :param path2: The path of the second file
+        :type path2: string
+        :returns: Whether the files have the same contents
+    """
+
+    try:
+        return filecmp.cmp(path1, path2, shallow=False)
+    except (IOError, OSError):
+        return False
+
+
+def write_file(path, data):
+    """
+        Write a file by writing a temporary file next to it and moving that
+        into place, so the file is never seen partially written.
+
+        :param path: The path of the file
+        :type path: string
+        :param data: The contents to write
+        :type data: bytes
+    """
+
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+    replace_file(temp_path, path)
+
+
+def _reflink_file(src, dst):
+    """
+        Copy a file as a reflink, which shares the blocks of the source until
+        either file is modified.
+
+        :param src: The file to copy
+        :type src: string
+        :param dst: The destination path
+        :type dst: string
+        :returns: Whether the file system supports reflinks
+    """
+
+    if fcntl is None or not sys.platform.startswith("linux"):
+        return False
+    try:
+        with open(src, "rb") as src_file, open(dst, "wb") as dst_file:
+            fcntl.ioctl(dst_file.fileno(), FICLONE, src_file.fileno())
+    except (IOError, OSError):
+        if os.path.exists(dst):
+            os.remove(dst)
+        return False
+    shutil.copystat(src, dst)
+    return True
+
+
+def link_file(src, dst):
+    """
+        Make a file available at a new path without copying its contents if
+        possible. It is hard linked if the file system allows it, or copied as
+        a reflink, and otherwise copied, which the standard library does in the
+        kernel where it can. The destination must not exist. In every case the
+        destination keeps the modification time of the source.
+
+        :param src: The file to link
+        :type src: string
+        :param dst: The destination path
+        :type dst: string
+    """
+
+    try:
+        os.link(src, dst)
+        return
+    except (AttributeError, OSError):
+        pass
+    if not _reflink_file(src, dst):
+        shutil.copy2(src, dst)
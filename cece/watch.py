@@ -0,0 +1,353 @@
+"""
+.. module cece.watch
+
+Watch mode keeps the configuration, the parsed guides and the compiler in
+memory, rebuilds only what a change to the sources affects, and serves the
+build over HTTP. Changes are reported by the file system through the watchdog
+package if it is installed, and otherwise found by polling, which stats every
+watched file on each check.
+"""
+
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import cece.parser
+import cece.util
+import future.utils
+import os
+import posixpath
+import threading
+import time
+
+from future.moves.http.server import HTTPServer, SimpleHTTPRequestHandler
+from future.moves.socketserver import ThreadingMixIn
+from future.moves.urllib.parse import unquote
+
+try:
+    import watchdog.observers
+except ImportError:
+    watchdog = None
+
+
+class _BuildServer(ThreadingMixIn, HTTPServer):
+    """
+        An HTTP server for the build directory, which handles each request in
+        its own thread.
+    """
+
+    daemon_threads = True
+
+
+class _BuildRequestHandler(SimpleHTTPRequestHandler):
+    """
+        A request handler that serves files from the build directory. The
+        compiler changes the working directory while it builds, so paths are
+        resolved against the absolute build directory rather than the working
+        directory.
+    """
+
+    def translate_path(self, path):
+        """
+            Translate a url path to a path in the build directory.
+
+            :param path: The url path
+            :type path: string
+            :returns: The file system path
+        """
+
+        path = path.split("?", 1)[0].split("#", 1)[0]
+        parts = [part for part in posixpath.normpath(unquote(path)).split("/")
+                 if part not in ("", ".", "..")]
+        return os.path.join(self.server.build_dir, *parts)
+
+
+def _snapshot(paths):
+    """
+        Record the modification time and size of every file in a set of files
+        and directories.
+
+        :param paths: The files and directories to record
+        :type paths: list
+        :returns: The modification time and size of each file, by path
+    """
+
+    snapshot = {}
+    for path in paths:
+        for dir_path, dir_names, file_names in os.walk(path):
+            for file_name in file_names:
+                file_path = os.path.join(dir_path, file_name)
+                try:
+                    snapshot[file_path] = cece.util.get_file_signature(file_path)
+                except OSError:
+                    continue
+        if os.path.isfile(path):
+            snapshot[path] = cece.util.get_file_signature(path)
+    return snapshot
+
+
+class _EventCollector(object):
+    """
+        Collects the paths changed by file system events, which watchdog
+        dispatches from its own thread, until they are popped.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._changed = set()
+        self._added_or_removed = set()
+
+    def dispatch(self, event):
+        """
+            Record the paths changed by an event.
+
+            :param event: The event
+            :type event: watchdog.events.FileSystemEvent
+        """
+
+        if event.event_type == "modified":
+            # a directory is modified whenever its entries change, which is
+            # reported by events of their own
+            if not event.is_directory:
+                with self._lock:
+                    self._changed.add(event.src_path)
+        elif event.event_type in ("created", "deleted", "moved"):
+            paths = [event.src_path]
+            if event.event_type == "moved":
+                paths.append(event.dest_path)
+            with self._lock:
+                self._changed.update(paths)
+                self._added_or_removed.update(paths)
+
+    def pop(self):
+        """
+            Get the paths changed since the last call.
+
+            :returns: The paths of the changed files, and of the files that
+                were added or removed
+        """
+
+        with self._lock:
+            changed, self._changed = self._changed, set()
+            added_or_removed, self._added_or_removed = self._added_or_removed, set()
+        return changed, added_or_removed
+
+
+class Watcher(object):
+    """
+        Watches the configuration, the guides and the templates, and rebuilds
+        the site when they change. Changes are tracked to the outputs they
+        affect:
+
+        * A change to the configuration reloads it and rebuilds everything.
+        * A change to the templates recreates the compiler.
+        * Edits to existing Markdown sources re-render only their pages, and
+          edits to existing assets publish only those assets.
+        * Any other change, such as an edited meta file or an added, removed
+          or renamed file, parses the guides again. The compiler then
+          re-renders only the outputs whose inputs changed, which includes
+          every descendant of a renamed folder.
+
+        :param load_config: Loads the configuration
+        :type load_config: function
+        :param parse: Parses the guides, given the configuration
+        :type parse: function
+        :param create_compiler: Creates an incremental compiler, given the
+            configuration and the guides
+        :type create_compiler: function
+        :param template_dir: The directory of templates to watch, or ``None``
+            for the bundled templates
+        :type template_dir: string
+        :param interval: The number of seconds between checks for changes
+        :type interval: float
+        :param poll: Whether to poll for changes even if watchdog is
+            installed, such as for a network file system that does not report
+            changes made on other machines
+        :type poll: bool
+    """
+
+    def __init__(self, load_config, parse, create_compiler, template_dir=None, interval=0.25,
+                 poll=False):
+        self._load_config = load_config
+        self._parse = parse
+        self._create_compiler = create_compiler
+        self._interval = interval
+        self._poll = poll or watchdog is None
+        self._events = None
+        self._config_path = os.path.realpath("config.yaml")
+        self._guides_dir = os.path.realpath("guides")
+        self._template_dir = os.path.realpath(
+            template_dir or os.path.join(os.path.dirname(__file__), "templates"))
+        self._config = None
+        self._guides = None
+        self._compiler = None
+        self._pages = {}
+        self._snapshot = {}
+
+    def run(self, host, port):
+        """
+            Build the site, serve it, and rebuild it whenever the sources
+            change. This runs until it is interrupted.
+
+            :param host: The address to serve on
+            :type host: string
+            :param port: The port to serve on
+            :type port: int
+        """
+
+        observer = None
+        if self._poll:
+            self._snapshot = self._take_snapshot()
+        else:
+            observer = self._start_observer()
+        self._rebuild(None)
+
+        server = _BuildServer((host, port), _BuildRequestHandler)
+        server.build_dir = os.path.realpath("build")
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        print("Serving on http://{}:{}/".format(host, port))
+
+        try:
+            while True:
+                time.sleep(self._interval)
+                changed, added_or_removed = self._get_changes()
+                if changed:
+                    self._rebuild(changed, added_or_removed)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.shutdown()
+            server.server_close()
+            if observer:
+                observer.stop()
+                observer.join()
+
+    def _start_observer(self):
+        """
+            Start watching for file system events with watchdog. The guides
+            and the templates are watched recursively, and the site directory
+            only for the configuration.
+
+            :returns: The running observer
+        """
+
+        self._events = _EventCollector()
+        observer = watchdog.observers.Observer()
+        observer.schedule(self._events, os.path.dirname(self._config_path))
+        for path in (self._guides_dir, self._template_dir):
+            if os.path.isdir(path):
+                observer.schedule(self._events, path, recursive=True)
+        observer.start()
+        return observer
+
+    def _get_changes(self):
+        """
+            Get the watched files that changed since the last call, from the
+            file system events if they are watched, and otherwise by comparing
+            a new snapshot with the last one.
+
+            :returns: The paths of the changed files, and of the files that
+                were added or removed
+        """
+
+        if self._events is not None:
+            changed, added_or_removed = self._events.pop()
+            changed = set(path for path in changed if self._is_watched(path))
+            # editors often save a source by moving a new file over it, which
+            # only edits the source as far as the guides are concerned
+            return changed, set(
+                path for path in added_or_removed & changed
+                if path not in self._pages or not os.path.isfile(path))
+
+        snapshot = self._take_snapshot()
+        changed = set(
+            path for path in set(snapshot) | set(self._snapshot)
+            if snapshot.get(path) != self._snapshot.get(path))
+        added_or_removed = set(snapshot) ^ set(self._snapshot)
+        self._snapshot = snapshot
+        return changed, added_or_removed
+
+    def _is_watched(self, path):
+        """
+            Check whether a path is the configuration, or is in the guides or
+            the templates.
+
+            :param path: The path
+            :type path: string
+            :returns: Whether the path is watched
+        """
+
+        return path == self._config_path or any(
+            path.startswith(directory + os.sep)
+            for directory in (self._guides_dir, self._template_dir))
+
+    def _take_snapshot(self):
+        """
+            Record the state of every watched file.
+
+            :returns: The modification time and size of each file, by path
+        """
+
+        return _snapshot([self._config_path, self._guides_dir, self._template_dir])
+
+    def _rebuild(self, changed, added_or_removed=frozenset()):
+        """
+            Rebuild the outputs affected by a set of changed files. Errors are
+            printed rather than raised, so the watcher keeps running until the
+            sources are fixed.
+
+            :param changed: The paths of the changed files, or ``None`` to
+                rebuild everything
+            :type changed: set
+            :param added_or_removed: The paths of the files that were added or
+                removed
+            :type added_or_removed: set
+        """
+
+        start = time.time()
+        try:
+            paths = None
+            if changed is None or self._config_path in changed:
+                self._config = None
+            if self._config is None:
+                self._config = self._load_config()
+                self._guides = None
+            if self._guides is None:
+                self._set_guides(self._parse(self._config))
+                self._compiler = self._create_compiler(self._config, self._guides)
+            elif any(path.startswith(self._template_dir + os.sep) for path in changed):
+                self._compiler = self._create_compiler(self._config, self._guides)
+            elif not added_or_removed and all(path in self._pages for path in changed):
+                paths = [page for path in changed for page in self._pages[path]]
+            else:
+                self._set_guides(self._parse(self._config))
+                self._compiler.set_guides(self._guides)
+            self._compiler.compile(paths)
+        except cece.parser.ParsingException as e:
+            print("Error parsing directory:")
+            print(e)
+            return
+        except (Exception, SystemExit) as e:
+            # loading a yaml file exits on errors, after printing them
+            print("Error building site:")
+            print(e)
+            return
+
+        print("Built {} in {:.3f}s".format(
+            "everything" if paths is None else ", ".join(paths), time.time() - start))
+
+    def _set_guides(self, guides):
+        """
+            Store newly parsed guides, and index their pages and assets by
+            source path.
+
+            :param guides: The parsed guides
+            :type guides: dict
+        """
+
+        self._guides = guides
+        self._pages = {}
+        for path, value in future.utils.viewitems(guides):
+            if value["type"] in ("page", "asset"):
+                self._pages.setdefault(os.path.realpath(value["source_path"]), []).append(path)
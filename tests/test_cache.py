@@ -0,0 +1,175 @@
+"""
+.. module tests.test_cache
+
+Test the caches in cece.cache
+"""
+
+import cece.cache
+import mock
+import os
+import shutil
+import tempfile
+import unittest
+
+
+class TestMarkdownCache(unittest.TestCase):
+    """ Test ``cece.cache.MarkdownCache`` """
+
+    def setUp(self):
+        """ Set up a temporary cache directory. """
+
+        self._temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """ Remove the temporary cache directory. """
+
+        shutil.rmtree(self._temp_dir)
+
+    def test_miss(self):
+        """
+            Test getting a source that has not been cached.
+        """
+
+        cache = cece.cache.MarkdownCache(self._temp_dir, "salt", 1024)
+        self.assertIsNone(cache.get("# Title"))
+
+    def test_hit(self):
+        """
+            Test getting a source that has been cached, from a new cache
+            instance.
+        """
+
+        cece.cache.MarkdownCache(self._temp_dir, "salt", 1024).set("# Title", "<h1>Title</h1>")
+        cache = cece.cache.MarkdownCache(self._temp_dir, "salt", 1024)
+        self.assertEqual(cache.get("# Title"), "<h1>Title</h1>")
+
+    def test_salt(self):
+        """
+            Test that entries are not shared between different salts.
+        """
+
+        cece.cache.MarkdownCache(self._temp_dir, "salt", 1024).set("# Title", "<h1>Title</h1>")
+        cache = cece.cache.MarkdownCache(self._temp_dir, "other salt", 1024)
+        self.assertIsNone(cache.get("# Title"))
+
+    def test_evict(self):
+        """
+            Test that the least recently used entries are evicted first.
+        """
+
+        cache = cece.cache.MarkdownCache(self._temp_dir, "salt", 20)
+        for i, source in enumerate(["old", "used", "new"]):
+            cache.set(source, "0123456789")
+            path = cache._get_path(source)
+            os.utime(path, (i, i))
+        # using an entry makes it the most recently used
+        cache.get("used")
+
+        cache.evict()
+
+        self.assertIsNone(cache.get("old"))
+        self.assertEqual(cache.get("used"), "0123456789")
+        self.assertEqual(cache.get("new"), "0123456789")
+
+
+class TestMetadataCache(unittest.TestCase):
+    """ Test ``cece.cache.MetadataCache`` """
+
+    def setUp(self):
+        """ Set up a temporary directory with a yaml file. """
+
+        self._temp_dir = tempfile.mkdtemp()
+        self._yaml_path = os.path.join(self._temp_dir, "meta.yaml")
+        self._write_yaml("name: Test")
+
+    def tearDown(self):
+        """ Remove the temporary directory. """
+
+        shutil.rmtree(self._temp_dir)
+
+    def _write_yaml(self, contents):
+        """ Write the yaml file. """
+
+        with open(self._yaml_path, "w") as f:
+            f.write(contents)
+
+    def test_unchanged(self):
+        """
+            Test that an unchanged file is loaded from a saved cache without
+            being parsed.
+        """
+
+        cache = cece.cache.MetadataCache(self._temp_dir)
+        self.assertEqual(cache.load(self._yaml_path), {"name": "Test"})
+        cache.save()
+
+        cache = cece.cache.MetadataCache(self._temp_dir)
+        with mock.patch("cece.cache.cece.util.load_yaml_file") as mock_load_yaml_file:
+            self.assertEqual(cache.load(self._yaml_path), {"name": "Test"})
+        mock_load_yaml_file.assert_not_called()
+
+    def test_changed(self):
+        """
+            Test that a file is parsed again when its size changes.
+        """
+
+        cache = cece.cache.MetadataCache(self._temp_dir)
+        cache.load(self._yaml_path)
+        cache.save()
+        self._write_yaml("name: Changed")
+
+        cache = cece.cache.MetadataCache(self._temp_dir)
+        self.assertEqual(cache.load(self._yaml_path), {"name": "Changed"})
+
+    def test_copies(self):
+        """
+            Test that changing loaded contents does not change the cache.
+        """
+
+        cache = cece.cache.MetadataCache(self._temp_dir)
+        cache.load(self._yaml_path)["name"] = "Modified"
+        self.assertEqual(cache.load(self._yaml_path), {"name": "Test"})
+
+
+class TestParseSnapshot(unittest.TestCase):
+    """ Test ``cece.cache.ParseSnapshot`` """
+
+    def setUp(self):
+        """ Set up a temporary snapshot directory. """
+
+        self._temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """ Remove the temporary snapshot directory. """
+
+        shutil.rmtree(self._temp_dir)
+
+    def test_saved(self):
+        """
+            Test that entries set before saving are loaded by a new snapshot,
+            and that entries not used are dropped.
+        """
+
+        snapshot = cece.cache.ParseSnapshot(self._temp_dir, "salt")
+        snapshot.set("used", ("info", 1))
+        snapshot.set("unused", ("info", 2))
+        snapshot.save()
+
+        snapshot = cece.cache.ParseSnapshot(self._temp_dir, "salt")
+        snapshot.set("used", snapshot.get("used"))
+        snapshot.save()
+
+        snapshot = cece.cache.ParseSnapshot(self._temp_dir, "salt")
+        self.assertEqual(snapshot.get("used"), ("info", 1))
+        self.assertIsNone(snapshot.get("unused"))
+
+    def test_salt(self):
+        """
+            Test that entries are discarded when the salt changes.
+        """
+
+        snapshot = cece.cache.ParseSnapshot(self._temp_dir, "salt")
+        snapshot.set("path", ("info", 1))
+        snapshot.save()
+
+        self.assertIsNone(cece.cache.ParseSnapshot(self._temp_dir, "other salt").get("path"))
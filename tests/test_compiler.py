@@ -4,12 +4,36 @@
 Test the Compiler class in cece.compiler
 """
 
+import cece.cache
 import cece.compiler
+import cece.instrument
+import cece.search
+import gzip
+import json
 import mock
 import os
+import re
+import shutil
+import tempfile
 import unittest
 
 
+def _make_guides(guides):
+    """
+        Fill in the fields the parser would produce for a set of test guides.
+        Each node is named after the last part of its path.
+    """
+
+    for path, node in guides.items():
+        name = os.path.basename(path) or "root"
+        node.setdefault("name", name)
+        node.setdefault("short_name", name)
+        node.setdefault("breadcrumbs", ())
+        if node["type"] == "folder":
+            node.setdefault("links", [])
+    return guides
+
+
 class TestMakeIdUrl(unittest.TestCase):
     """ Test ``cece.compiler.Compiler._make_id_url`` """
 
@@ -35,16 +59,23 @@ class TestCompile(unittest.TestCase):
     """ Test ``cece.compiler.Compiler.compile`` """
 
     @mock.patch("cece.compiler.open", create=True)
+    @mock.patch("cece.compiler.io.open")
+    @mock.patch("cece.compiler.cece.util.get_file_signature")
+    @mock.patch("cece.compiler.cece.util.write_file")
+    @mock.patch("cece.compiler.cece.util.replace_file")
+    @mock.patch("cece.compiler.cece.util.files_equal")
     @mock.patch("cece.compiler.cece.util.makedirs")
     @mock.patch("cece.compiler.shutil")
     @mock.patch("cece.compiler.os")
-    def testSuccess(self, mock_os, mock_shutil, mock_makedirs, mock_open):
+    def testSuccess(self, mock_os, mock_shutil, mock_makedirs, mock_files_equal,
+                    mock_replace_file, mock_write_file, mock_get_file_signature,
+                    mock_io_open, mock_open):
         """ Test the compile method for the success case. """
 
         starting_dir = os.sep
 
         config = {"site_title": "Test Site"}
-        guides = {
+        guides = _make_guides({
             "": {"type": "folder"},
             "folder1": {"type": "folder"},
             "folder1/page1": {"type": "page", "source_path": "page1"},
@@ -52,31 +83,660 @@ class TestCompile(unittest.TestCase):
             "folder1/folder2/page2": {"type": "page", "source_path": "page2"},
             "folder3": {"type": "folder"},
             "folder3/page3": {"type": "page", "source_path": "page3"}
-        }
+        })
 
         mock_os.path.isdir.return_value = True
         mock_os.path.join = os.path.join
+        mock_os.path.abspath.side_effect = lambda path: os.path.join(starting_dir, path)
         mock_os.getcwd.return_value = starting_dir
+        mock_open.return_value.__enter__.return_value.read.return_value = "# Test"
+        mock_files_equal.return_value = False
+        mock_get_file_signature.return_value = (0, 6)
 
         compiler = cece.compiler.Compiler(config, guides)
         compiler.compile()
 
-        # check build dir is found and deleted
-        mock_os.path.isdir.assert_called_once_with("build")
-        mock_shutil.rmtree.assert_called_once_with("build")
-
-        # check build dir is created again
-        mock_os.mkdir.assert_any_call("build")
+        # check staging dir is found, deleted and created again
+        mock_os.path.isdir.assert_any_call(cece.compiler.STAGING_DIR)
+        mock_shutil.rmtree.assert_any_call(cece.compiler.STAGING_DIR)
+        mock_os.mkdir.assert_any_call(cece.compiler.STAGING_DIR)
+        mock_os.chdir.assert_any_call(cece.compiler.STAGING_DIR)
 
         # check folders are created
         mock_makedirs.assert_any_call("folder1")
         mock_makedirs.assert_any_call("folder1/folder2")
         mock_makedirs.assert_any_call("folder3")
 
-        # check files are opened for read and write
+        # check sources are read and outputs are written
         mock_open.assert_any_call("page1", "r")
         mock_open.assert_any_call("page2", "r")
         mock_open.assert_any_call("page3", "r")
-        mock_open.assert_any_call(os.path.join("folder1/page1", "index.html"), "w")
-        mock_open.assert_any_call(os.path.join("folder1/folder2/page2", "index.html"), "w")
-        mock_open.assert_any_call(os.path.join("folder3/page3", "index.html"), "w")
+        for path in ["folder1/page1", "folder1/folder2/page2", "folder3/page3"]:
+            index_path = os.path.join(path, "index.html")
+            mock_replace_file.assert_any_call(index_path + ".tmp", index_path)
+        # without a cache directory, there is nowhere to keep the manifest
+        mock_write_file.assert_not_called()
+
+        # check the staging dir replaces the build dir
+        mock_os.rename.assert_any_call("build", cece.compiler.OLD_BUILD_DIR)
+        mock_os.rename.assert_any_call(cece.compiler.STAGING_DIR, "build")
+        mock_shutil.rmtree.assert_called_with(cece.compiler.OLD_BUILD_DIR)
+
+
+class TestIncrementalCompile(unittest.TestCase):
+    """ Test ``cece.compiler.Compiler.compile`` in incremental mode """
+
+    def setUp(self):
+        """ Set up a temporary working directory with two page sources. """
+
+        self._cur_dir = os.getcwd()
+        self._temp_dir = tempfile.mkdtemp()
+        os.chdir(self._temp_dir)
+        for name in ("page1", "page2"):
+            with open(name + ".md", "w") as f:
+                f.write("# " + name)
+
+        self._config = {"site_title": "Test Site"}
+        self._guides = _make_guides({
+            "": {"type": "folder", "links": ["page1", "page2"]},
+            "page1": {"type": "page",
+                      "source_path": os.path.join(self._temp_dir, "page1.md")},
+            "page2": {"type": "page",
+                      "source_path": os.path.join(self._temp_dir, "page2.md")}
+        })
+        cece.compiler.Compiler(self._config, self._guides, cache_dir="cache").compile()
+
+    def tearDown(self):
+        """ Remove the temporary working directory. """
+
+        os.chdir(self._cur_dir)
+        shutil.rmtree(self._temp_dir)
+
+    def _read_output(self, path):
+        """ Read the output for a path. """
+
+        with open(os.path.join("build", path, "index.html"), "r") as f:
+            return f.read()
+
+    def _mark_output(self, path):
+        """ Overwrite the output for a path, so a re-render can be detected. """
+
+        with open(os.path.join("build", path, "index.html"), "w") as f:
+            f.write("unchanged")
+
+    def testOnlyChangedPageRendered(self):
+        """ Test that only the page with a changed source is rendered. """
+
+        self._mark_output("page1")
+        self._mark_output("page2")
+        with open("page2.md", "w") as f:
+            f.write("# changed")
+
+        cece.compiler.Compiler(self._config, self._guides,
+                               incremental=True, cache_dir="cache").compile()
+
+        self.assertEqual(self._read_output("page1"), "unchanged")
+        self.assertIn("<h1>changed</h1>", self._read_output("page2"))
+
+    def testRenamedNodeRendersLinkingFolder(self):
+        """ Test that renaming a node re-renders the folder linking to it. """
+
+        self._mark_output("")
+        self._mark_output("page1")
+        self._guides["page2"]["short_name"] = "renamed"
+
+        cece.compiler.Compiler(self._config, self._guides,
+                               incremental=True, cache_dir="cache").compile()
+
+        self.assertIn("renamed", self._read_output(""))
+        self.assertEqual(self._read_output("page1"), "unchanged")
+
+    def testWithoutManifest(self):
+        """
+            Test that an incremental build without the manifest of the
+            previous build is a full build, which removes the outputs of
+            removed nodes.
+        """
+
+        self._mark_output("page1")
+        del self._guides["page2"]
+        self._guides[""]["links"].remove("page2")
+
+        cece.compiler.Compiler(self._config, self._guides, incremental=True).compile()
+
+        self.assertIn("page1", self._read_output("page1"))
+        self.assertFalse(os.path.exists(os.path.join("build", "page2")))
+
+    def testCompilePaths(self):
+        """ Test that compiling a set of paths only considers those nodes. """
+
+        compiler = cece.compiler.Compiler(self._config, self._guides,
+                                          incremental=True, cache_dir="cache")
+        compiler.compile()
+        self._mark_output("page1")
+        self._mark_output("page2")
+        self._guides["page1"]["name"] = "changed"
+        self._guides["page2"]["name"] = "changed"
+
+        compiler.compile(["page2"])
+
+        self.assertEqual(self._read_output("page1"), "unchanged")
+        self.assertIn("changed", self._read_output("page2"))
+
+    def testCacheEvictedOnlyByFullCompile(self):
+        """ Test that compiling a set of paths does not walk the Markdown cache. """
+
+        compiler = cece.compiler.Compiler(
+            self._config, self._guides, incremental=True, cache_dir="cache")
+        with mock.patch.object(cece.cache.MarkdownCache, "evict") as mock_evict:
+            compiler.compile(["page2"])
+            mock_evict.assert_not_called()
+
+            compiler.compile()
+            mock_evict.assert_called_once_with()
+
+    def testRemovedNodeDeleted(self):
+        """ Test that the output of a node that no longer exists is deleted. """
+
+        del self._guides["page2"]
+        self._guides[""]["links"].remove("page2")
+
+        cece.compiler.Compiler(self._config, self._guides,
+                               incremental=True, cache_dir="cache").compile()
+
+        self.assertTrue(os.path.isfile(os.path.join("build", "page1", "index.html")))
+        self.assertFalse(os.path.exists(os.path.join("build", "page2")))
+
+
+class _BuildTestCase(unittest.TestCase):
+    """ A base for tests that build a site with real files. """
+
+    def setUp(self):
+        """ Set up a temporary working directory with page sources. """
+
+        self._cur_dir = os.getcwd()
+        self._temp_dir = tempfile.mkdtemp()
+        os.chdir(self._temp_dir)
+
+        self._config = {"site_title": "Test Site"}
+        guides = {"": {"type": "folder", "links": []}}
+        for i in range(10):
+            path = "page{}".format(i)
+            with open(path + ".md", "w") as f:
+                f.write("# " + path)
+            guides[""]["links"].append(path)
+            guides[path] = {
+                "type": "page", "source_path": os.path.join(self._temp_dir, path + ".md")}
+        self._guides = _make_guides(guides)
+
+    def tearDown(self):
+        """ Remove the temporary working directory. """
+
+        os.chdir(self._cur_dir)
+        shutil.rmtree(self._temp_dir)
+
+    def _read_build(self):
+        """ Read every file in the build directory. """
+
+        contents = {}
+        for dir_path, dir_names, file_names in os.walk("build"):
+            for file_name in file_names:
+                with open(os.path.join(dir_path, file_name), "r") as f:
+                    contents[os.path.join(dir_path, file_name)] = f.read()
+        return contents
+
+    def _stream(self, guides):
+        """ Add the nodes to a dictionary one at a time, pages first, yielding each. """
+
+        for path in sorted(self._guides, reverse=True):
+            guides[path] = self._guides[path]
+            yield path
+
+
+class TestParallelCompile(_BuildTestCase):
+    """ Test ``cece.compiler.Compiler.compile`` across multiple processes """
+
+    def testMatchesSerial(self):
+        """ Test that a parallel build produces the same output as a serial one. """
+
+        cece.compiler.Compiler(self._config, self._guides).compile()
+        serial = self._read_build()
+
+        cece.compiler.Compiler(self._config, self._guides, jobs=3).compile()
+        parallel = self._read_build()
+
+        self.assertEqual(len(serial), 11)
+        self.assertEqual(serial, parallel)
+
+
+class TestStreamedCompile(_BuildTestCase):
+    """ Test ``cece.compiler.Compiler.compile`` with nodes streamed from a parse """
+
+    def testMatchesBatch(self):
+        """
+            Test that a streamed build produces the same output as a batch
+            one, serially and across multiple processes.
+        """
+
+        cece.compiler.Compiler(self._config, self._guides).compile()
+        batch = self._read_build()
+
+        for jobs in (1, 3):
+            guides = {}
+            compiler = cece.compiler.Compiler(self._config, guides, jobs=jobs)
+            compiler.compile(self._stream(guides), stream=True)
+            self.assertEqual(self._read_build(), batch)
+
+    def testRemovedNodeDeleted(self):
+        """ Test that the output of a node that was not streamed is deleted. """
+
+        cece.compiler.Compiler(self._config, self._guides,
+                               incremental=True, cache_dir="cache").compile()
+        del self._guides["page2"]
+        self._guides[""]["links"].remove("page2")
+
+        guides = {}
+        compiler = cece.compiler.Compiler(self._config, guides,
+                                          incremental=True, cache_dir="cache")
+        compiler.compile(self._stream(guides), stream=True)
+
+        self.assertTrue(os.path.isfile(os.path.join("build", "page1", "index.html")))
+        self.assertFalse(os.path.exists(os.path.join("build", "page2")))
+
+
+class TestTemplateModules(_BuildTestCase):
+    """ Test compiling with precompiled templates """
+
+    def testMatchesBundled(self):
+        """ Test that precompiled templates produce the same pages as the bundled ones. """
+
+        cece.compiler.Compiler(self._config, self._guides, cache_dir="cache").compile()
+        bundled = self._read_build()
+
+        cece.compiler.compile_templates("modules")
+        cece.compiler.Compiler(self._config, self._guides, template_modules="modules").compile()
+        precompiled = self._read_build()
+
+        self.assertEqual(bundled, precompiled)
+
+
+class TestStagedCompile(_BuildTestCase):
+    """ Test full builds through the staging directory """
+
+    def testUnchangedFilesKept(self):
+        """ Test that a rebuild keeps the modification time of unchanged files. """
+
+        cece.compiler.Compiler(self._config, self._guides).compile()
+        unchanged_path = os.path.join("build", "page1", "index.html")
+        changed_path = os.path.join("build", "page2", "index.html")
+        os.utime(unchanged_path, (1, 1))
+        os.utime(changed_path, (1, 1))
+        with open("page2.md", "w") as f:
+            f.write("# changed")
+
+        cece.compiler.Compiler(self._config, self._guides).compile()
+
+        self.assertEqual(os.path.getmtime(unchanged_path), 1)
+        self.assertNotEqual(os.path.getmtime(changed_path), 1)
+        self.assertFalse(os.path.exists(cece.compiler.STAGING_DIR))
+        self.assertFalse(os.path.exists(cece.compiler.OLD_BUILD_DIR))
+
+
+class TestNavigation(unittest.TestCase):
+    """ Test ``cece.compiler.Compiler._render_navigation`` """
+
+    def setUp(self):
+        """ Set up for each test. """
+
+        self._guides = _make_guides({
+            "": {"type": "folder", "links": ["a"]},
+            "a": {"type": "folder", "links": ["a/b"]},
+            "a/b": {"type": "page", "breadcrumbs": ("a",)}
+        })
+        self._compiler = cece.compiler.Compiler({"site_title": "Test Site"}, self._guides)
+
+    def testFragmentCached(self):
+        """ Test that the links to the same nodes are only rendered once. """
+
+        first = self._compiler._render_navigation(("a", "a/b"))
+
+        with mock.patch.object(self._compiler, "_get_template") as mock_get_template:
+            second = self._compiler._render_navigation(["a", "a/b"])
+
+        self.assertFalse(mock_get_template.called)
+        self.assertIs(first, second)
+        self.assertIn('<a href="/a/b/">', first)
+
+    def testRenamedNodeRendered(self):
+        """ Test that a fragment is rendered again when a linked node is renamed. """
+
+        self._compiler._render_navigation(("a",))
+        self._guides["a"]["short_name"] = "renamed"
+
+        self.assertIn("renamed", self._compiler._render_navigation(("a",)))
+
+
+class TestPrecompress(_BuildTestCase):
+    """ Test writing precompressed copies of the outputs """
+
+    def testGzip(self):
+        """ Test that every output has a gzip copy with the same content. """
+
+        cece.compiler.Compiler(self._config, self._guides, precompress=["gzip"]).compile()
+
+        index_path = os.path.join("build", "page1", "index.html")
+        with gzip.open(index_path + ".gz", "rb") as f, open(index_path, "rb") as g:
+            self.assertEqual(f.read(), g.read())
+        self.assertFalse(os.path.exists(index_path + ".br"))
+
+    def testUnchangedCopiesKept(self):
+        """ Test that the copies of unchanged outputs are not compressed again. """
+
+        cece.compiler.Compiler(self._config, self._guides, precompress=["gzip"]).compile()
+        unchanged_path = os.path.join("build", "page1", "index.html.gz")
+        changed_path = os.path.join("build", "page2", "index.html.gz")
+        os.utime(unchanged_path, (1, 1))
+        os.utime(changed_path, (1, 1))
+        with open("page2.md", "w") as f:
+            f.write("# changed")
+
+        cece.compiler.Compiler(self._config, self._guides, precompress=["gzip"]).compile()
+
+        self.assertEqual(os.path.getmtime(unchanged_path), 1)
+        self.assertNotEqual(os.path.getmtime(changed_path), 1)
+
+    def testTurnedOff(self):
+        """ Test that an incremental build without precompression removes the copies. """
+
+        cece.compiler.Compiler(self._config, self._guides, cache_dir="cache",
+                               precompress=["gzip"]).compile()
+        with open("page2.md", "w") as f:
+            f.write("# changed")
+
+        cece.compiler.Compiler(self._config, self._guides,
+                               incremental=True, cache_dir="cache").compile()
+
+        index_path = os.path.join("build", "page2", "index.html")
+        with open(index_path, "r") as f:
+            self.assertIn("changed", f.read())
+        for dir_path, dir_names, file_names in os.walk("build"):
+            self.assertEqual([name for name in file_names if name.endswith(".gz")], [])
+
+    @unittest.skipIf(cece.compiler.brotli is None, "brotli is not installed")
+    def testBrotli(self):
+        """ Test that every output has a brotli copy with the same content. """
+
+        cece.compiler.Compiler(self._config, self._guides, precompress=["brotli"]).compile()
+
+        index_path = os.path.join("build", "page1", "index.html")
+        with open(index_path + ".br", "rb") as f, open(index_path, "rb") as g:
+            self.assertEqual(cece.compiler.brotli.decompress(f.read()), g.read())
+
+
+class TestMinify(_BuildTestCase):
+    """ Test minifying the outputs """
+
+    def testSmallerOutput(self):
+        """ Test that minified pages are smaller and have no indentation. """
+
+        cece.compiler.Compiler(self._config, self._guides).compile()
+        plain = self._read_build()
+
+        cece.compiler.Compiler(self._config, self._guides, minify=True).compile()
+        minified = self._read_build()
+
+        index_path = os.path.join("build", "page1", "index.html")
+        self.assertLess(len(minified[index_path]), len(plain[index_path]))
+        self.assertNotIn("\n    ", minified[index_path])
+        self.assertIn("<title>Test Site | page1</title>", minified[index_path])
+
+
+class TestAssets(_BuildTestCase):
+    """ Test publishing assets """
+
+    def setUp(self):
+        """ Add an asset to the guides. """
+
+        super(TestAssets, self).setUp()
+        with open("image.png", "wb") as f:
+            f.write(b"image")
+        self._guides["page1/image.png"] = {
+            "type": "asset", "source_path": os.path.join(self._temp_dir, "image.png")}
+        _make_guides(self._guides)
+
+    def testPublished(self):
+        """ Test that an asset is published next to its page. """
+
+        cece.compiler.Compiler(self._config, self._guides).compile()
+
+        with open(os.path.join("build", "page1", "image.png"), "rb") as f:
+            self.assertEqual(f.read(), b"image")
+
+    def testUnchangedSkipped(self):
+        """ Test that an unchanged asset is not published again. """
+
+        asset_path = os.path.join("build", "page1", "image.png")
+        cece.compiler.Compiler(self._config, self._guides,
+                               incremental=True, cache_dir="cache").compile()
+        inode = os.stat(asset_path).st_ino
+
+        with mock.patch("cece.compiler.cece.util.link_file") as mock_link_file:
+            cece.compiler.Compiler(self._config, self._guides,
+                                   incremental=True, cache_dir="cache").compile()
+
+        self.assertFalse(mock_link_file.called)
+        self.assertEqual(os.stat(asset_path).st_ino, inode)
+
+    def testReplacedWithinSecond(self):
+        """
+            Test that an asset replaced in the same second by one of the same
+            size is published.
+        """
+
+        os.utime("image.png", ns=(10 ** 9, 10 ** 9))
+        cece.compiler.Compiler(self._config, self._guides).compile()
+        with open("image.png.new", "wb") as f:
+            f.write(b"IMAGE")
+        os.utime("image.png.new", ns=(10 ** 9 + 1, 10 ** 9 + 1))
+        os.rename("image.png.new", "image.png")
+
+        cece.compiler.Compiler(self._config, self._guides).compile()
+
+        with open(os.path.join("build", "page1", "image.png"), "rb") as f:
+            self.assertEqual(f.read(), b"IMAGE")
+
+    def testRemoved(self):
+        """ Test that the asset is removed when it no longer exists. """
+
+        cece.compiler.Compiler(self._config, self._guides,
+                               incremental=True, cache_dir="cache").compile()
+        del self._guides["page1/image.png"]
+
+        cece.compiler.Compiler(self._config, self._guides,
+                               incremental=True, cache_dir="cache").compile()
+
+        self.assertFalse(os.path.exists(os.path.join("build", "page1", "image.png")))
+        self.assertTrue(os.path.isfile(os.path.join("build", "page1", "index.html")))
+
+    def testRemovedStreamed(self):
+        """ Test that removing an asset in a streamed build keeps its page. """
+
+        cece.compiler.Compiler(self._config, self._guides,
+                               incremental=True, cache_dir="cache").compile()
+        del self._guides["page1/image.png"]
+
+        guides = {}
+        compiler = cece.compiler.Compiler(self._config, guides,
+                                          incremental=True, cache_dir="cache")
+        compiler.compile(self._stream(guides), stream=True)
+
+        self.assertFalse(os.path.exists(os.path.join("build", "page1", "image.png")))
+        self.assertTrue(os.path.isfile(os.path.join("build", "page1", "index.html")))
+
+
+class TestSearchIndex(_BuildTestCase):
+    """ Test writing the search index """
+
+    def _read_shard(self, name):
+        """ Read a shard of the search index. """
+
+        with open(os.path.join("build", cece.search.INDEX_DIR, name), "r") as f:
+            return json.load(f)
+
+    def testIndexed(self):
+        """ Test that every page is indexed by the terms of its source. """
+
+        cece.compiler.Compiler(self._config, self._guides, search_index=True).compile()
+
+        shard = self._read_shard("pa.json")
+        self.assertEqual(len(shard["pages"]), 10)
+        self.assertEqual(shard["terms"]["page1"], [["page1", cece.search.NAME_WEIGHT + 1]])
+
+    def testIncrementalUpdate(self):
+        """ Test that an incremental build only rewrites the shards that changed. """
+
+        cece.compiler.Compiler(self._config, self._guides, incremental=True, cache_dir="cache",
+                               search_index=True).compile()
+        shard_path = os.path.join("build", cece.search.INDEX_DIR, "pa.json")
+        os.utime(shard_path, (1, 1))
+        with open("page2.md", "w") as f:
+            f.write("# page2 python")
+
+        cece.compiler.Compiler(self._config, self._guides, incremental=True, cache_dir="cache",
+                               search_index=True).compile()
+
+        self.assertEqual(os.path.getmtime(shard_path), 1)
+        self.assertEqual(self._read_shard("py.json")["terms"]["python"], [["page2", 1]])
+
+    def testTurnedOff(self):
+        """ Test that an incremental build without the index removes it. """
+
+        cece.compiler.Compiler(self._config, self._guides, incremental=True, cache_dir="cache",
+                               search_index=True).compile()
+
+        cece.compiler.Compiler(self._config, self._guides,
+                               incremental=True, cache_dir="cache").compile()
+
+        self.assertFalse(os.path.exists(os.path.join("build", cece.search.INDEX_DIR)))
+        self.assertFalse(os.path.exists(os.path.join("cache", cece.search.STATE_NAME)))
+
+    def testStateNotPublished(self):
+        """ Test that the state of the index and the manifest are kept in the cache. """
+
+        cece.compiler.Compiler(self._config, self._guides, cache_dir="cache",
+                               search_index=True).compile()
+
+        for name in (cece.search.STATE_NAME, cece.compiler.MANIFEST_NAME):
+            self.assertTrue(os.path.isfile(os.path.join("cache", name)))
+            self.assertFalse(os.path.exists(os.path.join("build", name)))
+
+    def testTurnedOn(self):
+        """
+            Test that an incremental build that starts the index indexes every
+            page and still removes the outputs of removed nodes.
+        """
+
+        cece.compiler.Compiler(self._config, self._guides,
+                               incremental=True, cache_dir="cache").compile()
+        del self._guides["page2"]
+        self._guides[""]["links"].remove("page2")
+
+        cece.compiler.Compiler(self._config, self._guides, incremental=True, cache_dir="cache",
+                               search_index=True).compile()
+
+        self.assertFalse(os.path.exists(os.path.join("build", "page2")))
+        self.assertEqual(len(self._read_shard("pa.json")["pages"]), 9)
+
+    def testParallel(self):
+        """ Test that a parallel build writes the same index as a serial one. """
+
+        cece.compiler.Compiler(self._config, self._guides, search_index=True).compile()
+        serial = self._read_build()
+
+        cece.compiler.Compiler(self._config, self._guides, jobs=3, search_index=True).compile()
+
+        self.assertEqual(self._read_build(), serial)
+
+
+class TestMarkdownEngine(_BuildTestCase):
+    """ Test choosing the Markdown engine """
+
+    def testUnknown(self):
+        """ Test that an unknown engine raises an exception. """
+
+        self._config["markdown_engine"] = "unknown"
+
+        with self.assertRaises(cece.compiler.CompilingException):
+            cece.compiler.Compiler(self._config, self._guides)
+
+    def testUnavailable(self):
+        """ Test that an engine whose package is not installed raises an exception. """
+
+        self._config["markdown_engine"] = "markdown-it"
+
+        with mock.patch("cece.compiler.importlib.import_module", side_effect=ImportError):
+            with self.assertRaises(cece.compiler.CompilingException):
+                cece.compiler.Compiler(self._config, self._guides)
+
+    def testEngines(self):
+        """ Test that every available engine renders the pages. """
+
+        for name, renderer in cece.compiler.MARKDOWN_ENGINES.items():
+            if not renderer.is_available():
+                continue
+            self._config["markdown_engine"] = name
+            cece.compiler.Compiler(self._config, self._guides).compile()
+            with open(os.path.join("build", "page1", "index.html"), "r") as f:
+                self.assertIn("<h1>page1</h1>", f.read(), name)
+
+
+class TestSnippets(_BuildTestCase):
+    """ Test including snippets in pages """
+
+    def setUp(self):
+        """ Include a snippet in two pages. """
+
+        super(TestSnippets, self).setUp()
+        with open("_shared.md", "w") as f:
+            f.write("Shared *text*")
+        for path in ("page1.md", "page2.md"):
+            with open(path, "w") as f:
+                f.write("# Title\n\n!include _shared.md\n\nAfter")
+
+    def _read_page(self, path):
+        """ Read the output of a page. """
+
+        with open(os.path.join("build", path, "index.html"), "r") as f:
+            return f.read()
+
+    def testIncluded(self):
+        """ Test that a snippet is converted once and spliced into each page. """
+
+        profile = cece.instrument.Profile()
+        cece.compiler.Compiler(self._config, self._guides, profile=profile).compile()
+
+        for path in ("page1", "page2"):
+            self.assertTrue(re.search(
+                r"<h1>Title</h1>\s*<p>Shared <em>text</em></p>\s*<p>After", self._read_page(path)))
+        self.assertEqual(profile.get_report()["counters"]["snippet_conversions"], 1)
+
+    def testChangedSnippet(self):
+        """ Test that changing a snippet re-renders the pages that include it. """
+
+        cece.compiler.Compiler(self._config, self._guides,
+                               incremental=True, cache_dir="cache").compile()
+        with open("_shared.md", "w") as f:
+            f.write("Changed")
+
+        cece.compiler.Compiler(self._config, self._guides,
+                               incremental=True, cache_dir="cache").compile()
+
+        self.assertIn("<p>Changed</p>", self._read_page("page1"))
+
+    def testMissingSnippet(self):
+        """ Test that including a snippet that does not exist raises an exception. """
+
+        os.remove("_shared.md")
+
+        with self.assertRaises(cece.compiler.CompilingException):
+            cece.compiler.Compiler(self._config, self._guides).compile()
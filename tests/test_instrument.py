@@ -0,0 +1,68 @@
+"""
+.. module tests.test_instrument
+
+Test the profiles in cece.instrument
+"""
+
+import cece.instrument
+import unittest
+
+
+class TestProfile(unittest.TestCase):
+    """ Test ``cece.instrument.Profile`` """
+
+    def test_report(self):
+        """
+            Test that timings and counters are added up and the slowest pages
+            are reported first.
+        """
+
+        profile = cece.instrument.Profile()
+        profile.add_time("parse", 1.0)
+        profile.add_time("parse", 0.5)
+        profile.count("nodes", 3)
+        profile.add_page("fast", "fast.md", 0.1)
+        profile.add_page("slow", "slow.md", 0.3)
+        profile.add_page("medium", "medium.md", 0.2)
+
+        report = profile.get_report(slowest=2)
+
+        self.assertEqual(report["phases"], {"parse": 1.5})
+        self.assertEqual(report["counters"], {"nodes": 3})
+        self.assertEqual(
+            [page["path"] for page in report["slowest_pages"]], ["slow", "medium"])
+        self.assertEqual(report["slowest_pages"][0]["source_path"], "slow.md")
+
+    def test_merge(self):
+        """
+            Test merging the data collected by a worker's profile.
+        """
+
+        worker_profile = cece.instrument.Profile()
+        worker_profile.add_time("markdown_conversion", 2.0)
+        worker_profile.count("bytes_read", 10)
+        worker_profile.add_page("page", "page.md", 2.0)
+        profile = cece.instrument.Profile()
+        profile.add_time("markdown_conversion", 1.0)
+
+        profile.merge(worker_profile.pop_data())
+
+        report = profile.get_report()
+        self.assertEqual(report["phases"], {"markdown_conversion": 3.0})
+        self.assertEqual(report["counters"], {"bytes_read": 10})
+        self.assertEqual(len(report["slowest_pages"]), 1)
+        self.assertEqual(worker_profile.get_report()["phases"], {})
+
+    def test_null(self):
+        """
+            Test that the null profile collects nothing.
+        """
+
+        profile = cece.instrument.NullProfile()
+        with profile.phase("parse"):
+            profile.count("nodes")
+        profile.add_page("page", "page.md", 1.0)
+
+        self.assertIsNone(profile.pop_data())
+        self.assertEqual(
+            profile.get_report(), {"phases": {}, "counters": {}, "slowest_pages": []})
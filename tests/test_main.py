@@ -0,0 +1,120 @@
+"""
+.. module tests.test_main
+
+Test the command line in cece.main
+"""
+
+import cece
+import cece.main
+import cece.parser
+import mock
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+
+class TestParseArgs(unittest.TestCase):
+    """ Test ``cece.main._parse_args`` """
+
+    def test_default_command(self):
+        """ Test that arguments without a command run the build command. """
+
+        args = cece.main._parse_args(["--jobs", "2"])
+
+        self.assertEqual(args.command, "build")
+        self.assertIs(args.run, cece.main._run_build)
+        self.assertEqual(args.jobs, 2)
+
+    def test_command(self):
+        """ Test that only the arguments of the chosen command are added. """
+
+        args = cece.main._parse_args(["check", "--no-cache"])
+
+        self.assertEqual(args.command, "check")
+        self.assertIsNone(args.cache_dir)
+        self.assertFalse(hasattr(args, "jobs"))
+
+    def test_lazy_imports(self):
+        """
+            Test that importing the command line does not import the
+            compiler, and that cleaning imports neither jinja2 nor yaml.
+        """
+
+        root_dir = os.path.dirname(os.path.dirname(os.path.abspath(cece.__file__)))
+        code = "import cece.main, sys; print('cece.compiler' in sys.modules)"
+        output = subprocess.check_output([sys.executable, "-c", code], cwd=root_dir)
+
+        self.assertEqual(output.strip(), b"False")
+
+        temp_dir = tempfile.mkdtemp()
+        try:
+            code = ("import cece.main, os, sys; os.chdir({!r}); cece.main.main(['clean']); "
+                    "print('jinja2' in sys.modules or 'yaml' in sys.modules)").format(temp_dir)
+            output = subprocess.check_output([sys.executable, "-c", code], cwd=root_dir)
+        finally:
+            shutil.rmtree(temp_dir)
+
+        self.assertEqual(output.strip(), b"False")
+
+
+class TestCommands(unittest.TestCase):
+    """ Test the commands in ``cece.main`` """
+
+    def setUp(self):
+        """ Set up a temporary working directory. """
+
+        self._cur_dir = os.getcwd()
+        self._temp_dir = tempfile.mkdtemp()
+        os.chdir(self._temp_dir)
+
+    def tearDown(self):
+        """ Remove the temporary working directory. """
+
+        os.chdir(self._cur_dir)
+        shutil.rmtree(self._temp_dir)
+
+    def test_version(self):
+        """ Test that the version command prints the version. """
+
+        with mock.patch("cece.main.print", create=True) as mock_print:
+            cece.main.main(["version"])
+
+        mock_print.assert_called_once_with("cece " + cece.__version__)
+
+    def test_clean(self):
+        """ Test that the clean command removes the build and cache directories. """
+
+        for path in ("build", "build.staging", "cache", "guides"):
+            os.mkdir(path)
+
+        with mock.patch("cece.main.print", create=True):
+            cece.main.main(["clean", "--cache-dir", "cache"])
+
+        self.assertEqual(os.listdir("."), ["guides"])
+
+    def test_clean_keep_cache(self):
+        """ Test that the clean command can keep the cache directory. """
+
+        for path in ("build", "cache"):
+            os.mkdir(path)
+
+        with mock.patch("cece.main.print", create=True):
+            cece.main.main(["clean", "--cache-dir", "cache", "--keep-cache"])
+
+        self.assertEqual(os.listdir("."), ["cache"])
+
+    def test_check_error(self):
+        """ Test that the check command exits with an error when parsing fails. """
+
+        with mock.patch("cece.main._load_config"), \
+                mock.patch("cece.parser.Parser.parse", side_effect=cece.parser.ParsingException(
+                    "guide/linux.md", "error")), \
+                mock.patch("cece.main.print", create=True) as mock_print:
+            with self.assertRaises(SystemExit) as context:
+                cece.main.main(["check", "--no-cache"])
+
+        self.assertEqual(context.exception.code, 1)
+        mock_print.assert_any_call("Error parsing directory:")
@@ -0,0 +1,39 @@
+"""
+.. module tests.test_minify
+
+Test the HTML minifier in cece.minify
+"""
+
+import cece.minify
+import unittest
+
+
+class TestMinifyHtml(unittest.TestCase):
+    """ Test ``cece.minify.minify_html`` """
+
+    def test_whitespace(self):
+        """
+            Test that whitespace around block tags is removed and other
+            whitespace is collapsed.
+        """
+
+        html = "<ul>\n    <li>\n        <a href=\"/\">\n            One  Two\n</a>\n</li>\n</ul>\n"
+
+        self.assertEqual(
+            cece.minify.minify_html(html), "<ul><li><a href=\"/\"> One Two </a></li></ul>")
+
+    def test_comments(self):
+        """ Test that comments are removed, except for conditional comments. """
+
+        html = "<p>a<!-- comment -->b</p><!--[if IE]>ie<![endif]-->"
+
+        self.assertEqual(cece.minify.minify_html(html), "<p>ab</p><!--[if IE]>ie<![endif]-->")
+
+    def test_preserved(self):
+        """ Test that the contents of preformatted elements are left untouched. """
+
+        html = "<div>\n  <pre><code>a\n    b\n</code></pre>\n  <p>c  d</p>\n</div>"
+
+        self.assertEqual(
+            cece.minify.minify_html(html),
+            "<div><pre><code>a\n    b\n</code></pre><p>c d</p></div>")
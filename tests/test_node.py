@@ -0,0 +1,42 @@
+"""
+.. module tests.test_node
+
+Test the nodes in cece.node
+"""
+
+import cece.node
+import pickle
+import unittest
+
+
+class TestNode(unittest.TestCase):
+    """ Test ``cece.node.Folder`` and ``cece.node.Page`` """
+
+    def test_item_access(self):
+        """
+            Test that the fields of a node can be read like a dictionary.
+        """
+
+        page = cece.node.Page("Name", "Short", "Description", ("a",), "/a/b.md")
+
+        self.assertEqual(page["type"], "page")
+        self.assertEqual(page["name"], "Name")
+        self.assertEqual(page["source_path"], "/a/b.md")
+        self.assertIn("breadcrumbs", page)
+        self.assertNotIn("links", page)
+        self.assertIsNone(page.get("links"))
+        with self.assertRaises(KeyError):
+            page["links"]
+        with self.assertRaises(AttributeError):
+            page.extra = 1
+
+    def test_pickle(self):
+        """
+            Test that nodes survive pickling, as they are sent to worker
+            processes.
+        """
+
+        folder = cece.node.Folder("Name", "Short", "Description", (), ["a", "b"])
+
+        self.assertEqual(pickle.loads(pickle.dumps(folder, 2)), folder)
+        self.assertNotEqual(folder, cece.node.Folder("Name", "Short", "Description", (), ["a"]))
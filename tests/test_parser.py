@@ -0,0 +1,480 @@
+"""
+.. module tests.test_parser
+
+Test the Parser class in cece.parser
+"""
+
+import cece.instrument
+import cece.parser
+import mock
+import os
+import shutil
+import tempfile
+import unittest
+
+
+META = {
+    "folder_meta.yaml": {"name": "Folder", "description": "A folder"},
+    "guide_meta.yaml": {"name": "Guide", "description": "A guide", "variant_groups": ["os"]}
+}
+
+CONFIG = {
+    "site_title": "Test Site",
+    "variant_groups": {
+        "os": {"name": "OS", "variants": [{"id": "linux", "name": "Linux"},
+                                          {"id": "mac", "name": "Mac"}]},
+        "py": {"name": "Python", "variants": [{"id": "py2", "name": "Python 2"},
+                                              {"id": "py3", "name": "Python 3"}]}
+    },
+    "variants": {
+        "linux": {"id": "linux", "name": "Linux"},
+        "mac": {"id": "mac", "name": "Mac"},
+        "py2": {"id": "py2", "name": "Python 2"},
+        "py3": {"id": "py3", "name": "Python 3"}
+    }
+}
+
+
+def _load_meta(path):
+    """ Load test meta data based on the name of a meta file. """
+
+    return dict(META[os.path.basename(path)])
+
+
+class _ParserTestCase(unittest.TestCase):
+    """ A base for tests that parse a guides directory with real files. """
+
+    def setUp(self):
+        """ Set up a temporary working directory with a guides directory. """
+
+        self._cur_dir = os.getcwd()
+        self._temp_dir = tempfile.mkdtemp()
+        os.chdir(self._temp_dir)
+        os.mkdir("guides")
+
+        patcher = mock.patch("cece.parser.cece.util.load_yaml_file", side_effect=_load_meta)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        """ Remove the temporary working directory. """
+
+        os.chdir(self._cur_dir)
+        shutil.rmtree(self._temp_dir)
+
+    def _make_file(self, path, contents=""):
+        """ Make a file in the guides directory, along with its parents. """
+
+        path = os.path.join("guides", path)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, "w") as f:
+            f.write(contents)
+
+
+class TestParse(_ParserTestCase):
+    """ Test ``cece.parser.Parser.parse`` """
+
+    def test_tree(self):
+        """
+            Test parsing a folder containing a guide with two variants.
+        """
+
+        self._make_file("folder/folder_meta.yaml")
+        self._make_file("folder/guide/guide_meta.yaml")
+        self._make_file("folder/guide/linux.md")
+        self._make_file("folder/guide/mac.md")
+        self._make_file("folder/guide/notes.txt")
+        self._make_file("ignored/readme.txt")
+        self._make_file("root.txt")
+        self._make_file("root_guide/guide_meta.yaml")
+        self._make_file("root_guide/mac.md")
+
+        guides = cece.parser.Parser(CONFIG).parse()
+
+        guide_path = os.path.join("folder", "guide")
+        self.assertEqual(
+            sorted(guides.keys()),
+            ["", "folder", guide_path, os.path.join(guide_path, "linux"),
+             os.path.join(guide_path, "mac"), os.path.join(guide_path, "notes.txt"),
+             "root_guide", os.path.join("root_guide", "mac")])
+        self.assertEqual(sorted(guides[""]["links"]), ["folder", "root_guide"])
+        self.assertEqual(guides["folder"]["links"], [guide_path])
+        self.assertEqual(
+            guides[guide_path]["links"],
+            [os.path.join(guide_path, "linux"), os.path.join(guide_path, "mac")])
+        page = guides[os.path.join(guide_path, "linux")]
+        self.assertEqual(page["type"], "page")
+        self.assertEqual(page["name"], "Guide (Linux)")
+        self.assertEqual(page["short_name"], "Linux")
+        self.assertEqual(page["breadcrumbs"], ("folder", guide_path))
+        self.assertIs(guides[os.path.join(guide_path, "mac")]["breadcrumbs"], page["breadcrumbs"])
+        self.assertEqual(
+            page["source_path"],
+            os.path.join(os.path.realpath(self._temp_dir), "guides", guide_path, "linux.md"))
+
+    def test_stats(self):
+        """
+            Test that each directory is listed once and no paths are stat'ed.
+        """
+
+        self._make_file("folder/folder_meta.yaml")
+        self._make_file("folder/guide/guide_meta.yaml")
+        self._make_file("folder/guide/linux.md")
+        self._make_file("ignored/readme.txt")
+
+        profile = cece.instrument.Profile()
+        parser = cece.parser.Parser(CONFIG, profile=profile)
+        parser.parse()
+
+        self.assertEqual(parser.get_stats(), {"listings": 4, "stats": 0})
+        counters = profile.get_report()["counters"]
+        self.assertEqual(counters["parse_listings"], 4)
+        self.assertEqual(counters["parse_stats"], 0)
+
+    def test_assets(self):
+        """
+            Test that the other files in a guide folder and the directories
+            below it are assets, which are not linked, and that snippets are
+            neither pages nor assets.
+        """
+
+        self._make_file("guide/guide_meta.yaml")
+        self._make_file("guide/linux.md")
+        self._make_file("guide/image.png")
+        self._make_file("guide/.hidden")
+        self._make_file("guide/_snippet.md")
+        self._make_file("guide/files/setup.zip")
+
+        guides = cece.parser.Parser(CONFIG).parse()
+
+        image = guides[os.path.join("guide", "image.png")]
+        self.assertEqual(image["type"], "asset")
+        self.assertEqual(image["breadcrumbs"], ("guide",))
+        self.assertEqual(
+            image["source_path"],
+            os.path.join(os.path.realpath(self._temp_dir), "guides", "guide", "image.png"))
+        self.assertEqual(guides[os.path.join("guide", "files", "setup.zip")]["type"], "asset")
+        self.assertNotIn(os.path.join("guide", ".hidden"), guides)
+        self.assertNotIn(os.path.join("guide", "_snippet.md"), guides)
+        self.assertEqual(guides["guide"]["links"], [os.path.join("guide", "linux")])
+
+    def test_asset_conflict(self):
+        """ Test that an asset with the same path as a page raises an exception. """
+
+        self._make_file("guide/guide_meta.yaml")
+        self._make_file("guide/linux.md")
+        self._make_file("guide/linux")
+
+        with self.assertRaises(cece.parser.ParsingException):
+            cece.parser.Parser(CONFIG).parse()
+
+    def test_asset_output_conflict(self):
+        """
+            Test that an asset that would be written over the output of a
+            page or folder, or over the temporary file of another asset,
+            raises an exception.
+        """
+
+        self._make_file("guide/guide_meta.yaml")
+        self._make_file("guide/linux.md")
+        self._make_file("guide/files/index.html")
+        self._make_file("guide/files/setup.zip.tmp")
+        cece.parser.Parser(CONFIG).parse()
+
+        for paths in (["guide/index.html"], ["guide/index.html.gz"], ["guide/index.html.tmp"],
+                      ["guide/linux/index.html"], ["guide/image.png", "guide/image.png.tmp"]):
+            for path in paths:
+                self._make_file(path)
+            with self.assertRaises(cece.parser.ParsingException):
+                cece.parser.Parser(CONFIG).parse()
+            for path in paths:
+                os.remove(os.path.join("guides", path))
+
+
+class TestStreamedParse(_ParserTestCase):
+    """ Test ``cece.parser.Parser.parse`` reporting nodes as they are final """
+
+    def test_reported(self):
+        """
+            Test that every node is reported once, after its ancestors are
+            added, and that folders are reported after their children with
+            their final links.
+        """
+
+        # three variant groups, so guides have tags below other tags
+        config = dict(CONFIG, variant_groups=dict(CONFIG["variant_groups"], arch={
+            "name": "Architecture", "variants": [{"id": "x86", "name": "x86"},
+                                                 {"id": "arm", "name": "ARM"}]}))
+        config["variants"] = dict(
+            CONFIG["variants"], x86={"id": "x86", "name": "x86"}, arm={"id": "arm", "name": "ARM"})
+        self.addCleanup(META.__setitem__, "guide_meta.yaml", META["guide_meta.yaml"])
+        META["guide_meta.yaml"] = dict(
+            META["guide_meta.yaml"], variant_groups=["os", "py", "arch"])
+
+        self._make_file("folder/folder_meta.yaml")
+        self._make_file("folder/guide/guide_meta.yaml")
+        self._make_file("folder/guide/mac-py3-arm.md")
+        self._make_file("folder/guide/linux-py2-x86.md")
+        self._make_file("folder/guide/image.png")
+        self._make_file("root_guide/guide_meta.yaml")
+        self._make_file("root_guide/mac-py2-x86.md")
+        self._make_file("root_guide/mac-py2-arm.md")
+
+        contents = {}
+        reported = []
+
+        def on_node(path):
+            node = contents[path]
+            for ancestor in node["breadcrumbs"]:
+                self.assertIn(ancestor, contents)
+            for link in node.get("links", []):
+                self.assertIn(link, [path for path, links in reported])
+            reported.append((path, list(node.get("links", []))))
+
+        guides = cece.parser.Parser(config).parse(on_node=on_node, contents=contents)
+
+        self.assertIs(guides, contents)
+        self.assertIn(os.path.join("root_guide", "mac", "py2", "arm"), guides)
+        self.assertEqual(guides, cece.parser.Parser(config).parse())
+        self.assertEqual(sorted(path for path, links in reported), sorted(guides))
+        self.assertEqual(reported[-1][0], "")
+        for path, links in reported:
+            self.assertEqual(links, guides[path].get("links", []))
+
+    def test_concurrent(self):
+        """
+            Test that a concurrent parse reports the first node before the
+            whole tree is read, and builds the same tree as a sequential one.
+        """
+
+        self._make_file("folder1/folder_meta.yaml")
+        self._make_file("folder1/guide/guide_meta.yaml")
+        self._make_file("folder1/guide/linux.md")
+        self._make_file("folder2/folder_meta.yaml")
+        self._make_file("folder2/folder/folder_meta.yaml")
+        self._make_file("folder2/folder/guide/guide_meta.yaml")
+        self._make_file("folder2/folder/guide/mac.md")
+
+        parser = cece.parser.Parser(CONFIG, threads=2)
+        listings = []
+        guides = parser.parse(on_node=lambda path: listings.append(parser.get_stats()["listings"]))
+
+        self.assertEqual(guides, cece.parser.Parser(CONFIG).parse())
+        self.assertLess(listings[0], parser.get_stats()["listings"])
+
+
+class TestParseSnapshot(_ParserTestCase):
+    """ Test ``cece.parser.Parser.parse`` with a snapshot of the parsed tree """
+
+    def setUp(self):
+        """ Set up a folder containing a guide with assets, and parse it once. """
+
+        super(TestParseSnapshot, self).setUp()
+        self._make_file("folder/folder_meta.yaml")
+        self._make_file("folder/guide/guide_meta.yaml")
+        self._make_file("folder/guide/linux.md")
+        self._make_file("folder/guide/image.png")
+        self._make_file("folder/guide/files/setup.zip")
+        self._make_file("ignored/readme.txt")
+        self._guides = cece.parser.Parser(CONFIG, cache_dir="cache").parse()
+
+    def _touch(self, path):
+        """ Move the modification time of a path in the guides directory forward. """
+
+        path = os.path.join("guides", path)
+        mtime = os.path.getmtime(path) + 10
+        os.utime(path, (mtime, mtime))
+
+    def _parse(self, config=CONFIG):
+        """ Parse the guides again, returning the guides and the parser's stats. """
+
+        parser = cece.parser.Parser(config, cache_dir="cache")
+        return parser.parse(), parser.get_stats()
+
+    def test_unchanged(self):
+        """
+            Test that an unchanged tree is loaded without listing any
+            directory or reading any meta file.
+        """
+
+        with mock.patch("cece.parser.cece.util.load_yaml_file") as mock_load_yaml_file:
+            guides, stats = self._parse()
+
+        self.assertEqual(guides, self._guides)
+        self.assertEqual(stats["listings"], 0)
+        mock_load_yaml_file.assert_not_called()
+
+    def test_changed_dir(self):
+        """
+            Test that only a directory whose listing changed is read again.
+        """
+
+        self._make_file("folder/guide/mac.md")
+        self._touch("folder/guide")
+
+        guides, stats = self._parse()
+
+        self.assertEqual(
+            guides[os.path.join("folder", "guide")]["links"],
+            [os.path.join("folder", "guide", "linux"), os.path.join("folder", "guide", "mac")])
+        self.assertEqual(guides, cece.parser.Parser(CONFIG).parse())
+        self.assertEqual(stats["listings"], 1)
+
+    def test_changed_meta(self):
+        """
+            Test that a directory is read again when its meta file changes.
+        """
+
+        META["folder_meta.yaml"] = {"name": "Changed", "description": "A folder"}
+        self.addCleanup(META.__setitem__, "folder_meta.yaml", {
+            "name": "Folder", "description": "A folder"})
+        self._make_file("folder/folder_meta.yaml", "changed")
+
+        guides, stats = self._parse()
+
+        self.assertEqual(guides["folder"]["name"], "Changed")
+        self.assertEqual(stats["listings"], 1)
+
+    def test_changed_asset_dir(self):
+        """
+            Test that a directory of assets is read again when it changes,
+            without reading its guide again.
+        """
+
+        self._make_file("folder/guide/files/readme.txt")
+        self._touch("folder/guide/files")
+
+        guides, stats = self._parse()
+
+        self.assertEqual(guides[os.path.join("folder", "guide", "files", "readme.txt")]["type"],
+                         "asset")
+        self.assertEqual(guides, cece.parser.Parser(CONFIG).parse())
+        self.assertEqual(stats["listings"], 1)
+
+    def test_restored_asset_conflict(self):
+        """
+            Test that an unchanged directory of assets conflicting with a new
+            page raises an exception.
+        """
+
+        self._make_file("folder/guide/mac/index.html")
+        cece.parser.Parser(CONFIG, cache_dir="cache").parse()
+        self._make_file("folder/guide/mac.md")
+        self._touch("folder/guide")
+
+        with self.assertRaises(cece.parser.ParsingException):
+            self._parse()
+
+    def test_changed_config(self):
+        """
+            Test that the snapshot is not used when the variants change.
+        """
+
+        config = dict(CONFIG, variants=dict(CONFIG["variants"], linux={
+            "id": "linux", "name": "GNU/Linux"}))
+
+        guides, stats = self._parse(config)
+
+        self.assertEqual(guides[os.path.join("folder", "guide", "linux")]["short_name"],
+                         "GNU/Linux")
+        self.assertEqual(stats["listings"], 5)
+
+
+class TestLoadGuide(_ParserTestCase):
+    """ Test resolving variant file names in ``cece.parser.Parser._load_guide`` """
+
+    def setUp(self):
+        """ Set up a guide with two variant groups. """
+
+        super(TestLoadGuide, self).setUp()
+        META["two_groups_meta.yaml"] = {
+            "name": "Guide", "description": "A guide", "variant_groups": ["os", "py"]}
+        self.addCleanup(META.pop, "two_groups_meta.yaml")
+        self._meta = _load_meta("two_groups_meta.yaml")
+
+    def _load_guide(self, *file_names):
+        """ Load the guide with the given variant files. """
+
+        listing = cece.parser._Listing([], list(file_names))
+        parser = cece.parser.Parser(CONFIG)
+        parser._contents = {}
+        parser._load_guide(self._meta, "guide", listing)
+        return parser._contents
+
+    def test_names(self):
+        """
+            Test the tags in a file name are resolved in variant group order,
+            regardless of their order in the file name.
+        """
+
+        contents = self._load_guide("py3-mac.md")
+
+        folder = contents[os.path.join("guide", "mac")]
+        self.assertEqual(folder["name"], "Guide (Mac)")
+        self.assertEqual(folder["short_name"], "Mac")
+        page = contents[os.path.join("guide", "mac", "py3")]
+        self.assertEqual(page["name"], "Guide (Mac, Python 3)")
+        self.assertEqual(page["short_name"], "Python 3")
+
+    def test_missing_group(self):
+        """
+            Test a file name without a variant for one of the groups.
+        """
+
+        with self.assertRaises(cece.parser.ParsingException) as context:
+            self._load_guide("linux-unknown.md")
+        self.assertIn("No variants for variant group \"Python\" found", str(context.exception))
+
+    def test_multiple_in_group(self):
+        """
+            Test a file name with two variants of the same group.
+        """
+
+        with self.assertRaises(cece.parser.ParsingException) as context:
+            self._load_guide("linux-mac-py2.md")
+        self.assertIn(
+            "Cannot have multiple variants in the variant group \"OS\".",
+            str(context.exception))
+
+
+class TestConcurrentParse(_ParserTestCase):
+    """ Test ``cece.parser.Parser.parse`` with multiple threads """
+
+    def test_matches_sequential(self):
+        """
+            Test that a concurrent parse produces the same tree, including the
+            order of links, as a sequential parse.
+        """
+
+        for i in range(5):
+            folder = "folder{}".format(i)
+            self._make_file(os.path.join(folder, "folder_meta.yaml"))
+            for j in range(5):
+                guide = os.path.join(folder, "sub{}".format(j), "guide{}".format(j))
+                self._make_file(os.path.join(os.path.dirname(guide), "folder_meta.yaml"))
+                self._make_file(os.path.join(guide, "guide_meta.yaml"))
+                self._make_file(os.path.join(guide, "linux.md"))
+                self._make_file(os.path.join(guide, "mac.md"))
+
+        sequential_parser = cece.parser.Parser(CONFIG)
+        sequential = sequential_parser.parse()
+        concurrent_parser = cece.parser.Parser(CONFIG, threads=4)
+        concurrent = concurrent_parser.parse()
+
+        self.assertEqual(len(sequential), 106)
+        self.assertEqual(sequential, concurrent)
+        self.assertEqual(sequential_parser.get_stats(), concurrent_parser.get_stats())
+
+    def test_error(self):
+        """
+            Test that an error reading a directory in a worker thread is raised
+            from the parse.
+        """
+
+        self._make_file("folder/folder_meta.yaml")
+        self._make_file("folder/guide/guide_meta.yaml")
+
+        with mock.patch("cece.parser.cece.util.load_yaml_file", side_effect=IOError("error")):
+            with self.assertRaises(IOError):
+                cece.parser.Parser(CONFIG, threads=4).parse()
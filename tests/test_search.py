@@ -0,0 +1,74 @@
+"""
+.. module tests.test_search
+
+Test the search index in cece.search
+"""
+
+import cece.search
+import unittest
+
+
+class TestGetTerms(unittest.TestCase):
+    """ Test ``cece.search.get_terms`` """
+
+    def test_weights(self):
+        """
+            Test that terms are lowercased, short terms are skipped, and terms
+            in the name and description score higher.
+        """
+
+        terms = cece.search.get_terms("Install Python", "Set up", "# Install\n\nRun `pip`, a b.")
+
+        self.assertEqual(terms, {
+            "install": cece.search.NAME_WEIGHT + 1,
+            "python": cece.search.NAME_WEIGHT,
+            "set": cece.search.DESCRIPTION_WEIGHT,
+            "up": cece.search.DESCRIPTION_WEIGHT,
+            "run": 1,
+            "pip": 1
+        })
+
+
+class TestGetShardName(unittest.TestCase):
+    """ Test ``cece.search.get_shard_name`` """
+
+    def test_names(self):
+        """ Test that prefixes that are not ASCII letters or digits are encoded. """
+
+        self.assertEqual(cece.search.get_shard_name("py"), "py.json")
+        self.assertEqual(cece.search.get_shard_name("_a"), "_5f61.json")
+
+
+class TestSearchIndex(unittest.TestCase):
+    """ Test ``cece.search.SearchIndex`` """
+
+    def test_update(self):
+        """ Test that an update returns the prefixes of the old and new terms. """
+
+        index = cece.search.SearchIndex()
+        index.update({
+            "a": {"name": "A", "terms": {"python": 2, "linux": 1}},
+            "b": {"name": "B", "terms": {"python": 3}}
+        })
+
+        prefixes = index.update({"a": {"name": "A", "terms": {"mac": 1}}}, ["b"])
+
+        self.assertEqual(prefixes, set(["py", "li", "ma"]))
+        self.assertEqual(index.get_shards(prefixes), {
+            "py": None,
+            "li": None,
+            "ma": {"pages": {"a": "A"}, "terms": {"mac": [["a", 1]]}}
+        })
+
+    def test_shard_order(self):
+        """ Test that the pages of a term are sorted by descending score. """
+
+        index = cece.search.SearchIndex()
+        index.update({
+            "a": {"name": "A", "terms": {"python": 2}},
+            "b": {"name": "B", "terms": {"python": 3}}
+        })
+
+        shard = index.get_shards(set(["py"]))["py"]
+
+        self.assertEqual(shard["terms"]["python"], [["b", 3], ["a", 2]])
@@ -6,6 +6,9 @@ Test the functions in cece.util
 
 import cece.util
 import mock
+import os
+import shutil
+import tempfile
 import unittest
 import yaml
 
@@ -32,7 +35,8 @@ class TestLoadYamlFile(unittest.TestCase):
         # verify the right methods were called and the return value is correct
         mock_open.assert_called_once_with("test_file", "r")
         mock_opened_file = mock_open.return_value.__enter__.return_value
-        mock_yaml_load.assert_called_once_with(mock_opened_file)
+        mock_yaml_load.assert_called_once_with(
+            mock_opened_file, Loader=cece.util.YAML_LOADER)
         self.assertEqual(test_dict, returned_dict)
 
     @mock.patch("cece.util.sys.exit")
@@ -55,7 +59,8 @@ class TestLoadYamlFile(unittest.TestCase):
         # verify the call
         mock_open.assert_called_once_with("test_file", "r")
         mock_opened_file = mock_open.return_value.__enter__.return_value
-        mock_yaml_load.assert_called_once_with(mock_opened_file)
+        mock_yaml_load.assert_called_once_with(
+            mock_opened_file, Loader=cece.util.YAML_LOADER)
         mock_print.assert_any_call("Error parsing \"test_file\":")
         mock_print.assert_any_call(yaml_error)
         mock_exit.assert_called_once_with(1)
@@ -145,3 +150,87 @@ class TestIterateListSubsets(unittest.TestCase):
         expected = [[0], [0, 1], [0, 1, 2]]
         actual = list(cece.util.iterate_list_subsets(lst))
         self.assertEqual(expected, actual)
+
+
+class TestFiles(unittest.TestCase):
+    """ Test the file helpers in ``cece.util`` """
+
+    def setUp(self):
+        """ Set up a temporary directory. """
+
+        self._temp_dir = tempfile.mkdtemp()
+        self._path1 = os.path.join(self._temp_dir, "file1")
+        self._path2 = os.path.join(self._temp_dir, "file2")
+
+    def tearDown(self):
+        """ Remove the temporary directory. """
+
+        shutil.rmtree(self._temp_dir)
+
+    def test_write_file(self):
+        """
+            Test that writing a file replaces its contents and leaves no
+            temporary file behind.
+        """
+
+        cece.util.write_file(self._path1, b"old")
+        cece.util.write_file(self._path1, b"new")
+
+        with open(self._path1, "rb") as f:
+            self.assertEqual(f.read(), b"new")
+        self.assertEqual(os.listdir(self._temp_dir), ["file1"])
+
+    def test_files_equal(self):
+        """
+            Test comparing files with the same and different contents.
+        """
+
+        cece.util.write_file(self._path1, b"contents")
+        cece.util.write_file(self._path2, b"contents")
+        self.assertTrue(cece.util.files_equal(self._path1, self._path2))
+
+        cece.util.write_file(self._path2, b"changed!")
+        self.assertFalse(cece.util.files_equal(self._path1, self._path2))
+
+    def test_files_equal_missing(self):
+        """
+            Test comparing with a file that does not exist.
+        """
+
+        cece.util.write_file(self._path1, b"contents")
+        self.assertFalse(cece.util.files_equal(self._path1, self._path2))
+
+    def test_get_file_signature(self):
+        """
+            Test that the signature of a file changes with its contents.
+        """
+
+        cece.util.write_file(self._path1, b"contents")
+        os.utime(self._path1, (1, 1))
+        signature = cece.util.get_file_signature(self._path1)
+        self.assertEqual(signature[1], 8)
+
+        cece.util.write_file(self._path1, b"changed!")
+        self.assertNotEqual(cece.util.get_file_signature(self._path1), signature)
+
+    def test_link_file(self):
+        """
+            Test that a file is hard linked where possible.
+        """
+
+        cece.util.write_file(self._path1, b"contents")
+        cece.util.link_file(self._path1, self._path2)
+        self.assertEqual(os.stat(self._path1).st_ino, os.stat(self._path2).st_ino)
+
+    @mock.patch("cece.util.os.link", side_effect=OSError)
+    def test_link_file_copy(self, mock_link):
+        """
+            Test that a file is copied, with its modification time, when it
+            cannot be linked.
+        """
+
+        cece.util.write_file(self._path1, b"contents")
+        os.utime(self._path1, (1, 1))
+        cece.util.link_file(self._path1, self._path2)
+        self.assertTrue(cece.util.files_equal(self._path1, self._path2))
+        self.assertEqual(os.path.getmtime(self._path2), 1)
@@ -0,0 +1,182 @@
+"""
+.. module tests.test_watch
+
+Test the Watcher class in cece.watch
+"""
+
+import cece.watch
+import mock
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+
+class TestRebuild(unittest.TestCase):
+    """ Test ``cece.watch.Watcher._rebuild`` """
+
+    def setUp(self):
+        """ Set up a watcher that has built once. """
+
+        self._source_path = os.path.realpath(os.path.join("guides", "guide", "linux.md"))
+        self._guides = {
+            "": {"type": "folder"},
+            "guide": {"type": "folder"},
+            "guide/linux": {"type": "page", "source_path": self._source_path}
+        }
+        self._load_config = mock.Mock(return_value={"site_title": "Test Site"})
+        self._parse = mock.Mock(return_value=self._guides)
+        self._compiler = mock.Mock()
+        self._create_compiler = mock.Mock(return_value=self._compiler)
+
+        self._watcher = cece.watch.Watcher(
+            self._load_config, self._parse, self._create_compiler, template_dir="templates")
+        with mock.patch("cece.watch.print", create=True):
+            self._watcher._rebuild(None)
+        for m in (self._load_config, self._parse, self._create_compiler, self._compiler):
+            m.reset_mock()
+
+    def _rebuild(self, changed, added_or_removed=frozenset()):
+        """ Rebuild with the given changes. """
+
+        with mock.patch("cece.watch.print", create=True):
+            self._watcher._rebuild(
+                set(os.path.realpath(path) for path in changed),
+                set(os.path.realpath(path) for path in added_or_removed))
+
+    def test_source_edited(self):
+        """
+            Test that editing a source only compiles its page.
+        """
+
+        self._rebuild([self._source_path])
+
+        self._parse.assert_not_called()
+        self._create_compiler.assert_not_called()
+        self._compiler.compile.assert_called_once_with(["guide/linux"])
+
+    def test_meta_edited(self):
+        """
+            Test that editing a meta file parses the guides again.
+        """
+
+        self._rebuild([os.path.join("guides", "guide", "guide_meta.yaml")])
+
+        self._load_config.assert_not_called()
+        self._parse.assert_called_once_with({"site_title": "Test Site"})
+        self._compiler.set_guides.assert_called_once_with(self._guides)
+        self._compiler.compile.assert_called_once_with(None)
+
+    def test_source_added(self):
+        """
+            Test that adding a source parses the guides again.
+        """
+
+        mac_path = os.path.join("guides", "guide", "mac.md")
+        self._rebuild([mac_path], [mac_path])
+
+        self._parse.assert_called_once_with({"site_title": "Test Site"})
+        self._compiler.compile.assert_called_once_with(None)
+
+    def test_template_edited(self):
+        """
+            Test that editing a template recreates the compiler.
+        """
+
+        self._rebuild([os.path.join("templates", "page.html")])
+
+        self._parse.assert_not_called()
+        self._create_compiler.assert_called_once_with({"site_title": "Test Site"}, self._guides)
+        self._compiler.compile.assert_called_once_with(None)
+
+    def test_config_edited(self):
+        """
+            Test that editing the configuration rebuilds everything.
+        """
+
+        self._rebuild(["config.yaml"])
+
+        self._load_config.assert_called_once_with()
+        self._parse.assert_called_once_with({"site_title": "Test Site"})
+        self._create_compiler.assert_called_once_with({"site_title": "Test Site"}, self._guides)
+        self._compiler.compile.assert_called_once_with(None)
+
+
+class TestChanges(unittest.TestCase):
+    """ Test ``cece.watch.Watcher._get_changes`` """
+
+    def setUp(self):
+        """ Set up a temporary site with one source. """
+
+        self._cur_dir = os.getcwd()
+        self._temp_dir = tempfile.mkdtemp()
+        os.chdir(self._temp_dir)
+        os.makedirs(os.path.join("guides", "guide"))
+        self._source_path = os.path.realpath(os.path.join("guides", "guide", "linux.md"))
+        with open(self._source_path, "w") as f:
+            f.write("# Linux")
+        self._watcher = cece.watch.Watcher(None, None, None, template_dir="templates")
+        self._watcher._pages = {self._source_path: ["guide/linux"]}
+
+    def tearDown(self):
+        """ Remove the temporary site. """
+
+        os.chdir(self._cur_dir)
+        shutil.rmtree(self._temp_dir)
+
+    def _wait_for_changes(self, path):
+        """ Collect the changes, waiting until they include a path. """
+
+        changed = set()
+        added_or_removed = set()
+        for i in range(100):
+            new_changed, new_added_or_removed = self._watcher._get_changes()
+            changed.update(new_changed)
+            added_or_removed.update(new_added_or_removed)
+            if path in changed:
+                return changed, added_or_removed
+            time.sleep(0.05)
+        self.fail("No change to {} found".format(path))
+
+    def _check_changes(self):
+        """ Check that edited and added files are found. """
+
+        with open(self._source_path, "w") as f:
+            f.write("# Edited")
+        self.assertEqual(
+            self._wait_for_changes(self._source_path), ({self._source_path}, set()))
+
+        mac_path = os.path.realpath(os.path.join("guides", "guide", "mac.md"))
+        with open(mac_path, "w") as f:
+            f.write("# Mac")
+        changed, added_or_removed = self._wait_for_changes(mac_path)
+        self.assertEqual(added_or_removed, {mac_path})
+
+    def test_poll(self):
+        """ Test that polling finds the changes. """
+
+        self._watcher._snapshot = self._watcher._take_snapshot()
+        # make sure the edit changes the modification time
+        os.utime(self._source_path, (1, 1))
+
+        self._check_changes()
+
+    @unittest.skipIf(cece.watch.watchdog is None, "watchdog is not installed")
+    def test_events(self):
+        """ Test that file system events report the changes. """
+
+        observer = self._watcher._start_observer()
+        try:
+            self._check_changes()
+
+            # replacing a source by moving a file over it only edits it
+            temp_path = self._source_path + ".tmp"
+            with open(temp_path, "w") as f:
+                f.write("# Replaced")
+            os.rename(temp_path, self._source_path)
+            changed, added_or_removed = self._wait_for_changes(self._source_path)
+            self.assertNotIn(self._source_path, added_or_removed)
+        finally:
+            observer.stop()
+            observer.join()